@@ -4,8 +4,10 @@ from typing import Tuple, Optional, Dict, Any
 from datetime import datetime
 import pandas as pd
 import sqlite3
+import time
 
-from services.db.maintenance_rfc_db import DB_PATH
+from services.db.maintenance_rfc_db import DB_PATH, MPP_FILTER, default_db_path
+from services.db.ingest_manifest import record_ingest, unchanged_rows
 
 # Row fetchers for the Order Information tab
 from services.db.maintenance_rfc_db import (
@@ -18,8 +20,7 @@ from services.db.maintenance_rfc_db import (
 # Import/update helpers for Step 1 (these now include the new "Permit Exp Date" column
 # because the underlying wmp_db pipeline/schema was updated)
 from services.db.maintenance_rfc_db import (
-    load_and_filter_csv,
-    replace_mpp_data,
+    stream_mpp_data,
     seed_order_tracking_list_if_empty,
     update_order_tracking_list_from_mpp,
     get_order_tracking_df,
@@ -34,19 +35,32 @@ def _to_int_or_none(x: Any) -> Optional[int]:
     except Exception:
         return None
 
-def run_import_and_updates(csv_path: str) -> Tuple[int, int, int]:
+def run_import_and_updates(csv_path: str, force: bool = False) -> Tuple[int, int, int]:
     """
-    1) Load + filter CSV (uses updated wmp_db to include 'Permit Exp Date'), replace mpp_data
+    1) Stream + filter CSV in chunks (includes 'Permit Exp Date'), replace mpp_data
     2) Seed order_tracking_list if empty (first run)
     3) Otherwise append new orders from mpp_data
     Returns: (rows_in_mpp, seeded_count, appended_count)
-    """
-    df = load_and_filter_csv(csv_path)
-    rows = replace_mpp_data(df)
+
+    If this exact CSV was already ingested with the same filters (ingest_manifest),
+    nothing is reloaded and (rows_in_mpp, 0, 0) is returned. force=True reloads anyway.
+    """
+    db_path = default_db_path()
+    params = MPP_FILTER.params_key()
+    if not force:
+        prev = unchanged_rows(db_path, "MPP", csv_path, params)
+        if prev is not None:
+            return prev, 0, 0
+    t0 = time.perf_counter()
+
+    # Chunked load: memory stays bounded by STREAM_MEMORY_LIMIT_MB, not the CSV size
+    rows = stream_mpp_data(csv_path)
     seeded = seed_order_tracking_list_if_empty()
     appended = 0
     if seeded == 0:
         _, appended = update_order_tracking_list_from_mpp()
+
+    record_ingest(db_path, "MPP", csv_path, "mpp_data", rows, time.perf_counter() - t0, params)
     return rows, seeded, appended
 
 def export_order_list_to_excel(default_path: str | None = None) -> str:
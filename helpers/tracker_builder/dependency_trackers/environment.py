@@ -47,7 +47,7 @@ def _parse_to_iso(text: str | None) -> str | None:
 def _ensure_table(conn: sqlite3.Connection) -> None:
     """
     Ensure environment_tracker exists with the desired schema.
-    If it exists but differs, migrate in place while preserving data.
+    Older layouts are migrated once per DB by tracker_schema.ensure_tracker_schema().
     """
     cur = conn.cursor()
 
@@ -68,48 +68,6 @@ def _ensure_table(conn: sqlite3.Connection) -> None:
     """)
     conn.commit()
 
-    # Check actual columns
-    cur.execute("PRAGMA table_info(environment_tracker)")
-    existing_cols = [row[1] for row in cur.fetchall()]
-
-    # If the layout already matches, nothing to do
-    if existing_cols == ENV_COLS:
-        return
-
-    # Migrate to desired order (add any missing columns)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS environment_tracker__new (
-            "Order" INTEGER PRIMARY KEY,
-            "Notification Status" TEXT,
-            "SAP Status" TEXT,
-            "DS11" TEXT,
-            "PC21" TEXT,
-            "Environment Status" TEXT,
-            "Environment Update" TEXT,
-            "Environment Anticipated Out Date" TEXT,
-            "Environment Notes" TEXT,
-            "Action" TEXT
-        )
-    """)
-
-    # Map existing -> new ('' for missing)
-    select_parts = []
-    for c in ENV_COLS:
-        if c in existing_cols:
-            select_parts.append(f'"{c}"')
-        else:
-            select_parts.append(f"'' AS \"{c}\"")
-    select_sql = ", ".join(select_parts)
-    cols_csv = ", ".join(f'"{c}"' for c in ENV_COLS)
-
-    cur.execute((
-        f'INSERT OR REPLACE INTO environment_tracker__new ({cols_csv}) '
-        f'SELECT {select_sql} FROM environment_tracker'
-    ))
-    cur.execute("DROP TABLE environment_tracker")
-    cur.execute("ALTER TABLE environment_tracker__new RENAME TO environment_tracker")
-    conn.commit()
-
 def build_environment_tracker(conn: sqlite3.Connection) -> int:
     """
     Build/refresh environment_tracker:
@@ -14,7 +14,7 @@ FAA_COLS = [
 def _ensure_table(conn: sqlite3.Connection) -> None:
     """
     Ensure faa_tracker exists with the desired schema.
-    If it exists but differs, migrate in-place while preserving data.
+    Older layouts are migrated once per DB by tracker_schema.ensure_tracker_schema().
     """
     cur = conn.cursor()
 
@@ -30,42 +30,6 @@ def _ensure_table(conn: sqlite3.Connection) -> None:
     """)
     conn.commit()
 
-    # Check actual columns
-    cur.execute("PRAGMA table_info(faa_tracker)")
-    existing_cols = [row[1] for row in cur.fetchall()]
-
-    if existing_cols == FAA_COLS:
-        return
-
-    # Migrate to desired order (add any missing columns)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS faa_tracker__new (
-            "Order" INTEGER PRIMARY KEY,
-            "Notification Status" TEXT,
-            "SAP Status" TEXT,
-            "DS76" TEXT,
-            "PC24" TEXT
-        )
-    """)
-
-    # Map existing columns, else NULL
-    select_parts = []
-    for c in FAA_COLS:
-        if c in existing_cols:
-            select_parts.append(f'"{c}"')
-        else:
-            select_parts.append(f'NULL AS "{c}"')
-    select_sql = ", ".join(select_parts)
-    cols_csv = ", ".join(f'"{c}"' for c in FAA_COLS)
-
-    cur.execute((
-        f'INSERT OR REPLACE INTO faa_tracker__new ({cols_csv}) '
-        f'SELECT {select_sql} FROM faa_tracker'
-    ))
-    cur.execute("DROP TABLE faa_tracker")
-    cur.execute("ALTER TABLE faa_tracker__new RENAME TO faa_tracker")
-    conn.commit()
-
 
 def build_faa_tracker(conn: sqlite3.Connection) -> int:
     """
@@ -45,7 +45,7 @@ def _parse_date_mdy_or_iso(text: str | None) -> date | None:
 
 
 def _ensure_table(conn: sqlite3.Connection) -> None:
-    """Create joint_pole_tracker if missing; migrate to desired schema/order if needed."""
+    """Create joint_pole_tracker if missing (older layouts: see tracker_schema.py)."""
     cur = conn.cursor()
     cur.execute(
         """
@@ -64,47 +64,6 @@ def _ensure_table(conn: sqlite3.Connection) -> None:
     )
     conn.commit()
 
-    # Align column order by migrating if needed
-    cur.execute("PRAGMA table_info(joint_pole_tracker)")
-    existing_cols = [row[1] for row in cur.fetchall()]
-    if existing_cols == JP_COLS:
-        return
-
-    # Rebuild to match JP_COLS, filling missing columns as NULL
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS joint_pole_tracker__new (
-            "Order" INTEGER PRIMARY KEY,
-            "Notification Status" TEXT,
-            "SAP Status" TEXT,
-            "DS42" TEXT,
-            "PC20" TEXT,
-            "Primary Intent Status" TEXT,
-            "Status Date" TEXT,
-            "Due By" TEXT,
-            "Action" TEXT
-        )
-    """
-    )
-    select_parts: list[str] = []
-    for c in JP_COLS:
-        if c in existing_cols:
-            select_parts.append(f'"{c}"')
-        else:
-            select_parts.append(f'NULL AS "{c}"')
-    select_sql = ", ".join(select_parts)
-    cols_csv = ", ".join(f'"{c}"' for c in JP_COLS)
-
-    cur.execute(
-        f"""
-        INSERT OR REPLACE INTO joint_pole_tracker__new ({cols_csv})
-        SELECT {select_sql} FROM joint_pole_tracker
-    """
-    )
-    cur.execute("DROP TABLE joint_pole_tracker")
-    cur.execute('ALTER TABLE joint_pole_tracker__new RENAME TO joint_pole_tracker')
-    conn.commit()
-
 
 def build_joint_pole_tracker(conn: sqlite3.Connection) -> int:
     """
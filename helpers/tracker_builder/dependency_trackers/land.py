@@ -6,6 +6,7 @@ import pandas as pd
 
 from helpers.misc.comments import extract_latest_comment_block
 from helpers.misc.comments_parser import parse_comment_semantics  # uses updated parser
+from services.db.date_normalize import iso_sql
 
 # Final desired column order
 LAND_COLS = [
@@ -31,12 +32,10 @@ LAND_COLS = [
 ]
 
 def _ensure_table(conn: sqlite3.Connection) -> None:
+    """Create land_tracker if missing (older layouts: see tracker_schema.py)."""
     cur = conn.cursor()
 
-    # DDL / multi statements must use executescript
     cur.executescript("""
-        DROP TABLE IF EXISTS land_tracker__new;
-
         CREATE TABLE IF NOT EXISTS land_tracker (
             "Order" INTEGER PRIMARY KEY,
             "Notification Status" TEXT,
@@ -61,68 +60,6 @@ def _ensure_table(conn: sqlite3.Connection) -> None:
     """)
     conn.commit()
 
-    # Current physical order?
-    cur.execute("PRAGMA table_info(land_tracker)")
-    existing_cols = [row[1] for row in cur.fetchall()]
-    if existing_cols == LAND_COLS:
-        return
-
-    # Add any missing columns
-    for col in LAND_COLS:
-        if col not in existing_cols and col != "Order":
-            cur.execute(f'ALTER TABLE land_tracker ADD COLUMN "{col}" TEXT')
-    conn.commit()
-
-    # Re-order into canonical layout
-    cur.execute("PRAGMA table_info(land_tracker)")
-    existing_cols = [row[1] for row in cur.fetchall()]
-
-    cols_csv = ", ".join(f'"{c}"' for c in LAND_COLS)
-    select_parts = [(f'"{c}"' if c in existing_cols else f'NULL AS "{c}"') for c in LAND_COLS]
-    select_sql = ", ".join(select_parts)
-
-    cur.executescript(f"""
-        CREATE TABLE land_tracker__new (
-            "Order" INTEGER PRIMARY KEY,
-            "Notification Status" TEXT,
-            "SAP Status" TEXT,
-            "SP57" TEXT,
-            "RP57" TEXT,
-            "Permit Type" TEXT,
-            "Permit Status" TEXT,
-            "Anticipated Application Date" TEXT,
-            "Anticipated Issue Date" TEXT,
-            "Permit Expiration Date" TEXT,
-            "Land Management Comments" TEXT,
-            "Permit Comment" TEXT,
-            "Latest Comment Date" TEXT,
-            "LAN ID" TEXT,
-            "Latest Comment" TEXT,
-            "Parsed Action" TEXT,
-            "Parsed Anticipated Issue Date" TEXT,
-            "Parsed Permit Expiration Date" TEXT,
-            "Action" TEXT
-        );
-
-        INSERT OR REPLACE INTO land_tracker__new ({cols_csv})
-        SELECT {select_sql} FROM land_tracker;
-
-        DROP TABLE land_tracker;
-        ALTER TABLE land_tracker__new RENAME TO land_tracker;
-    """)
-    conn.commit()
-
-def _to_iso_case(col_expr: str) -> str:
-    # Returns a CASE expression to convert MM/DD/YYYY -> YYYY-MM-DD; else NULL
-    return f"""
-    CASE
-      WHEN {col_expr} IS NOT NULL AND LENGTH({col_expr})=10
-           AND SUBSTR({col_expr},3,1)='/' AND SUBSTR({col_expr},6,1)='/'
-        THEN SUBSTR({col_expr},7,4) || '-' || SUBSTR({col_expr},1,2) || '-' || SUBSTR({col_expr},4,2)
-      ELSE NULL
-    END
-    """
-
 def _to_iso_case_flex(col_expr: str) -> str:
     """
     Flexible M/D/YYYY or MM/DD/YYYY -> YYYY-MM-DD
@@ -177,14 +114,14 @@ def build_land_tracker(conn: sqlite3.Connection) -> int:
             m."Primary Status" AS sap_status,
 
             m."Work Plan Date" AS work_plan_date_raw,
-            {_to_iso_case('m."Work Plan Date"')} AS work_plan_date_iso,
+            {iso_sql(conn, "mpp_data", "Work Plan Date", "m")} AS work_plan_date_iso,
 
             CAST(NULLIF(TRIM(COALESCE(m."Project Reporting Year", '')), '') AS INTEGER) AS pry_int
         FROM mpp_data m
         INNER JOIN __land_orders o ON o."Order" = m."Order";
     """)
 
-    # 3) land_data snapshot + ISO helpers (pick latest Permit Created Date per Order)
+    # 3) land_data snapshot + ISO dates from the ingest shadow columns (pick latest Permit Created Date per Order)
     cur.executescript(f"""
         DROP TABLE IF EXISTS __land_ld;
         CREATE TEMP TABLE __land_ld AS
@@ -199,8 +136,11 @@ def build_land_tracker(conn: sqlite3.Connection) -> int:
                 ld."Land Mgmt Project Status Comments" AS land_mgmt_comments,
                 ld."Permit Comment" AS permit_comment,
                 ld."Permit Created Date" AS created_raw,
-                {_to_iso_case('ld."Permit Created Date"')}        AS created_iso,
-                {_to_iso_case('ld."Anticipated Application"')}    AS anticipated_app_iso,
+                {iso_sql(conn, "land_data", "Permit Created Date", "ld")}      AS created_iso,
+                {iso_sql(conn, "land_data", "Anticipated Application", "ld")}  AS anticipated_app_iso,
+                {iso_sql(conn, "land_data", "Anticipated Issued Date", "ld")}  AS anticipated_issue_iso,
+                {iso_sql(conn, "land_data", "Permit Expiration", "ld",
+                         fallback_sql=_to_iso_case_flex('ld."Permit Expiration"'))} AS permit_expiration_iso,
                 rowid AS rid
             FROM land_data ld
         ),
@@ -237,9 +177,9 @@ def build_land_tracker(conn: sqlite3.Connection) -> int:
             COALESCE(c.anticipated_app_raw, '')        AS anticipated_app_date,
             c.anticipated_app_iso                      AS anticipated_app_iso,
             COALESCE(c.anticipated_issue_raw, '')      AS anticipated_issue_date,
-            {_to_iso_case('c.anticipated_issue_raw')}  AS anticipated_issue_iso,
+            c.anticipated_issue_iso                    AS anticipated_issue_iso,
             COALESCE(c.permit_expiration_raw, '')      AS permit_expiration_date,
-            {_to_iso_case_flex('c.permit_expiration_raw')}  AS permit_expiration_iso,
+            c.permit_expiration_iso                    AS permit_expiration_iso,
             c.land_mgmt_comments,
             c.permit_comment
         FROM chosen c;
@@ -16,7 +16,7 @@ MTSK_COLS = [
 def _ensure_table(conn: sqlite3.Connection) -> None:
     """
     Ensure miscTSK_tracker exists with the desired schema.
-    If it exists but differs, migrate in-place while preserving data.
+    Older layouts are migrated once per DB by tracker_schema.ensure_tracker_schema().
     """
     cur = conn.cursor()
 
@@ -34,44 +34,6 @@ def _ensure_table(conn: sqlite3.Connection) -> None:
     """)
     conn.commit()
 
-    # Check actual columns
-    cur.execute("PRAGMA table_info(miscTSK_tracker)")
-    existing_cols = [row[1] for row in cur.fetchall()]
-
-    if existing_cols == MTSK_COLS:
-        return
-
-    # Migrate to desired order (add any missing columns)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS miscTSK_tracker__new (
-            "Order" INTEGER PRIMARY KEY,
-            "Notification Status" TEXT,
-            "SAP Status" TEXT,
-            "AP10" TEXT,
-            "AP25" TEXT,
-            "DS28" TEXT,
-            "DS73" TEXT
-        )
-    """)
-
-    # Map existing columns, else NULL
-    select_parts = []
-    for c in MTSK_COLS:
-        if c in existing_cols:
-            select_parts.append(f'"{c}"')
-        else:
-            select_parts.append(f'NULL AS "{c}"')
-    select_sql = ", ".join(select_parts)
-    cols_csv = ", ".join(f'"{c}"' for c in MTSK_COLS)
-
-    cur.execute((
-        f'INSERT OR REPLACE INTO miscTSK_tracker__new ({cols_csv}) '
-        f'SELECT {select_sql} FROM miscTSK_tracker'
-    ))
-    cur.execute("DROP TABLE miscTSK_tracker")
-    cur.execute("ALTER TABLE miscTSK_tracker__new RENAME TO miscTSK_tracker")
-    conn.commit()
-
 
 def build_misctsk_tracker(conn: sqlite3.Connection) -> int:
     """
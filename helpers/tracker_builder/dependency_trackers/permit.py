@@ -3,6 +3,8 @@ from __future__ import annotations
 import sqlite3
 from datetime import datetime
 
+from services.db.date_normalize import iso_sql
+
 # Desired final column order for permit_tracker
 PERMIT_TRACKER_COLS = [
     "Order",
@@ -24,8 +26,7 @@ PERMIT_TRACKER_COLS = [
 def _ensure_table(conn: sqlite3.Connection) -> None:
     """
     Ensure permit_tracker exists with the desired schema.
-    If it exists but is missing columns (e.g., 'SAP Status' or 'Notification Status'),
-    migrate it in-place and preserve data.
+    Older layouts are migrated once per DB by tracker_schema.ensure_tracker_schema().
     """
     cur = conn.cursor()
 
@@ -51,71 +52,6 @@ def _ensure_table(conn: sqlite3.Connection) -> None:
     )
     conn.commit()
 
-    # Check actual columns
-    cur.execute("PRAGMA table_info(permit_tracker)")
-    existing_cols = [row[1] for row in cur.fetchall()]
-
-    # If already correct, done
-    if existing_cols == PERMIT_TRACKER_COLS:
-        return
-
-    # If differs, migrate to new schema order
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS permit_tracker__new (
-            "Order" INTEGER PRIMARY KEY,
-            "Notification Status" TEXT,
-            "SAP Status" TEXT,
-            "SP56 Status" TEXT,
-            "RP56 Status" TEXT,
-            "E Permit Status" TEXT,
-            "Submit Days" TEXT,
-            "Permit Expiration Date" TEXT,
-            "Work Plan Date" TEXT,
-            "CLICK Start Date" TEXT,
-            "CLICK End Date" TEXT,
-            "LEAPS Cycle Time" TEXT,
-            "Action" TEXT
-        )
-    """
-    )
-
-    # Map existing columns where present, else NULL
-    select_parts: list[str] = []
-    for c in PERMIT_TRACKER_COLS:
-        if c in existing_cols:
-            select_parts.append(f'"{c}"')
-        else:
-            select_parts.append(f'NULL AS "{c}"')
-    select_sql = ", ".join(select_parts)
-    cols_csv = ", ".join(f'"{c}"' for c in PERMIT_TRACKER_COLS)
-
-    cur.execute(
-        (
-            f'INSERT OR REPLACE INTO permit_tracker__new ({cols_csv}) '
-            f"SELECT {select_sql} FROM permit_tracker"
-        )
-    )
-
-    cur.execute("DROP TABLE permit_tracker")
-    cur.execute('ALTER TABLE permit_tracker__new RENAME TO permit_tracker')
-    conn.commit()
-
-
-def _to_iso_case(col_expr: str) -> str:
-    """
-    Convert MM/DD/YYYY text to ISO YYYY-MM-DD using pure SQL substrings.
-    Anything else -> NULL (your MPP import already coerces to MM/DD/YYYY).
-    """
-    return f"""
-    CASE
-      WHEN {col_expr} IS NOT NULL AND LENGTH({col_expr})=10
-           AND SUBSTR({col_expr},3,1)='/' AND SUBSTR({col_expr},6,1)='/'
-        THEN SUBSTR({col_expr},7,4) || '-' || SUBSTR({col_expr},1,2) || '-' || SUBSTR({col_expr},4,2)
-      ELSE NULL
-    END
-    """
-
 
 def _iso_to_mdy(expr_iso: str) -> str:
     """Render an ISO date expression back to MM/DD/YYYY (text) inside SQL."""
@@ -162,9 +98,9 @@ def build_permit_tracker(conn: sqlite3.Connection) -> int:
     """
     )
 
-    # 3) EPW one-per-order and normalize expiration
+    # 3) EPW one-per-order; expiration ISO comes from the ingest shadow column
     cur.executescript(
-        """
+        f"""
         DROP TABLE IF EXISTS __pt_epw_one;
         CREATE TEMP TABLE __pt_epw_one AS
         WITH c AS (
@@ -175,10 +111,12 @@ def build_permit_tracker(conn: sqlite3.Connection) -> int:
               "EPW Submit Days in Age" AS submit_days,
               "EPW Expiration Date" AS epw_exp_raw,
               "Cycle Time" AS cycle_time,
+              {iso_sql(conn, "epw_data", "EPW Expiration Date")} AS epw_exp_iso,
               rowid AS rid
           FROM epw_data
         )
-        SELECT c1.order_num, c1.epw_status, c1.epermit_update, c1.submit_days, c1.epw_exp_raw, c1.cycle_time
+        SELECT c1.order_num, c1.epw_status, c1.epermit_update, c1.submit_days, c1.epw_exp_raw, c1.cycle_time,
+               c1.epw_exp_iso
         FROM c c1
         WHERE c1.rid = (SELECT MIN(c2.rid) FROM c c2 WHERE c2.order_num = c1.order_num);
 
@@ -190,17 +128,12 @@ def build_permit_tracker(conn: sqlite3.Connection) -> int:
             eo.epermit_update,
             eo.submit_days,
             eo.cycle_time,
-            CASE
-              WHEN eo.epw_exp_raw IS NOT NULL AND LENGTH(eo.epw_exp_raw)=10
-                   AND SUBSTR(eo.epw_exp_raw,3,1)='/' AND SUBSTR(eo.epw_exp_raw,6,1)='/'
-                THEN SUBSTR(eo.epw_exp_raw,7,4) || '-' || SUBSTR(eo.epw_exp_raw,1,2) || '-' || SUBSTR(eo.epw_exp_raw,4,2)
-              ELSE NULL
-            END AS epw_exp_iso
+            eo.epw_exp_iso
         FROM __pt_epw_one eo;
     """
     )
 
-    # 4) MPP (already coerced to MM/DD/YYYY) -> ISO; plus Primary/Notif Status
+    # 4) MPP dates as ISO (stored shadow columns); plus Primary/Notif Status
     cur.executescript(
         f"""
         DROP TABLE IF EXISTS __pt_mpp;
@@ -209,10 +142,10 @@ def build_permit_tracker(conn: sqlite3.Connection) -> int:
             m."Order",
             m."Primary Status"   AS primary_status,
             m."Notif Status"     AS notif_status,
-            m."Work Plan Date"   AS wpd_raw,
-            m."CLICK Start Date" AS click_start_raw,
-            m."CLICK End Date"   AS click_end_raw,
-            m."Permit Exp Date"  AS mpp_exp_raw
+            {iso_sql(conn, "mpp_data", "Work Plan Date", "m")}   AS wpd_iso,
+            {iso_sql(conn, "mpp_data", "CLICK Start Date", "m")} AS click_start_iso,
+            {iso_sql(conn, "mpp_data", "CLICK End Date", "m")}   AS click_end_iso,
+            {iso_sql(conn, "mpp_data", "Permit Exp Date", "m")}  AS mpp_exp_iso
         FROM mpp_data m
         INNER JOIN __pt_orders o ON o."Order" = m."Order";
 
@@ -222,10 +155,10 @@ def build_permit_tracker(conn: sqlite3.Connection) -> int:
             "Order",
             primary_status,
             notif_status,
-            {_to_iso_case('wpd_raw')}          AS wpd_iso,
-            {_to_iso_case('click_start_raw')}  AS click_start_iso,
-            {_to_iso_case('click_end_raw')}    AS click_end_iso,
-            {_to_iso_case('mpp_exp_raw')}      AS mpp_exp_iso
+            wpd_iso,
+            click_start_iso,
+            click_end_iso,
+            mpp_exp_iso
         FROM __pt_mpp;
     """
     )
@@ -0,0 +1,91 @@
+# helpers/tracker_builder/excel_reader.py
+from __future__ import annotations
+
+import importlib.util
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence
+
+import pandas as pd
+
+# ------------------------
+# Column-projected Excel reader
+# ------------------------
+# The EPW / Land exports are wide and the pulls only keep a fixed list of columns.
+# read_excel_columns() reads just the header row first, resolves the wanted names
+# case-insensitively (one dict, not a scan per name), then parses only those
+# columns.
+#
+# Backend: python-calamine (Rust) when it's installed, otherwise openpyxl. Both go
+# through pd.read_excel, so dtypes / NaN handling are the same either way; if
+# calamine can't open a file we fall back to openpyxl.
+
+_ENGINE_COUNTS: Dict[str, int] = {"calamine": 0, "openpyxl": 0}
+
+
+def excel_engine() -> str:
+    """Preferred pd.read_excel engine on this machine."""
+    if importlib.util.find_spec("python_calamine") is not None:
+        return "calamine"
+    return "openpyxl"
+
+
+def get_engine_counts() -> Dict[str, int]:
+    return dict(_ENGINE_COUNTS)
+
+
+def ci_key(name: Hashable) -> str:
+    return str(name).strip().lower()
+
+
+def ci_map(columns: Iterable[Hashable]) -> Dict[str, Hashable]:
+    """Normalized name -> actual column name (first match wins, like the old _ci scan)."""
+    out: Dict[str, Hashable] = {}
+    for c in columns:
+        out.setdefault(ci_key(c), c)
+    return out
+
+
+def resolve_columns(columns: Iterable[Hashable], wanted: Sequence[str]) -> Dict[str, Optional[Hashable]]:
+    """{wanted name: actual column or None} in one pass over `columns`."""
+    m = ci_map(columns)
+    return {w: m.get(ci_key(w)) for w in wanted}
+
+
+def _read(xlsx_path: str, sheet_name: str, **kwargs) -> pd.DataFrame:
+    engine = excel_engine()
+    if engine != "openpyxl":
+        try:
+            df = pd.read_excel(xlsx_path, sheet_name=sheet_name, engine=engine, **kwargs)
+            _ENGINE_COUNTS[engine] += 1
+            return df
+        except Exception:
+            # Workbook calamine can't handle (or a missing sheet): openpyxl is slower
+            # but more forgiving, and raises the usual error if the sheet isn't there
+            pass
+    df = pd.read_excel(xlsx_path, sheet_name=sheet_name, engine="openpyxl", **kwargs)
+    _ENGINE_COUNTS["openpyxl"] += 1
+    return df
+
+
+def sniff_header(xlsx_path: str, sheet_name: str) -> List[Hashable]:
+    """Column names as pd.read_excel would produce them, reading only the header row."""
+    return list(_read(xlsx_path, sheet_name, nrows=0).columns)
+
+
+def read_excel_columns(
+    xlsx_path: str,
+    sheet_name: str,
+    wanted: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    """
+    pd.read_excel(xlsx_path, sheet_name) restricted to the columns matching `wanted`
+    (case-insensitive, in sheet order). Wanted names that aren't in the sheet are
+    simply absent; callers report them. wanted=None reads every column.
+    """
+    if wanted is None:
+        return _read(xlsx_path, sheet_name)
+
+    cm = resolve_columns(sniff_header(xlsx_path, sheet_name), wanted)
+    keep = {c for c in cm.values() if c is not None}
+    if not keep:
+        return pd.DataFrame()
+    return _read(xlsx_path, sheet_name, usecols=lambda c: c in keep)
@@ -0,0 +1,163 @@
+# helpers/tracker_builder/memory_staging.py
+from __future__ import annotations
+import os
+import sqlite3
+from typing import Dict, List, Optional
+
+from services.db.date_normalize import iso_col, jd_col
+from helpers.tracker_builder.tracker_shadow import drop_shadows, open_shadows, swap_in_shadows
+
+# ------------------------
+# In-memory staging for tracker rebuilds (opt-in)
+# ------------------------
+# The builders create dozens of TEMP tables, read them back, write the trackers and
+# commit after nearly every step. On a large order set that is a lot of page churn
+# and fsyncs against the program DB. With this option on, build_sap_tracker_initial()
+# runs the same chain on an in-memory connection instead:
+#
+#   main   :memory:  the source columns the builders read (STAGED_SOURCES) + the trackers
+#   disk   the program DB, attached
+#
+# Unqualified names resolve to main before any attached DB, so the builders' SQL
+# runs unchanged against the staged copies. Staged rows keep their rowids, the DB's
+# indexes on the staged columns and its sqlite_stat1 rows, so queries plan (and
+# break GROUP BY ties) the way they do on disk. At the end the trackers go to disk
+# through the shadow swap (tracker_shadow.py): one transaction writes the
+# "<table>__shadow" copies, a second short one swaps them in.
+#
+# A builder that starts reading a new source column needs it added here, or the
+# staged build fails with "no such column" (the disk build is unaffected).
+
+STAGING_ENV = "TRACKER_MEMORY_STAGING"
+DISK_SCHEMA = "disk"
+
+# Source table -> columns the tracker builders read (their __iso / __jd date shadows
+# come along when the DB has them)
+STAGED_SOURCES: Dict[str, List[str]] = {
+    "order_tracking_list": ["Order"],
+    "mpp_data": [
+        "Order", "Notif Status", "Primary Status", "Work Plan Date", "Permit Exp Date",
+        "CLICK Start Date", "CLICK End Date", "Project Reporting Year",
+    ],
+    "sap_data": ["Order", "Code", "TaskUsrStatus"],
+    "epw_data": [
+        "Order Number", "Cycle Time", "EPW Submit Days in Age", "Work Plan Date",
+        "EPW Expiration Date", "EPW Status", "Env Status", "Epermit Update", "Enviro Update",
+    ],
+    "land_data": [
+        "Order", "Land Mgmt Project Status Comments", "Permit Status", "Permit Type",
+        "Permit Comment", "Anticipated Application", "Anticipated Issued Date",
+        "Permit Expiration", "Permit Created Date",
+    ],
+    "joint_pole_data": ["Order No", "Primary Intent Status", "Status Date", "Due By", "Last Chgd"],
+    "manual_tracker": ["Order", "Environment Anticipated Out Date", "Environment Notes"],
+}
+
+_TRUE = {"1", "true", "yes", "on"}
+
+
+def memory_staging_enabled() -> bool:
+    return os.environ.get(STAGING_ENV, "").strip().lower() in _TRUE
+
+
+def set_memory_staging(enabled: bool) -> None:
+    """Turn the option on/off for this process (and anything it starts)."""
+    os.environ[STAGING_ENV] = "1" if enabled else "0"
+
+
+def _q(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _stage_table(conn: sqlite3.Connection, table: str, wanted: List[str]) -> Optional[List[str]]:
+    """
+    Copy the wanted columns of disk.<table> (rowids kept) plus the indexes they cover.
+    Returns the staged index names, None if the table has none of the columns.
+    """
+    info = conn.execute(f"PRAGMA {DISK_SCHEMA}.table_info({_q(table)})").fetchall()
+    keep = set(wanted) | {iso_col(c) for c in wanted} | {jd_col(c) for c in wanted}
+    # (cid, name, type, notnull, default, pk)
+    cols = [r for r in info if r[1] in keep]
+    if not cols:
+        return None     # left to resolve to the disk table
+    pk = [r for r in info if r[5]]
+    alias = len(pk) == 1 and pk[0][2].upper() == "INTEGER" and pk[0] in cols
+    defs = ", ".join(
+        f"{_q(r[1])} {r[2]}" + (" PRIMARY KEY" if alias and r is pk[0] else "") for r in cols
+    )
+    names = ", ".join(_q(r[1]) for r in cols)
+    conn.execute(f"CREATE TABLE main.{_q(table)} ({defs})")
+    if alias:       # "Order" INTEGER PRIMARY KEY is the rowid already
+        conn.execute(f"INSERT INTO main.{_q(table)} ({names}) SELECT {names} FROM {DISK_SCHEMA}.{_q(table)}")
+    else:
+        conn.execute(
+            f"INSERT INTO main.{_q(table)} (rowid, {names}) "
+            f"SELECT rowid, {names} FROM {DISK_SCHEMA}.{_q(table)}"
+        )
+
+    staged = {r[1] for r in cols}
+    indexes = []
+    for name, sql in conn.execute(
+        f"SELECT name, sql FROM {DISK_SCHEMA}.sqlite_master "
+        f"WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (table,),
+    ).fetchall():
+        icols = [r[2] for r in conn.execute(f"PRAGMA {DISK_SCHEMA}.index_info({_q(name)})")]
+        if icols and all(c in staged for c in icols):
+            conn.execute(sql)       # unqualified: lands in main, next to the staged table
+            indexes.append(name)
+    return indexes
+
+
+def _stage_stats(conn: sqlite3.Connection, tables: List[str], indexes: List[str]) -> None:
+    """The DB's sqlite_stat1 rows for what was staged, so the planner sees the same numbers."""
+    has_stat = conn.execute(
+        f"SELECT 1 FROM {DISK_SCHEMA}.sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+    ).fetchone()
+    if not has_stat or not tables:
+        return
+    conn.execute(f"ANALYZE main.{_q(tables[0])}")     # creates main.sqlite_stat1; rows replaced below
+    conn.execute("DELETE FROM main.sqlite_stat1")
+    t_marks = ", ".join("?" for _ in tables)
+    i_marks = ", ".join("?" for _ in indexes) or "NULL"
+    conn.execute(
+        f"INSERT INTO main.sqlite_stat1 (tbl, idx, stat) "
+        f"SELECT tbl, idx, stat FROM {DISK_SCHEMA}.sqlite_stat1 "
+        f"WHERE tbl IN ({t_marks}) AND (idx IS NULL OR idx = tbl OR idx IN ({i_marks}))",
+        [*tables, *indexes],
+    )
+    conn.execute("ANALYZE sqlite_schema")      # reload the statistics
+
+
+def open_staging(db_path: str) -> sqlite3.Connection:
+    """In-memory connection with db_path attached as "disk" and the build inputs staged. Caller closes."""
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute(f"ATTACH DATABASE ? AS {DISK_SCHEMA}", (db_path,))
+        on_disk = {
+            r[0] for r in conn.execute(f"SELECT name FROM {DISK_SCHEMA}.sqlite_master WHERE type = 'table'")
+        }
+        tables: List[str] = []
+        indexes: List[str] = []
+        for table, wanted in STAGED_SOURCES.items():
+            staged = _stage_table(conn, table, wanted) if table in on_disk else None
+            if staged is not None:
+                indexes += staged
+                tables.append(table)
+        _stage_stats(conn, tables, indexes)
+        conn.commit()
+        open_shadows(conn, live=DISK_SCHEMA, shadow="main")
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+
+def flush_staging(conn: sqlite3.Connection) -> List[str]:
+    """Swap the staged trackers into the DB. Returns the tables written."""
+    return swap_in_shadows(conn, live=DISK_SCHEMA, shadow="main")
+
+
+def discard_staging(conn: sqlite3.Connection) -> None:
+    drop_shadows(conn, live=DISK_SCHEMA, shadow="main")
@@ -3,35 +3,28 @@ from __future__ import annotations
 import sqlite3
 from datetime import datetime
 
+from services.db.date_normalize import iso_sql
+
 # Use ordered tuple (not a set) so we have deterministic placeholders & bindings
 AP_ALLOWED = ("PEND", "UNSC", "CONS")
 
 
 def _ensure_table_and_columns(conn: sqlite3.Connection) -> None:
+    # Columns added over time are migrated once per DB (tracker_schema.ensure_tracker_schema)
     cur = conn.cursor()
     cur.execute("""
         CREATE TABLE IF NOT EXISTS open_dependencies (
             "Order" INTEGER PRIMARY KEY,
-            "Permit" TEXT
+            "Permit" TEXT,
+            "Land" TEXT,
+            "FAA" TEXT,
+            "Environment" TEXT,
+            "Joint Pole" TEXT,
+            "MiscTSK" TEXT,
+            "Open Dependencies" TEXT,
+            "Stage of Job" TEXT
         )
     """)
-    cur.execute("PRAGMA table_info(open_dependencies)")
-    cols = {row[1] for row in cur.fetchall()}
-    if "Land" not in cols:
-        cur.execute('ALTER TABLE open_dependencies ADD COLUMN "Land" TEXT')
-    if "FAA" not in cols:
-        cur.execute('ALTER TABLE open_dependencies ADD COLUMN "FAA" TEXT')
-    if "Environment" not in cols:
-        cur.execute('ALTER TABLE open_dependencies ADD COLUMN "Environment" TEXT')
-    if "Joint Pole" not in cols:
-        cur.execute('ALTER TABLE open_dependencies ADD COLUMN "Joint Pole" TEXT')
-    if "MiscTSK" not in cols:
-        cur.execute('ALTER TABLE open_dependencies ADD COLUMN "MiscTSK" TEXT')
-    if "Open Dependencies" not in cols:
-        cur.execute('ALTER TABLE open_dependencies ADD COLUMN "Open Dependencies" TEXT')
-    # NEW: Stage of Job column
-    if "Stage of Job" not in cols:
-        cur.execute('ALTER TABLE open_dependencies ADD COLUMN "Stage of Job" TEXT')
     conn.commit()
 
 
@@ -47,17 +40,17 @@ def build_open_dependencies(conn: sqlite3.Connection) -> int:
         FROM order_tracking_list;
     """)
 
-    # EPW one-per-order + ISO normalize
-    cur.executescript("""
+    # EPW one-per-order (ISO date from the ingest shadow column)
+    cur.executescript(f"""
         DROP TABLE IF EXISTS __epw_one_per_order;
         CREATE TEMP TABLE __epw_one_per_order AS
         WITH c AS (
             SELECT "Order Number" AS order_num,
-                   "EPW Expiration Date" AS epw_raw,
+                   {iso_sql(conn, "epw_data", "EPW Expiration Date")} AS epw_iso,
                    rowid AS rid
             FROM epw_data
         )
-        SELECT c1.order_num, c1.epw_raw
+        SELECT c1.order_num, c1.epw_iso
         FROM c c1
         WHERE c1.rid = (SELECT MIN(c2.rid) FROM c c2 WHERE c2.order_num = c1.order_num);
 
@@ -65,28 +58,22 @@ def build_open_dependencies(conn: sqlite3.Connection) -> int:
         CREATE TEMP TABLE __epw_norm AS
         SELECT
             o.order_num AS "Order",
-            CASE
-              WHEN e.epw_raw IS NOT NULL
-                   AND LENGTH(e.epw_raw)=10
-                   AND SUBSTR(e.epw_raw,3,1)='/' AND SUBSTR(e.epw_raw,6,1)='/'
-                THEN SUBSTR(e.epw_raw,7,4) || '-' || SUBSTR(e.epw_raw,1,2) || '-' || SUBSTR(e.epw_raw,4,2)
-              ELSE NULL
-            END AS epw_iso
+            e.epw_iso
         FROM __od_orders o
         LEFT JOIN __epw_one_per_order e ON e.order_num = o.order_num;
     """)
 
-    # MPP one-per-order + ISO normalize (Permit Exp Date from mpp_data)
-    cur.executescript("""
+    # MPP one-per-order (Permit Exp Date from mpp_data, ISO shadow column)
+    cur.executescript(f"""
         DROP TABLE IF EXISTS __mpp_one_per_order;
         CREATE TEMP TABLE __mpp_one_per_order AS
         WITH c AS (
             SELECT "Order" AS order_num,
-                   "Permit Exp Date" AS mpp_raw,
+                   {iso_sql(conn, "mpp_data", "Permit Exp Date")} AS mpp_iso,
                    rowid AS rid
             FROM mpp_data
         )
-        SELECT c1.order_num, c1.mpp_raw
+        SELECT c1.order_num, c1.mpp_iso
         FROM c c1
         WHERE c1.rid = (SELECT MIN(c2.rid) FROM c c2 WHERE c2.order_num = c1.order_num);
 
@@ -94,46 +81,25 @@ def build_open_dependencies(conn: sqlite3.Connection) -> int:
         CREATE TEMP TABLE __mpp_norm AS
         SELECT
             o.order_num AS "Order",
-            CASE
-              WHEN m.mpp_raw IS NOT NULL
-                   AND LENGTH(m.mpp_raw)=10
-                   AND SUBSTR(m.mpp_raw,3,1)='/' AND SUBSTR(m.mpp_raw,6,1)='/'
-                THEN SUBSTR(m.mpp_raw,7,4) || '-' || SUBSTR(m.mpp_raw,1,2) || '-' || SUBSTR(m.mpp_raw,4,2)
-              ELSE NULL
-            END AS mpp_iso
+            m.mpp_iso
         FROM __od_orders o
         LEFT JOIN __mpp_one_per_order m ON m.order_num = o.order_num;
     """)
 
-    # Land one-per-order + ISO normalize
+    # Land one-per-order (ISO dates from the ingest shadow columns)
     # When multiple rows per Order in land_data, pick the row with the LATEST "Permit Created Date";
     # if all created dates are NULL/invalid for an Order, fall back to the earliest row (MIN rowid).
-    cur.executescript("""
+    cur.executescript(f"""
         DROP TABLE IF EXISTS __land_one_per_order;
         CREATE TEMP TABLE __land_one_per_order AS
-        WITH c AS (
+        WITH c_norm AS (
             SELECT
                 "Order"               AS order_num,
-                "Permit Expiration"   AS land_raw,
-                "Permit Created Date" AS created_raw,
+                {iso_sql(conn, "land_data", "Permit Expiration")}   AS land_iso,
+                {iso_sql(conn, "land_data", "Permit Created Date")} AS created_iso,
                 rowid                 AS rid
             FROM land_data
         ),
-        c_norm AS (
-            SELECT
-                order_num,
-                land_raw,
-                created_raw,
-                CASE
-                  WHEN created_raw IS NOT NULL
-                       AND LENGTH(created_raw)=10
-                       AND SUBSTR(created_raw,3,1)='/' AND SUBSTR(created_raw,6,1)='/'
-                    THEN SUBSTR(created_raw,7,4) || '-' || SUBSTR(created_raw,1,2) || '-' || SUBSTR(created_raw,4,2)
-                  ELSE NULL
-                END AS created_iso,
-                rid
-            FROM c
-        ),
         picked AS (
             SELECT c1.*
             FROM c_norm c1
@@ -145,20 +111,14 @@ def build_open_dependencies(conn: sqlite3.Connection) -> int:
                 LIMIT 1
             )
         )
-        SELECT p.order_num, p.land_raw
+        SELECT p.order_num, p.land_iso
         FROM picked p;
 
         DROP TABLE IF EXISTS __land_norm;
         CREATE TEMP TABLE __land_norm AS
         SELECT
             o.order_num AS "Order",
-            CASE
-              WHEN l.land_raw IS NOT NULL
-                   AND LENGTH(l.land_raw)=10
-                   AND SUBSTR(l.land_raw,3,1)='/' AND SUBSTR(l.land_raw,6,1)='/'
-                THEN SUBSTR(l.land_raw,7,4) || '-' || SUBSTR(l.land_raw,1,2) || '-' || SUBSTR(l.land_raw,4,2)
-              ELSE NULL
-            END AS land_iso
+            l.land_iso
         FROM __od_orders o
         LEFT JOIN __land_one_per_order l ON l.order_num = o.order_num;
     """)
@@ -0,0 +1,351 @@
+# helpers/tracker_builder/parallel_extract.py
+from __future__ import annotations
+
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Collection, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from helpers.tracker_builder.pull_sap_data import parse_sap_data, pull_sap_data, write_sap_data
+from helpers.tracker_builder.pull_epw_data import (
+    EPW_COLUMNS,
+    EPW_SHEET,
+    parse_epw_data,
+    pull_epw_data,
+    write_epw_data,
+)
+from helpers.tracker_builder.pull_land_data import (
+    LAND_COLUMNS,
+    LAND_SHEET,
+    parse_land_data,
+    pull_land_data,
+    write_land_data,
+)
+from helpers.tracker_builder.pull_joint_pole_data import (
+    JOINT_POLE_COLUMNS,
+    JOINT_POLE_SHEET,
+    parse_joint_pole_data,
+    pull_joint_pole_data,
+    write_joint_pole_data,
+)
+from helpers.tracker_builder.source_cache import read_excel_cached
+from services.db.ingest_manifest import params_key, unchanged_rows
+from services.db.db_maintenance import maintain_db
+from services.db.ingest_runs import IngestProfile, ingest_run, record_run
+
+# ------------------------
+# Step 2 extraction across programs
+# ------------------------
+# Each program writes SAP / EPW / Land / Joint Pole into its own SQLite file, so the
+# five programs share nothing but the (read-only) source workbooks. run_extractions()
+# runs one job per program in a ProcessPoolExecutor and hands back one result per
+# program; a failure in one program doesn't stop the others.
+#
+# Jobs and results are plain dataclasses so they pickle to / from the workers
+# (db modules aren't picklable, so jobs carry db_path instead).
+#
+# extract_program_concurrent() is the single-program variant: the four workbooks are
+# parsed in worker processes at the same time, and this process is the only writer
+# to the program DB (each parsed frame is written as soon as it arrives).
+#
+# The EPW / Land / Joint Pole workbooks are the same files for every program. Each
+# worker process has its own in-memory cache, so on a cold (or stale) disk cache all
+# of them would parse those workbooks at once; run_extractions() parses them once in
+# this process first (warm_shared_sources()) and the workers load the cached copy.
+#
+# Both finish with maintain_db() on the program DB (WAL checkpoint, VACUUM when the
+# replaced tables left enough free pages). The loaders ANALYZE their own tables, so
+# it only analyzes tables that have no stats at all.
+
+
+def default_workers() -> int:
+    """Worker count used when the caller doesn't pick one."""
+    return max(1, min(5, os.cpu_count() or 1))
+
+
+@dataclass
+class ExtractJob:
+    label: str
+    db_path: str
+    sap_path: str
+    epw_path: str
+    land_path: str
+    joint_path: str
+    allowed_mat: Collection[str]
+    remove_btag: bool = False
+    remove_sap_status: bool = False
+    sap_status_to_keep: Optional[Collection[str]] = None
+    force: bool = False
+
+
+@dataclass
+class ExtractResult:
+    label: str
+    msgs: List[str] = field(default_factory=list)
+    tables: List[Tuple[str, int]] = field(default_factory=list)   # (table, rows) per source
+    error: Optional[str] = None          # "Type: message" if the program failed
+    traceback: str = ""
+    duration_s: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def extract_program(job: ExtractJob) -> ExtractResult:
+    """SAP, EPW, Land, Joint Pole pulls for one program DB. Never raises."""
+    res = ExtractResult(label=job.label)
+    t0 = time.perf_counter()
+    try:
+        os.makedirs(os.path.dirname(job.db_path), exist_ok=True)
+
+        t1, n1 = pull_sap_data(job.db_path, job.sap_path, force=job.force)
+        res.tables.append((t1, n1))
+        res.msgs.append(f"{job.label}: {t1} (SAP) = {n1:,} rows")
+
+        t2, n2 = pull_epw_data(
+            job.db_path,
+            job.epw_path,
+            job.allowed_mat,
+            REMOVE_BTAG=job.remove_btag,
+            REMOVE_SAP_STATUS=job.remove_sap_status,
+            SAP_STATUS_TO_KEEP=job.sap_status_to_keep,
+            force=job.force,
+        )
+        res.tables.append((t2, n2))
+        res.msgs.append(f"{job.label}: {t2} (EPW) = {n2:,} rows")
+
+        t3, n3 = pull_land_data(
+            job.db_path,
+            job.land_path,
+            job.allowed_mat,
+            REMOVE_BTAG=job.remove_btag,
+            REMOVE_SAP_STATUS=job.remove_sap_status,
+            SAP_STATUS_TO_KEEP=job.sap_status_to_keep,
+            force=job.force,
+        )
+        res.tables.append((t3, n3))
+        res.msgs.append(f"{job.label}: {t3} (Land) = {n3:,} rows")
+
+        # Joint Pole – shared file, filtered by each program's ALLOWED_MAT
+        tbl, n = pull_joint_pole_data(job.db_path, job.joint_path, job.allowed_mat, force=job.force)
+        res.tables.append((tbl, n))
+        res.msgs.append(f"{job.label}: {tbl} (Joint Pole) = {n:,} rows")
+    except Exception as e:
+        res.error = f"{type(e).__name__}: {e}"
+        res.traceback = traceback.format_exc()
+    # Whatever was loaded is committed; tidy up after it either way
+    maintain_db(job.db_path, "extract")
+    res.duration_s = time.perf_counter() - t0
+    return res
+
+
+# source -> (sheet, columns) exactly as the parsers ask read_excel_cached() for them
+_SHARED_READS: Dict[str, Tuple[str, List[str]]] = {
+    "EPW": (EPW_SHEET, EPW_COLUMNS),
+    "LAND": (LAND_SHEET, LAND_COLUMNS),
+    "JOINT_POLE": (JOINT_POLE_SHEET, JOINT_POLE_COLUMNS),
+}
+
+
+def warm_shared_sources(jobs: Sequence[ExtractJob]) -> List[str]:
+    """
+    Parse each shared workbook that more than one job will actually read (manifest
+    says changed, or force) into the source cache. Best-effort: a workbook that
+    fails here is left for the workers to report. Returns the paths warmed.
+    """
+    readers: Dict[Tuple[str, str], int] = {}
+    for job in jobs:
+        args = _parse_args(job)
+        for source in _SHARED_READS:
+            path = args[source][0]
+            if not job.force and unchanged_rows(job.db_path, source, path, _params(source, args[source])) is not None:
+                continue
+            key = (source, os.path.abspath(path))
+            readers[key] = readers.get(key, 0) + 1
+
+    warmed = []
+    for (source, path), n in readers.items():
+        if n < 2:
+            continue
+        sheet, columns = _SHARED_READS[source]
+        try:
+            read_excel_cached(path, sheet, columns=columns)
+            warmed.append(path)
+        except Exception:
+            pass
+    return warmed
+
+
+def run_extractions(
+    jobs: Sequence[ExtractJob],
+    max_workers: Optional[int] = None,
+    on_result: Optional[Callable[[ExtractResult], None]] = None,
+) -> List[ExtractResult]:
+    """
+    Run extract_program() for every job and return results in job order.
+    max_workers <= 1 runs in-process (no pool); otherwise the shared workbooks are
+    warmed in the source cache before the pool starts. on_result is called (in this
+    thread) as each program finishes.
+    """
+    workers = default_workers() if max_workers is None else int(max_workers)
+    workers = max(1, min(workers, len(jobs) or 1))
+
+    by_label = {}
+    if workers == 1:
+        for job in jobs:
+            res = extract_program(job)
+            by_label[job.label] = res
+            if on_result is not None:
+                on_result(res)
+    else:
+        warm_shared_sources(jobs)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(extract_program, job): job for job in jobs}
+            for fut in as_completed(futures):
+                job = futures[fut]
+                try:
+                    res = fut.result()
+                except Exception as e:
+                    # Worker died / result couldn't be sent back (BrokenProcessPool etc.)
+                    res = ExtractResult(
+                        label=job.label,
+                        error=f"{type(e).__name__}: {e}",
+                        traceback=traceback.format_exc(),
+                    )
+                by_label[job.label] = res
+                if on_result is not None:
+                    on_result(res)
+
+    return [by_label[job.label] for job in jobs]
+
+
+# ------------------------
+# One program, workbooks parsed concurrently
+# ------------------------
+# source -> (table, display name, parser, writer); order is the order results are listed
+_SOURCES: Dict[str, Tuple[str, str, Callable[..., pd.DataFrame], Callable[..., Tuple[str, int]]]] = {
+    "SAP": ("sap_data", "SAP", parse_sap_data, write_sap_data),
+    "EPW": ("epw_data", "EPW", parse_epw_data, write_epw_data),
+    "LAND": ("land_data", "Land", parse_land_data, write_land_data),
+    "JOINT_POLE": ("joint_pole_data", "Joint Pole", parse_joint_pole_data, write_joint_pole_data),
+}
+
+
+def _parse_args(job: ExtractJob) -> Dict[str, tuple]:
+    """Positional args for each parser (same filters the serial pulls get)."""
+    filters = (job.allowed_mat, job.remove_btag, job.remove_sap_status, job.sap_status_to_keep)
+    return {
+        "SAP": (job.sap_path,),
+        "EPW": (job.epw_path, *filters),
+        "LAND": (job.land_path, *filters),
+        # Joint Pole only filters on MAT
+        "JOINT_POLE": (job.joint_path, job.allowed_mat, False, False, None),
+    }
+
+
+def _params(source: str, args: tuple) -> str:
+    # Must match the params the pull_* functions record
+    return "" if source == "SAP" else params_key(*args[1:])
+
+
+def _profile(source: str, args: tuple) -> IngestProfile:
+    return IngestProfile(source, args[0], _SOURCES[source][0])
+
+
+def _parse_source(source: str, args: tuple) -> Tuple[str, pd.DataFrame, float, IngestProfile]:
+    """Worker side: parse one workbook, no DB access. The profile travels back with the frame."""
+    prof = _profile(source, args)
+    t0 = time.perf_counter()
+    out = _SOURCES[source][2](*args, profile=prof)
+    return source, out, time.perf_counter() - t0, prof
+
+
+def extract_program_concurrent(job: ExtractJob, max_workers: Optional[int] = None) -> ExtractResult:
+    """
+    Same result as extract_program(), but the four workbooks are parsed in parallel
+    worker processes and written by this process as each one finishes. Sources the
+    manifest says are unchanged are skipped (unless job.force). Never raises.
+    """
+    res = ExtractResult(label=job.label)
+    t0 = time.perf_counter()
+    loaded: Dict[str, int] = {}
+    errors: Dict[str, str] = {}
+    tracebacks: List[str] = []
+
+    try:
+        os.makedirs(os.path.dirname(job.db_path), exist_ok=True)
+        args = _parse_args(job)
+        params = {s: _params(s, a) for s, a in args.items()}
+    except Exception as e:
+        res.error = f"{type(e).__name__}: {e}"
+        res.traceback = traceback.format_exc()
+        res.duration_s = time.perf_counter() - t0
+        return res
+
+    todo = []
+    for source, a in args.items():
+        try:
+            prev = None if job.force else unchanged_rows(job.db_path, source, a[0], params[source])
+        except Exception as e:
+            # Missing / locked workbook or unreadable manifest: report it, keep the others going
+            errors[source] = f"{type(e).__name__}: {e}"
+            tracebacks.append(traceback.format_exc())
+            continue
+        if prev is not None:
+            loaded[source] = prev
+        else:
+            todo.append(source)
+
+    def _write(source: str, out: pd.DataFrame, parse_s: float, prof: IngestProfile) -> None:
+        # Single writer: only ever called from this process
+        try:
+            with ingest_run(job.db_path, source, profile=prof):
+                _tbl, n = _SOURCES[source][3](job.db_path, args[source][0], out, params[source], parse_s, profile=prof)
+            loaded[source] = n
+        except Exception as e:
+            errors[source] = f"{type(e).__name__}: {e}"
+            tracebacks.append(traceback.format_exc())
+
+    def _parse_failed(source: str, e: Exception) -> None:
+        errors[source] = f"{type(e).__name__}: {e}"
+        tracebacks.append(traceback.format_exc())
+        # The worker's partial timings are lost with the exception; log the failure itself
+        record_run(job.db_path, _profile(source, args[source]), error=errors[source])
+
+    workers = default_workers() if max_workers is None else int(max_workers)
+    workers = max(1, min(workers, len(todo) or 1))
+    if workers == 1:
+        for source in todo:
+            try:
+                _s, out, parse_s, prof = _parse_source(source, args[source])
+            except Exception as e:
+                _parse_failed(source, e)
+                continue
+            _write(source, out, parse_s, prof)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_parse_source, s, args[s]): s for s in todo}
+            for fut in as_completed(futures):
+                source = futures[fut]
+                try:
+                    _s, out, parse_s, prof = fut.result()
+                except Exception as e:
+                    _parse_failed(source, e)
+                    continue
+                _write(source, out, parse_s, prof)
+
+    for source, (table, name, _parse, _w) in _SOURCES.items():
+        if source in loaded:
+            res.tables.append((table, loaded[source]))
+            res.msgs.append(f"{job.label}: {table} ({name}) = {loaded[source]:,} rows")
+    if errors:
+        res.error = "; ".join(f"{_SOURCES[s][1]}: {e}" for s, e in errors.items())
+        res.traceback = "\n".join(tracebacks)
+    maintain_db(job.db_path, "extract")
+    res.duration_s = time.perf_counter() - t0
+    return res
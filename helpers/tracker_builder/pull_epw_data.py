@@ -2,11 +2,61 @@
 from __future__ import annotations
 
 import sqlite3
-from typing import Tuple, Set
+import time
+from typing import Optional, Tuple, Set, List
 import pandas as pd
 
+from helpers.tracker_builder.excel_reader import resolve_columns
+from helpers.tracker_builder.source_cache import read_excel_cached
+from services.db.date_normalize import add_date_shadows
+from services.db.bulk_writer import INGEST_JOURNAL_MODE, INGEST_SYNCHRONOUS, bulk_replace
+from services.db.ingest_runs import IngestProfile, ingest_run
+from services.db.arrow_dtypes import cells_to_text, to_text
+from services.db.ingest_manifest import params_key, record_ingest, unchanged_rows
+
 DATE_FMT = "%m/%d/%Y"
 
+# Join keys the tracker builders use on epw_data; built (and ANALYZEd) after every load.
+# The one-row-per-order picks only need MIN(rowid) per "Order Number", which the
+# index covers on its own.
+EPW_INDEXES: List[Tuple[str, List[str]]] = [
+    ("idx_epw_ordernum", ["Order Number"]),
+]
+
+# Sheet and columns parse_epw_data() reads (run_extractions() warms the cache with these)
+EPW_SHEET = "Export"
+EPW_COLUMNS: List[str] = [
+    "Division",                       #not needed
+    "Order Number",
+    "Total",                       #not needed
+    "Work Plan Date",                       #not needed
+    "Click Start Date",                       #not needed
+    "LEAPs Expected Out Date",
+    "Order Status",                       #not needed
+    "MAT",
+    "Priority",                       #not needed
+    "LEAPs Status",                       #not needed
+    "EPW Status",                       #not needed
+    "Land Status",                       #not needed
+    "Env Status",                       #not needed
+    "Open Dependency",
+    "WPD Running Lead Time Sufficient?",                       #not needed
+    "WPD Running Lead Time",                       #not needed
+    "Cycle Time",
+    "Last WPD Edit Date",
+    "Epermit Update",
+    "EPW Submit Days in Age",
+    "EPW Expiration Date",
+    "Land Update",                       #not needed
+    "Latest Land Permit Status",                       #not needed
+    "Land Submit Days in Age",                       #not needed
+    "Land Permits Update with Agency",                       #not needed
+    "Enviro Update",                       #not needed
+    "Master Order Created Date",                       #not needed
+    "EPW Project Created Date",                       #not needed
+    "Land/Enviro Created Date"                       #not needed
+]
+
 def _fmt_date(val):
     if pd.isna(val) or str(val).strip() == "":
         return None
@@ -15,88 +65,92 @@ def _fmt_date(val):
         return None
     return dt.strftime(DATE_FMT)
 
-def _ci(df: pd.DataFrame, name: str) -> str | None:
-    name = name.strip().lower()
-    for c in df.columns:
-        if str(c).strip().lower() == name:
-            return c
-    return None
-
-def pull_epw_data(db_path: str, xlsx_path: str, ALLOWED_MAT: Set[str], REMOVE_BTAG: bool = False, REMOVE_SAP_STATUS: bool = False, SAP_STATUS_TO_KEEP: Set[str] = None) -> Tuple[str, int]:
+def parse_epw_data(xlsx_path: str, ALLOWED_MAT: Set[str], REMOVE_BTAG: bool = False, REMOVE_SAP_STATUS: bool = False, SAP_STATUS_TO_KEEP: Set[str] = None, profile: Optional[IngestProfile] = None) -> pd.DataFrame:
     """
     Read Excel 'Export' → normalize to 'epw_data', filter MAT to ALLOWED_MAT.
     Datatypes to store per spec.
     """
-    df = pd.read_excel(xlsx_path, sheet_name="Export")
-
-    wanted = [
-        "Division",                       #not needed
-        "Order Number",
-        "Total",                       #not needed
-        "Work Plan Date",                       #not needed
-        "Click Start Date",                       #not needed
-        "LEAPs Expected Out Date",
-        "Order Status",                       #not needed
-        "MAT",
-        "Priority",                       #not needed
-        "LEAPs Status",                       #not needed
-        "EPW Status",                       #not needed
-        "Land Status",                       #not needed
-        "Env Status",                       #not needed
-        "Open Dependency",
-        "WPD Running Lead Time Sufficient?",                       #not needed
-        "WPD Running Lead Time",                       #not needed
-        "Cycle Time",
-        "Last WPD Edit Date",
-        "Epermit Update",
-        "EPW Submit Days in Age",
-        "EPW Expiration Date",
-        "Land Update",                       #not needed
-        "Latest Land Permit Status",                       #not needed
-        "Land Submit Days in Age",                       #not needed
-        "Land Permits Update with Agency",                       #not needed
-        "Enviro Update",                       #not needed
-        "Master Order Created Date",                       #not needed
-        "EPW Project Created Date",                       #not needed
-        "Land/Enviro Created Date"                       #not needed
-    ]
-    cm = {w: _ci(df, w) for w in wanted}
-    missing = [k for k, v in cm.items() if v is None]
-    if missing:
-        raise ValueError(f"EPW: missing columns {missing}")
-
-    out = pd.DataFrame()
-
-    # numbers
-    out["Order Number"] = pd.to_numeric(df[cm["Order Number"]], errors="coerce").astype("Int64")
-    out["Total"] = pd.to_numeric(df[cm["Total"]], errors="coerce")
-    out["WPD Running Lead Time"] = pd.to_numeric(df[cm["WPD Running Lead Time"]], errors="coerce")
-    out["Cycle Time"] = pd.to_numeric(df[cm["Cycle Time"]], errors="coerce")
-    out["EPW Submit Days in Age"] = pd.to_numeric(df[cm["EPW Submit Days in Age"]], errors="coerce")
-    out["Land Submit Days in Age"] = pd.to_numeric(df[cm["Land Submit Days in Age"]], errors="coerce")
-
-    # dates
-    for col in ["Work Plan Date","Click Start Date","LEAPs Expected Out Date","Last WPD Edit Date",
-                "EPW Expiration Date","Master Order Created Date","EPW Project Created Date","Land/Enviro Created Date"]:
-        out[col] = df[cm[col]].apply(_fmt_date)
-
-    # strings
-    for col in ["Division","Order Status","MAT","Priority","LEAPs Status","EPW Status","Land Status","Env Status",
-                "Open Dependency","WPD Running Lead Time Sufficient?","Epermit Update","Land Update",
-                "Latest Land Permit Status","Land Permits Update with Agency","Enviro Update"]:
-        out[col] = df[cm[col]].astype(str).where(df[cm[col]].notna(), None)
-
-    # filter MAT and clean
-    out = out[out["MAT"].str.upper().isin(ALLOWED_MAT)]
-    out = out.dropna(subset=["Order Number"])
-
-    if REMOVE_BTAG:
-        out = out[out["Priority"] != "B"]
-
-    if REMOVE_SAP_STATUS:
-        out = out[out["Order Status"].str.upper().isin(SAP_STATUS_TO_KEEP)]
-
-    with sqlite3.connect(db_path) as conn:
-        out.to_sql("epw_data", conn, if_exists="replace", index=False)
+    wanted = EPW_COLUMNS
+    prof = profile if profile is not None else IngestProfile("EPW", xlsx_path, "epw_data")
+
+    # Parse only the columns we keep; names resolved case-insensitively
+    with prof.stage("read"):
+        df = read_excel_cached(xlsx_path, EPW_SHEET, columns=wanted)
+    with prof.stage("resolve"):
+        cm = resolve_columns(df.columns, wanted)
+        missing = [k for k, v in cm.items() if v is None]
+        if missing:
+            raise ValueError(f"EPW: missing columns {missing}")
+
+    with prof.stage("coerce"):
+        out = pd.DataFrame()
+
+        # numbers
+        out["Order Number"] = pd.to_numeric(df[cm["Order Number"]], errors="coerce").astype("Int64")
+        out["Total"] = pd.to_numeric(df[cm["Total"]], errors="coerce")
+        out["WPD Running Lead Time"] = pd.to_numeric(df[cm["WPD Running Lead Time"]], errors="coerce")
+        out["Cycle Time"] = pd.to_numeric(df[cm["Cycle Time"]], errors="coerce")
+        out["EPW Submit Days in Age"] = pd.to_numeric(df[cm["EPW Submit Days in Age"]], errors="coerce")
+        out["Land Submit Days in Age"] = pd.to_numeric(df[cm["Land Submit Days in Age"]], errors="coerce")
+
+        # dates
+        date_cols = ["Work Plan Date","Click Start Date","LEAPs Expected Out Date","Last WPD Edit Date",
+                     "EPW Expiration Date","Master Order Created Date","EPW Project Created Date","Land/Enviro Created Date"]
+        for col in date_cols:
+            out[col] = to_text(df[cm[col]].apply(_fmt_date))
+
+        # strings
+        for col in ["Division","Order Status","MAT","Priority","LEAPs Status","EPW Status","Land Status","Env Status",
+                    "Open Dependency","WPD Running Lead Time Sufficient?","Epermit Update","Land Update",
+                    "Latest Land Permit Status","Land Permits Update with Agency","Enviro Update"]:
+            out[col] = cells_to_text(df[cm[col]])
+
+        # ISO / Julian-day companions for every date column
+        add_date_shadows(out, date_cols)
+
+    with prof.stage("filter"):
+        # filter MAT and clean
+        out = out[out["MAT"].str.upper().isin(ALLOWED_MAT)]
+        out = out.dropna(subset=["Order Number"])
+
+        if REMOVE_BTAG:
+            out = out[out["Priority"] != "B"]
+
+        if REMOVE_SAP_STATUS:
+            out = out[out["Order Status"].str.upper().isin(SAP_STATUS_TO_KEEP)]
+
+    prof.count(len(df), len(out))
+
+    return out
+
+
+def write_epw_data(db_path: str, xlsx_path: str, out: pd.DataFrame, params: str = "", parse_s: float = 0.0, profile: Optional[IngestProfile] = None) -> Tuple[str, int]:
+    """
+    Replace 'epw_data' with a parsed frame and record the ingest (parse_s = parse time).
+    The write is added to `profile` as its "write" stage; the caller records the ingest_runs row.
+    """
+    prof = profile if profile is not None else IngestProfile("EPW", xlsx_path, "epw_data")
+    t0 = time.perf_counter()
+    with prof.stage("write"), sqlite3.connect(db_path) as conn:
+        bulk_replace(
+            conn, "epw_data", out, indexes=EPW_INDEXES,
+            journal_mode=INGEST_JOURNAL_MODE, synchronous=INGEST_SYNCHRONOUS, analyze=True,
+        )
         n = len(out)
+    record_ingest(db_path, "EPW", xlsx_path, "epw_data", n, parse_s + time.perf_counter() - t0, params)
     return "epw_data", n
+
+
+def pull_epw_data(db_path: str, xlsx_path: str, ALLOWED_MAT: Set[str], REMOVE_BTAG: bool = False, REMOVE_SAP_STATUS: bool = False, SAP_STATUS_TO_KEEP: Set[str] = None, force: bool = False) -> Tuple[str, int]:
+    """parse_epw_data() + write_epw_data(); skips the file if the manifest says it's unchanged."""
+    # Skip the load if this exact file (and filter set) is already in the DB
+    params = params_key(ALLOWED_MAT, REMOVE_BTAG, REMOVE_SAP_STATUS, SAP_STATUS_TO_KEEP)
+    if not force:
+        prev = unchanged_rows(db_path, "EPW", xlsx_path, params)
+        if prev is not None:
+            return "epw_data", prev
+    t0 = time.perf_counter()
+
+    with ingest_run(db_path, "EPW", xlsx_path, "epw_data") as prof:
+        out = parse_epw_data(xlsx_path, ALLOWED_MAT, REMOVE_BTAG, REMOVE_SAP_STATUS, SAP_STATUS_TO_KEEP, profile=prof)
+        return write_epw_data(db_path, xlsx_path, out, params, time.perf_counter() - t0, profile=prof)
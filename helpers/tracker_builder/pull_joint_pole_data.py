@@ -2,11 +2,49 @@
 from __future__ import annotations
 
 import sqlite3
-from typing import Tuple, Set
+import time
+from typing import Tuple, Set, List
 import pandas as pd
 
+from helpers.tracker_builder.excel_reader import resolve_columns
+from helpers.tracker_builder.source_cache import read_excel_cached
+from services.db.date_normalize import add_date_shadows
+from services.db.bulk_writer import INGEST_JOURNAL_MODE, INGEST_SYNCHRONOUS, bulk_replace
+from services.db.ingest_runs import IngestProfile, ingest_run
+from services.db.arrow_dtypes import cells_to_text, to_text
+from services.db.ingest_manifest import params_key, record_ingest, unchanged_rows
+
 DATE_FMT = "%m/%d/%Y"
 
+# Join keys the tracker builders use on joint_pole_data; built (and ANALYZEd) after
+# every load. Covers the Joint Pole tracker's "Order No" IN (...) read completely.
+JOINT_POLE_INDEXES: List[Tuple[str, List[str]]] = [
+    ("idx_joint_pole_order", ["Order No", "Primary Intent Status", "Status Date", "Due By", "Last Chgd"]),
+]
+
+# Sheet and columns parse_joint_pole_data() reads (run_extractions() warms the cache with these)
+JOINT_POLE_SHEET = "Sheet1"
+JOINT_POLE_COLUMNS: List[str] = [
+    "Order No",
+    "Intent No",
+    "REV",
+    "Primary Intent Status",
+    "Secondary Intent Status",
+    "Status Date",
+    "Due By",
+    "Pre-App",
+    "Last Chgd",
+    "Chgd By",
+    "Prep. By",
+    "ORDER Short Desc",
+    "ORDER Stat",
+    "Taxing",
+    "Child Intent",
+    "MAT code",
+    "Community",
+    "Location Count",
+]
+
 
 def _fmt_date(val):
     """Normalize any Excel-ish date into MM/DD/YYYY string or None."""
@@ -18,27 +56,14 @@ def _fmt_date(val):
     return dt.strftime(DATE_FMT)
 
 
-def _ci(df: pd.DataFrame, name: str) -> str | None:
-    """
-    Case-insensitive column finder.
-    Returns the actual column name in df that matches `name` (ignoring case/whitespace),
-    or None if not found.
-    """
-    name = name.strip().lower()
-    for c in df.columns:
-        if str(c).strip().lower() == name:
-            return c
-    return None
-
-
-def pull_joint_pole_data(
-    db_path: str,
+def parse_joint_pole_data(
     xlsx_path: str,
     ALLOWED_MAT: Set[str],
     REMOVE_BTAG: bool = False,
     REMOVE_SAP_STATUS: bool = False,
     SAP_STATUS_TO_KEEP: Set[str] | None = None,
-) -> Tuple[str, int]:
+    profile: IngestProfile | None = None,
+) -> pd.DataFrame:
     """
     Read Excel 'Sheet1' -> normalize to 'joint_pole_data'.
 
@@ -68,65 +93,93 @@ def pull_joint_pole_data(
     - Filter to ALLOWED_MAT using 'MAT code' (case-insensitive).
     - Existing 'joint_pole_data' table is fully replaced on each ingest.
     """
-    df = pd.read_excel(xlsx_path, sheet_name="Sheet1")
-
-    wanted = [
-        "Order No",
-        "Intent No",
-        "REV",
-        "Primary Intent Status",
-        "Secondary Intent Status",
-        "Status Date",
-        "Due By",
-        "Pre-App",
-        "Last Chgd",
-        "Chgd By",
-        "Prep. By",
-        "ORDER Short Desc",
-        "ORDER Stat",
-        "Taxing",
-        "Child Intent",
-        "MAT code",
-        "Community",
-        "Location Count",
-    ]
-
-    cm = {w: _ci(df, w) for w in wanted}
-    missing = [k for k, v in cm.items() if v is None]
-    if missing:
-        raise ValueError(f"Joint Pole: missing columns {missing}")
-
-    out = pd.DataFrame()
-
-    # numeric key (can be non-unique)
-    out["Order No"] = pd.to_numeric(df[cm["Order No"]], errors="coerce").astype("Int64")
-
-    # date-like columns
-    date_cols = ["Status Date", "Due By", "Pre-App", "Last Chgd"]
-    for col in date_cols:
-        out[col] = df[cm[col]].apply(_fmt_date)
-
-    # everything else as strings
-    string_cols = [c for c in wanted if c not in (["Order No"] + date_cols)]
-    for col in string_cols:
-        src = df[cm[col]]
-        out[col] = src.astype(str).where(src.notna(), None)
-
-    # Filter MAT against allowed set (case-insensitive)
-    out = out[out["MAT code"].astype(str).str.upper().isin(ALLOWED_MAT)]
-
-    # Drop rows with no Order No
-    out = out.dropna(subset=["Order No"])
-
-    # Optional generic filters (kept for reuse in other programs)
-    if REMOVE_BTAG and "Priority" in out.columns:
-        out = out[out["Priority"] != "B"]
-
-    if REMOVE_SAP_STATUS and SAP_STATUS_TO_KEEP and "Order Status" in out.columns:
-        out = out[out["Order Status"].astype(str).str.upper().isin(SAP_STATUS_TO_KEEP)]
-
-    with sqlite3.connect(db_path) as conn:
-        out.to_sql("joint_pole_data", conn, if_exists="replace", index=False)
-        n = len(out)
+    wanted = JOINT_POLE_COLUMNS
+
+    prof = profile if profile is not None else IngestProfile("JOINT_POLE", xlsx_path, "joint_pole_data")
+
+    # Parse only the columns we keep; names resolved case-insensitively
+    with prof.stage("read"):
+        df = read_excel_cached(xlsx_path, JOINT_POLE_SHEET, columns=wanted)
+    with prof.stage("resolve"):
+        cm = resolve_columns(df.columns, wanted)
+        missing = [k for k, v in cm.items() if v is None]
+        if missing:
+            raise ValueError(f"Joint Pole: missing columns {missing}")
+
+    with prof.stage("coerce"):
+        out = pd.DataFrame()
+
+        # numeric key (can be non-unique)
+        out["Order No"] = pd.to_numeric(df[cm["Order No"]], errors="coerce").astype("Int64")
+
+        # date-like columns
+        date_cols = ["Status Date", "Due By", "Pre-App", "Last Chgd"]
+        for col in date_cols:
+            out[col] = to_text(df[cm[col]].apply(_fmt_date))
+
+        # everything else as strings
+        string_cols = [c for c in wanted if c not in (["Order No"] + date_cols)]
+        for col in string_cols:
+            src = df[cm[col]]
+            out[col] = cells_to_text(src)
+
+        # ISO / Julian-day companions for the date columns
+        add_date_shadows(out, date_cols)
+
+    with prof.stage("filter"):
+        # Filter MAT against allowed set (case-insensitive)
+        out = out[out["MAT code"].str.upper().isin(ALLOWED_MAT)]
+
+        # Drop rows with no Order No
+        out = out.dropna(subset=["Order No"])
 
+        # Optional generic filters (kept for reuse in other programs)
+        if REMOVE_BTAG and "Priority" in out.columns:
+            out = out[out["Priority"] != "B"]
+
+        if REMOVE_SAP_STATUS and SAP_STATUS_TO_KEEP and "Order Status" in out.columns:
+            out = out[out["Order Status"].str.upper().isin(SAP_STATUS_TO_KEEP)]
+
+    prof.count(len(df), len(out))
+
+    return out
+
+
+def write_joint_pole_data(db_path: str, xlsx_path: str, out: pd.DataFrame, params: str = "", parse_s: float = 0.0, profile: IngestProfile | None = None) -> Tuple[str, int]:
+    """
+    Replace 'joint_pole_data' with a parsed frame and record the ingest (parse_s = parse time).
+    The write is added to `profile` as its "write" stage; the caller records the ingest_runs row.
+    """
+    prof = profile if profile is not None else IngestProfile("JOINT_POLE", xlsx_path, "joint_pole_data")
+    t0 = time.perf_counter()
+    with prof.stage("write"), sqlite3.connect(db_path) as conn:
+        bulk_replace(
+            conn, "joint_pole_data", out, indexes=JOINT_POLE_INDEXES,
+            journal_mode=INGEST_JOURNAL_MODE, synchronous=INGEST_SYNCHRONOUS, analyze=True,
+        )
+        n = len(out)
+    record_ingest(db_path, "JOINT_POLE", xlsx_path, "joint_pole_data", n, parse_s + time.perf_counter() - t0, params)
     return "joint_pole_data", n
+
+
+def pull_joint_pole_data(
+    db_path: str,
+    xlsx_path: str,
+    ALLOWED_MAT: Set[str],
+    REMOVE_BTAG: bool = False,
+    REMOVE_SAP_STATUS: bool = False,
+    SAP_STATUS_TO_KEEP: Set[str] | None = None,
+    force: bool = False,
+) -> Tuple[str, int]:
+    """parse_joint_pole_data() + write_joint_pole_data(); skips the file if the manifest says it's unchanged."""
+    # Skip the load if this exact file (and filter set) is already in the DB
+    params = params_key(ALLOWED_MAT, REMOVE_BTAG, REMOVE_SAP_STATUS, SAP_STATUS_TO_KEEP)
+    if not force:
+        prev = unchanged_rows(db_path, "JOINT_POLE", xlsx_path, params)
+        if prev is not None:
+            return "joint_pole_data", prev
+    t0 = time.perf_counter()
+
+    with ingest_run(db_path, "JOINT_POLE", xlsx_path, "joint_pole_data") as prof:
+        out = parse_joint_pole_data(xlsx_path, ALLOWED_MAT, REMOVE_BTAG, REMOVE_SAP_STATUS, SAP_STATUS_TO_KEEP, profile=prof)
+        return write_joint_pole_data(db_path, xlsx_path, out, params, time.perf_counter() - t0, profile=prof)
@@ -2,11 +2,78 @@
 from __future__ import annotations
 
 import sqlite3
-from typing import Tuple, Set
+import time
+from typing import Optional, Tuple, Set, List
 import pandas as pd
 
+from helpers.tracker_builder.excel_reader import resolve_columns
+from helpers.tracker_builder.source_cache import read_excel_cached
+from services.db.date_normalize import add_date_shadows, iso_col
+from services.db.bulk_writer import INGEST_JOURNAL_MODE, INGEST_SYNCHRONOUS, bulk_replace
+from services.db.ingest_runs import IngestProfile, ingest_run
+from services.db.arrow_dtypes import cells_to_text, to_text
+from services.db.ingest_manifest import params_key, record_ingest, unchanged_rows
+
 DATE_FMT = "%m/%d/%Y"
 
+# Join keys the tracker builders use on land_data; built (and ANALYZEd) after every load.
+# The latest-row-per-Order picks (MAX created date, else MIN rowid) are answered
+# from (Order, Permit Created Date ISO shadow) without touching the table.
+LAND_INDEXES: List[Tuple[str, List[str]]] = [
+    ("idx_land_order_created", ["Order", iso_col("Permit Created Date")]),
+]
+
+# Sheet and columns parse_land_data() reads (run_extractions() warms the cache with these)
+LAND_SHEET = "Export"
+LAND_COLUMNS: List[str] = [
+    "Order",                #needed
+    "Notification",
+    "Name",
+    "User Status",
+    "SP57 Status",
+    "RP57 Status",
+    "Land Surveying Status",
+    "Land Mgmt Project Status",
+    "Land Mgmt Project Status Comments",
+    "Land Returned to LOB Details",
+    "MAT Code",
+    "Priority",
+    "Est Req",
+    "Est Resource",
+    "Est Sup",
+    "Est Name",
+    "Estimator",
+    "Permit Owner Name",
+    "Job Owner",
+    "Permit Status",                #needed
+    "Permit Land Intake Status",
+    "Permit Type",                #needed
+    "Permit Name",
+    "Permit Comment",
+    "Return to LOB Reason",
+    "Anticipated Application",                #needed
+    "Anticipated Issued Date",                #needed
+    "Application Date",                #needed
+    "Permit Issued Date",                #needed
+    "Permit Expiration",                #needed
+    "DSDD Required",
+    "DSDD Tasks",
+    "Permit Rider",
+    "Permit Rider Type",
+    "Permit Rider Comment",
+    "Permit Agency",
+    "Annual Permit",                #needed
+    "Long Lead Permit",                #needed
+    "Long Lead Permit Reason",
+    "Exception to Policy",
+    "Exception to Policy Status",
+    "Exception to Policy Status Comment",
+    "Scope of work comments",
+    "Record Type Name",
+    "Project Land Scope Comments",
+    "Permit Created Date"
+]
+
 def _fmt_date(val):
     if pd.isna(val) or str(val).strip() == "":
         return None
@@ -15,102 +82,86 @@ def _fmt_date(val):
         return None
     return dt.strftime(DATE_FMT)
 
-def _ci(df: pd.DataFrame, name: str) -> str | None:
-    name = name.strip().lower()
-    for c in df.columns:
-        if str(c).strip().lower() == name:
-            return c
-    return None
-
-def pull_land_data(db_path: str, xlsx_path: str, ALLOWED_MAT: Set[str], REMOVE_BTAG: bool = False, REMOVE_SAP_STATUS: bool = False, SAP_STATUS_TO_KEEP: Set[str] = None) -> Tuple[str, int]:
+def parse_land_data(xlsx_path: str, ALLOWED_MAT: Set[str], REMOVE_BTAG: bool = False, REMOVE_SAP_STATUS: bool = False, SAP_STATUS_TO_KEEP: Set[str] = None, profile: Optional[IngestProfile] = None) -> pd.DataFrame:
     """
     Read Excel 'Export' → normalize to 'land_data', filter MAT Code to ALLOWED_MAT.
     """
-    df = pd.read_excel(xlsx_path, sheet_name="Export")
-
-    names = [
-        "Order",                #needed
-        "Notification",
-        "Name",
-        "User Status",
-        "SP57 Status",
-        "RP57 Status",
-        "Land Surveying Status",
-        "Land Mgmt Project Status",
-        "Land Mgmt Project Status Comments",
-        "Land Returned to LOB Details",
-        "MAT Code",
-        "Priority",
-        "Est Req",
-        "Est Resource",
-        "Est Sup",
-        "Est Name",
-        "Estimator",
-        "Permit Owner Name",
-        "Job Owner",
-        "Permit Status",                #needed
-        "Permit Land Intake Status",
-        "Permit Type",                #needed
-        "Permit Name",
-        "Permit Comment",
-        "Return to LOB Reason",
-        "Anticipated Application",                #needed
-        "Anticipated Issued Date",                #needed
-        "Application Date",                #needed
-        "Permit Issued Date",                #needed
-        "Permit Expiration",                #needed
-        "DSDD Required",
-        "DSDD Tasks",
-        "Permit Rider",
-        "Permit Rider Type",
-        "Permit Rider Comment",
-        "Permit Agency",
-        "Annual Permit",                #needed
-        "Long Lead Permit",                #needed
-        "Long Lead Permit Reason",
-        "Exception to Policy",
-        "Exception to Policy Status",
-        "Exception to Policy Status Comment",
-        "Scope of work comments",
-        "Record Type Name",
-        "Project Land Scope Comments",
-        "Permit Created Date"
-    ]
-    cm = {n: _ci(df, n) for n in names}
-    missing = [k for k, v in cm.items() if v is None]
-    if missing:
-        raise ValueError(f"LAND: missing columns {missing}")
-
-    out = pd.DataFrame()
-
-    # numeric
-    out["Order"] = pd.to_numeric(df[cm["Order"]], errors="coerce").astype("Int64")
-    out["Notification"] = pd.to_numeric(df[cm["Notification"]], errors="coerce").astype("Int64")
-
-    # strings
-    str_cols = [c for c in names if c not in {
-        "Order","Notification","Anticipated Application","Anticipated Issued Date",
-        "Application Date","Permit Issued Date","Permit Expiration","Permit Created Date"
-    }]
-    for c in str_cols:
-        out[c] = df[cm[c]].astype(str).where(df[cm[c]].notna(), None)
-
-    # dates
-    for c in ["Anticipated Application","Anticipated Issued Date","Application Date",
-              "Permit Issued Date","Permit Expiration","Permit Created Date"]:
-        out[c] = df[cm[c]].apply(_fmt_date)
-
-    # filter
-    out = out[out["MAT Code"].str.upper().isin(ALLOWED_MAT)]
-    out = out.dropna(subset=["Order"])
-
-    if REMOVE_BTAG:
-        out = out[out["Priority"] != "B"]
-
-    if REMOVE_SAP_STATUS:
-        out = out[out["User Status"].str.upper().isin(SAP_STATUS_TO_KEEP)]
-
-    with sqlite3.connect(db_path) as conn:
-        out.to_sql("land_data", conn, if_exists="replace", index=False)
+    names = LAND_COLUMNS
+    prof = profile if profile is not None else IngestProfile("LAND", xlsx_path, "land_data")
+
+    # Parse only the columns we keep; names resolved case-insensitively
+    with prof.stage("read"):
+        df = read_excel_cached(xlsx_path, LAND_SHEET, columns=names)
+    with prof.stage("resolve"):
+        cm = resolve_columns(df.columns, names)
+        missing = [k for k, v in cm.items() if v is None]
+        if missing:
+            raise ValueError(f"LAND: missing columns {missing}")
+
+    with prof.stage("coerce"):
+        out = pd.DataFrame()
+
+        # numeric
+        out["Order"] = pd.to_numeric(df[cm["Order"]], errors="coerce").astype("Int64")
+        out["Notification"] = pd.to_numeric(df[cm["Notification"]], errors="coerce").astype("Int64")
+
+        # strings
+        str_cols = [c for c in names if c not in {
+            "Order","Notification","Anticipated Application","Anticipated Issued Date",
+            "Application Date","Permit Issued Date","Permit Expiration","Permit Created Date"
+        }]
+        for c in str_cols:
+            out[c] = cells_to_text(df[cm[c]])
+
+        # dates (+ ISO / Julian-day companions)
+        date_cols = ["Anticipated Application","Anticipated Issued Date","Application Date",
+                     "Permit Issued Date","Permit Expiration","Permit Created Date"]
+        for c in date_cols:
+            out[c] = to_text(df[cm[c]].apply(_fmt_date))
+        add_date_shadows(out, date_cols)
+
+    with prof.stage("filter"):
+        out = out[out["MAT Code"].str.upper().isin(ALLOWED_MAT)]
+        out = out.dropna(subset=["Order"])
+
+        if REMOVE_BTAG:
+            out = out[out["Priority"] != "B"]
+
+        if REMOVE_SAP_STATUS:
+            out = out[out["User Status"].str.upper().isin(SAP_STATUS_TO_KEEP)]
+
+    prof.count(len(df), len(out))
+
+    return out
+
+
+def write_land_data(db_path: str, xlsx_path: str, out: pd.DataFrame, params: str = "", parse_s: float = 0.0, profile: Optional[IngestProfile] = None) -> Tuple[str, int]:
+    """
+    Replace 'land_data' with a parsed frame and record the ingest (parse_s = parse time).
+    The write is added to `profile` as its "write" stage; the caller records the ingest_runs row.
+    """
+    prof = profile if profile is not None else IngestProfile("LAND", xlsx_path, "land_data")
+    t0 = time.perf_counter()
+    with prof.stage("write"), sqlite3.connect(db_path) as conn:
+        bulk_replace(
+            conn, "land_data", out, indexes=LAND_INDEXES,
+            journal_mode=INGEST_JOURNAL_MODE, synchronous=INGEST_SYNCHRONOUS, analyze=True,
+        )
         n = len(out)
+    record_ingest(db_path, "LAND", xlsx_path, "land_data", n, parse_s + time.perf_counter() - t0, params)
     return "land_data", n
+
+
+def pull_land_data(db_path: str, xlsx_path: str, ALLOWED_MAT: Set[str], REMOVE_BTAG: bool = False, REMOVE_SAP_STATUS: bool = False, SAP_STATUS_TO_KEEP: Set[str] = None, force: bool = False) -> Tuple[str, int]:
+    """parse_land_data() + write_land_data(); skips the file if the manifest says it's unchanged."""
+    # Skip the load if this exact file (and filter set) is already in the DB
+    params = params_key(ALLOWED_MAT, REMOVE_BTAG, REMOVE_SAP_STATUS, SAP_STATUS_TO_KEEP)
+    if not force:
+        prev = unchanged_rows(db_path, "LAND", xlsx_path, params)
+        if prev is not None:
+            return "land_data", prev
+    t0 = time.perf_counter()
+
+    with ingest_run(db_path, "LAND", xlsx_path, "land_data") as prof:
+        out = parse_land_data(xlsx_path, ALLOWED_MAT, REMOVE_BTAG, REMOVE_SAP_STATUS, SAP_STATUS_TO_KEEP, profile=prof)
+        return write_land_data(db_path, xlsx_path, out, params, time.perf_counter() - t0, profile=prof)
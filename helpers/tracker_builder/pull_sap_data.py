@@ -2,11 +2,26 @@
 from __future__ import annotations
 
 import sqlite3
-from typing import Tuple
+import time
+from typing import Optional, Tuple, List
 import pandas as pd
 
+from helpers.tracker_builder.excel_reader import resolve_columns
+from helpers.tracker_builder.source_cache import read_excel_cached
+from services.db.bulk_writer import INGEST_JOURNAL_MODE, INGEST_SYNCHRONOUS, bulk_replace
+from services.db.ingest_runs import IngestProfile, ingest_run
+from services.db.arrow_dtypes import cells_to_text, to_text
+from services.db.ingest_manifest import record_ingest, unchanged_rows
+
 DATE_FMT = "%m/%d/%Y"
 
+# Join keys the tracker builders use on sap_data; built (and ANALYZEd) after every load.
+# (Order, Code, TaskUsrStatus) covers the code pivot's per-order lookups and also
+# serves plain "Order" = ? reads through its prefix.
+SAP_INDEXES: List[Tuple[str, List[str]]] = [
+    ("idx_sap_order_code_tus", ["Order", "Code", "TaskUsrStatus"]),
+]
+
 def _fmt_date(val):
     if pd.isna(val) or str(val).strip() == "":
         return None
@@ -15,44 +30,66 @@ def _fmt_date(val):
         return None
     return dt.strftime(DATE_FMT)
 
-def _ci(df: pd.DataFrame, name: str) -> str | None:
-    name = name.strip().lower()
-    for c in df.columns:
-        if str(c).strip().lower() == name:
-            return c
-    return None
-
-def pull_sap_data(db_path: str, xlsx_path: str) -> Tuple[str, int]:
+def parse_sap_data(xlsx_path: str, profile: Optional[IngestProfile] = None) -> pd.DataFrame:
     """
     Read Excel 'Sheet1' and store normalized columns in 'sap_data'.
     Store datatypes as:
       Order:number, Code:str, ActualStart:date, Completed On:date, TaskUsrStatus:str, Completed By:str
     """
-    df = pd.read_excel(xlsx_path, sheet_name="Sheet1")
-
-    cm = {
-        "Order": _ci(df, "Order"),
-        "Code": _ci(df, "Code"),
-        "ActualStart": _ci(df, "ActualStart"),
-        "Completed On": _ci(df, "Completed On"),
-        "TaskUsrStatus": _ci(df, "TaskUsrStatus"),
-        "Completed By": _ci(df, "Completed By"),
-    }
-    missing = [k for k, v in cm.items() if v is None]
-    if missing:
-        raise ValueError(f"SAP: missing columns {missing}")
-
-    out = pd.DataFrame()
-    out["Order"] = pd.to_numeric(df[cm["Order"]], errors="coerce").astype("Int64")
-    out["Code"] = df[cm["Code"]].astype(str).where(df[cm["Code"]].notna(), None)
-    out["ActualStart"] = df[cm["ActualStart"]].apply(_fmt_date)
-    out["Completed On"] = df[cm["Completed On"]].apply(_fmt_date)
-    out["TaskUsrStatus"] = df[cm["TaskUsrStatus"]].astype(str).where(df[cm["TaskUsrStatus"]].notna(), None)
-    out["Completed By"] = df[cm["Completed By"]].astype(str).where(df[cm["Completed By"]].notna(), None)
-
-    out = out.dropna(subset=["Order"])
-
-    with sqlite3.connect(db_path) as conn:
-        out.to_sql("sap_data", conn, if_exists="replace", index=False)
+    wanted = ["Order", "Code", "ActualStart", "Completed On", "TaskUsrStatus", "Completed By"]
+    prof = profile if profile is not None else IngestProfile("SAP", xlsx_path, "sap_data")
+    with prof.stage("read"):
+        df = read_excel_cached(xlsx_path, "Sheet1", columns=wanted)
+    with prof.stage("resolve"):
+        cm = resolve_columns(df.columns, wanted)
+        missing = [k for k, v in cm.items() if v is None]
+        if missing:
+            raise ValueError(f"SAP: missing columns {missing}")
+
+    with prof.stage("coerce"):
+        out = pd.DataFrame()
+        out["Order"] = pd.to_numeric(df[cm["Order"]], errors="coerce").astype("Int64")
+        out["Code"] = cells_to_text(df[cm["Code"]])
+        out["ActualStart"] = to_text(df[cm["ActualStart"]].apply(_fmt_date))
+        out["Completed On"] = to_text(df[cm["Completed On"]].apply(_fmt_date))
+        out["TaskUsrStatus"] = cells_to_text(df[cm["TaskUsrStatus"]])
+        out["Completed By"] = cells_to_text(df[cm["Completed By"]])
+
+    with prof.stage("filter"):
+        out = out.dropna(subset=["Order"])
+
+    prof.count(len(df), len(out))
+
+    return out
+
+
+def write_sap_data(db_path: str, xlsx_path: str, out: pd.DataFrame, params: str = "", parse_s: float = 0.0, profile: Optional[IngestProfile] = None) -> Tuple[str, int]:
+    """
+    Replace 'sap_data' with a parsed frame and record the ingest (parse_s = parse time).
+    The write is added to `profile` as its "write" stage; the caller records the ingest_runs row.
+    """
+    prof = profile if profile is not None else IngestProfile("SAP", xlsx_path, "sap_data")
+    t0 = time.perf_counter()
+    with prof.stage("write"), sqlite3.connect(db_path) as conn:
+        bulk_replace(
+            conn, "sap_data", out, indexes=SAP_INDEXES,
+            journal_mode=INGEST_JOURNAL_MODE, synchronous=INGEST_SYNCHRONOUS, analyze=True,
+        )
         n = len(out)
+    record_ingest(db_path, "SAP", xlsx_path, "sap_data", n, parse_s + time.perf_counter() - t0, params)
     return "sap_data", n
+
+
+def pull_sap_data(db_path: str, xlsx_path: str, force: bool = False) -> Tuple[str, int]:
+    """parse_sap_data() + write_sap_data(); skips the file if the manifest says it's unchanged."""
+    # Skip the load if this exact file is already in the DB (SAP has no filters)
+    params = ""
+    if not force:
+        prev = unchanged_rows(db_path, "SAP", xlsx_path, params)
+        if prev is not None:
+            return "sap_data", prev
+    t0 = time.perf_counter()
+
+    with ingest_run(db_path, "SAP", xlsx_path, "sap_data") as prof:
+        out = parse_sap_data(xlsx_path, profile=prof)
+        return write_sap_data(db_path, xlsx_path, out, params, time.perf_counter() - t0, profile=prof)
@@ -2,6 +2,9 @@
 from __future__ import annotations
 import sqlite3
 
+from services.db.bulk_writer import create_indexes
+from helpers.tracker_builder.pull_sap_data import SAP_INDEXES
+
 PENDING_STATUSES = {"ESTS", "UNSE", "ADER", "APPR"}  # case-insensitive
 AP_ALLOWED_STATUSES = {"PEND", "UNSC", "CONS"}       # case-insensitive
 
@@ -9,8 +12,8 @@ AP_ALLOWED_STATUSES = {"PEND", "UNSC", "CONS"}       # case-insensitive
 def update_codes_batch(conn: sqlite3.Connection) -> int:
     cur = conn.cursor()
 
-    # Index to speed up sap_data lookups
-    cur.execute('CREATE INDEX IF NOT EXISTS idx_sap_data_order_code ON sap_data("Order","Code")')
+    # sap_data's join-key index (normally built by the SAP load already)
+    create_indexes(conn, "sap_data", SAP_INDEXES)
 
     # --- PIVOT: include PC21 in the code set
     cur.executescript("""
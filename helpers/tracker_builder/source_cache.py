@@ -0,0 +1,209 @@
+# helpers/tracker_builder/source_cache.py
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from helpers.tracker_builder.excel_reader import ci_key, read_excel_columns
+from services.db.ingest_manifest import file_sha256
+
+# ------------------------
+# Parsed-source cache for the shared Excel extracts
+# ------------------------
+# Step 2 reads the same SAP / EPW / Land / Joint Pole workbooks once per program.
+# read_excel_cached() parses each (file content, sheet) once, keeps the frame in
+# memory for the rest of the process and writes a columnar copy under
+# data/source_cache/ so a re-run on unchanged files skips the Excel parse entirely.
+# With `columns`, only those columns are parsed (see excel_reader) and the
+# projection is part of the cache key.
+#
+# Frames are stored as Parquet when every column round-trips cleanly (plain text,
+# numbers, datetimes). Columns with mixed cell types (e.g. numbers and text in the
+# same column) can't be typed for Parquet without changing what read_excel
+# returns, so those workbooks are stored as pickle instead.
+
+CACHE_DIR = os.path.join("data", "source_cache")
+MAX_CACHE_BYTES = 512 * 1024 * 1024      # on-disk budget; oldest entries evicted first
+MAX_MEMO_ENTRIES = 8                     # parsed frames kept in-process
+
+_lock = threading.Lock()
+_memo: "OrderedDict[Tuple[str, str, str], pd.DataFrame]" = OrderedDict()
+_stats: Dict[str, int] = {"memory": 0, "disk": 0, "parsed": 0}
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """Hits per layer for this process: memory / disk / parsed (cache miss)."""
+    with _lock:
+        return dict(_stats)
+
+
+def clear_memory_cache() -> None:
+    with _lock:
+        _memo.clear()
+
+
+# ------------------------
+# Keys
+# ------------------------
+def _columns_tag(columns: Optional[Sequence[str]]) -> str:
+    if columns is None:
+        return ""
+    joined = "\x1f".join(sorted({ci_key(c) for c in columns}))
+    return hashlib.sha1(joined.encode("utf-8")).hexdigest()[:12]
+
+
+def _entry_stem(digest: str, sheet_name: str, columns_tag: str = "") -> str:
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "_", str(sheet_name)).strip("_") or "sheet"
+    stem = f"{digest[:32]}_{slug}"
+    return f"{stem}_{columns_tag}" if columns_tag else stem
+
+
+# ------------------------
+# Disk layer
+# ------------------------
+def _parquet_safe(df: pd.DataFrame) -> bool:
+    """True if Parquet will hand back the same values read_excel produced."""
+    if not all(isinstance(c, str) for c in df.columns):
+        return False
+    for c in df.columns:
+        s = df[c]
+        if s.dtype != object:
+            continue
+        kinds = {type(v) for v in s.dropna().to_numpy()}
+        if kinds and kinds != {str}:
+            return False
+    return True
+
+
+def _restore_nan(df: pd.DataFrame) -> pd.DataFrame:
+    # Parquet brings blank text cells back as None; read_excel gives NaN
+    for c in df.columns:
+        if df[c].dtype == object:
+            df[c] = df[c].where(df[c].notna(), np.nan)
+    return df
+
+
+def _load_from_disk(stem: str) -> Optional[pd.DataFrame]:
+    for ext in (".parquet", ".pkl"):
+        path = os.path.join(CACHE_DIR, stem + ext)
+        if not os.path.exists(path):
+            continue
+        try:
+            if ext == ".parquet":
+                df = _restore_nan(pd.read_parquet(path))
+            else:
+                df = pd.read_pickle(path)
+            os.utime(path, None)  # mark as recently used for eviction
+            return df
+        except Exception:
+            # Corrupt / unreadable entry: drop it and re-parse
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    return None
+
+
+def _write_atomic(df: pd.DataFrame, stem: str) -> None:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    ext = ".parquet" if _parquet_safe(df) else ".pkl"
+    final = os.path.join(CACHE_DIR, stem + ext)
+    tmp = f"{final}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        if ext == ".parquet":
+            try:
+                df.to_parquet(tmp, index=False)
+            except Exception:
+                # No Parquet engine installed or an odd column; pickle still round-trips
+                ext = ".pkl"
+                final = os.path.join(CACHE_DIR, stem + ext)
+                df.to_pickle(tmp)
+        else:
+            df.to_pickle(tmp)
+        os.replace(tmp, final)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def evict(max_bytes: int = MAX_CACHE_BYTES) -> int:
+    """Delete least-recently-used cache files until the folder fits max_bytes. Returns files removed."""
+    if not os.path.isdir(CACHE_DIR):
+        return 0
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if not name.endswith((".parquet", ".pkl")):
+            continue
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _m, size, _p in entries)
+    removed = 0
+    for _mtime, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+# ------------------------
+# Public entry point
+# ------------------------
+def read_excel_cached(
+    xlsx_path: str,
+    sheet_name: str,
+    columns: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    """
+    Drop-in for pd.read_excel(xlsx_path, sheet_name=sheet_name), optionally limited
+    to `columns` (case-insensitive). Returns a fresh copy each call so callers can
+    mutate freely.
+    """
+    digest = file_sha256(xlsx_path)
+    tag = _columns_tag(columns)
+    key = (digest, str(sheet_name), tag)
+
+    with _lock:
+        df = _memo.get(key)
+        if df is not None:
+            _memo.move_to_end(key)
+            _stats["memory"] += 1
+            return df.copy()
+
+    stem = _entry_stem(digest, sheet_name, tag)
+    df = _load_from_disk(stem)
+    if df is not None:
+        layer = "disk"
+    else:
+        df = read_excel_columns(xlsx_path, sheet_name, columns)
+        layer = "parsed"
+        try:
+            _write_atomic(df, stem)
+            evict()
+        except Exception:
+            # Cache is best-effort; never fail an extract because of it
+            pass
+
+    with _lock:
+        _stats[layer] += 1
+        _memo[key] = df
+        _memo.move_to_end(key)
+        while len(_memo) > MAX_MEMO_ENTRIES:
+            _memo.popitem(last=False)
+    return df.copy()
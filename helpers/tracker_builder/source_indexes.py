@@ -0,0 +1,61 @@
+# helpers/tracker_builder/source_indexes.py
+from __future__ import annotations
+import sqlite3
+from typing import Dict, List, Sequence
+
+from services.db.bulk_writer import IndexSpec, analyze_table, create_indexes
+from services.db.mpp_ingest import MPP_INDEXES
+from helpers.tracker_builder.pull_sap_data import SAP_INDEXES
+from helpers.tracker_builder.pull_epw_data import EPW_INDEXES
+from helpers.tracker_builder.pull_land_data import LAND_INDEXES
+from helpers.tracker_builder.pull_joint_pole_data import JOINT_POLE_INDEXES
+
+# ------------------------
+# Join-key indexes on the source tables
+# ------------------------
+# Each loader declares the keys its consumers join on (MPP_INDEXES, SAP_INDEXES, ...)
+# and builds them right after the table is replaced. This is the same set in one
+# place, for DBs loaded before a loader declared its keys (or by hand): tracker
+# builds call ensure_source_indexes() first, which is a no-op once they exist.
+
+SOURCE_INDEXES: Dict[str, Sequence[IndexSpec]] = {
+    "mpp_data": MPP_INDEXES,
+    "sap_data": SAP_INDEXES,
+    "epw_data": EPW_INDEXES,
+    "land_data": LAND_INDEXES,
+    "joint_pole_data": JOINT_POLE_INDEXES,
+}
+
+
+def _existing(conn: sqlite3.Connection, kind: str) -> set:
+    return {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = ?", (kind,))}
+
+
+def _has_stats(conn: sqlite3.Connection, table: str) -> bool:
+    try:
+        return conn.execute("SELECT 1 FROM sqlite_stat1 WHERE tbl = ? LIMIT 1", (table,)).fetchone() is not None
+    except sqlite3.OperationalError:
+        return False    # no ANALYZE has ever run on this DB
+
+
+def ensure_source_indexes(conn: sqlite3.Connection, analyze: bool = True) -> List[str]:
+    """
+    Create any missing declared index on the source tables that exist. With analyze,
+    tables that got a new index (or have never been analyzed) are ANALYZEd too.
+    Returns the tables that changed. Commits.
+    """
+    tables = _existing(conn, "table")
+    have = _existing(conn, "index")
+    changed: List[str] = []
+    for table, specs in SOURCE_INDEXES.items():
+        if table not in tables:
+            continue
+        missing = [s for s in specs if s[0] not in have]
+        if missing:
+            create_indexes(conn, table, missing)
+            conn.commit()
+        if analyze and (missing or not _has_stats(conn, table)):
+            analyze_table(conn, table)
+        if missing:
+            changed.append(table)
+    return changed
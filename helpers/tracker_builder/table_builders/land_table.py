@@ -3,6 +3,8 @@ from __future__ import annotations
 import sqlite3
 from typing import List, Tuple
 
+from services.db.date_normalize import iso_sql
+
 COLUMNS: List[str] = [
     "Order",
     "Notification",
@@ -77,22 +79,13 @@ def get_land_table(db_path: str) -> Tuple[list[str], list[tuple]]:
         base_with_land = ""
         if has_land:
             # land_latest = latest row per Order based on Permit Created Date
-            # Convert MM/DD/YYYY -> YYYY-MM-DD and max on that, so "latest" is
+            # Max on the ISO shadow of the MM/DD/YYYY text, so "latest" is
             # truly chronological, not just lexicographical.
-            base_with_land = """
+            base_with_land = f"""
                 WITH land_with_iso AS (
                     SELECT
                         ld.*,
-                        CASE
-                        WHEN "Permit Created Date" IS NOT NULL
-                            AND LENGTH("Permit Created Date") = 10
-                            AND SUBSTR("Permit Created Date", 3, 1) = '/'
-                            AND SUBSTR("Permit Created Date", 6, 1) = '/'
-                            THEN SUBSTR("Permit Created Date", 7, 4) || '-' ||
-                                SUBSTR("Permit Created Date", 1, 2) || '-' ||
-                                SUBSTR("Permit Created Date", 4, 2)
-                        ELSE NULL
-                        END AS permit_created_iso
+                        {iso_sql(conn, "land_data", "Permit Created Date", "ld")} AS permit_created_iso
                     FROM land_data ld
                 ),
                 land_latest AS (
@@ -0,0 +1,129 @@
+# helpers/tracker_builder/tracker_schema.py
+from __future__ import annotations
+import sqlite3
+from typing import Dict, List, Optional, Sequence
+
+from services.db.migrations import Migration, apply_migrations
+from helpers.tracker_builder.dependency_trackers.permit import PERMIT_TRACKER_COLS
+from helpers.tracker_builder.dependency_trackers.misctsk import MTSK_COLS
+from helpers.tracker_builder.dependency_trackers.faa import FAA_COLS
+from helpers.tracker_builder.dependency_trackers.environment import ENV_COLS
+from helpers.tracker_builder.dependency_trackers.land import LAND_COLS
+from helpers.tracker_builder.dependency_trackers.joint_pole import JP_COLS
+
+# ------------------------
+# Tracker table schemas (versioned)
+# ------------------------
+# Every tracker build used to re-check its table: CREATE IF NOT EXISTS, PRAGMA
+# table_info, and on any mismatch a full copy into <table>__new to fix the column
+# order. Those checks now run once per DB as migrations keyed on PRAGMA user_version
+# (see services/db/migrations.py); build_sap_tracker_initial() calls
+# ensure_tracker_schema() first, which is one pragma read on a current DB.
+#
+# Changing a tracker layout = edit its column list AND append a Migration that does
+# the change in place (ALTER TABLE ... ADD COLUMN for a new column). Never edit a
+# migration that has shipped: DBs past its version won't see it again.
+
+# PC21 moved to immediately AFTER DS11
+SAP_TRACKER_COLS = [
+    "Order", "Primary Status",
+    "SP56", "RP56", "SP57", "RP57",
+    "DS42", "PC20", "DS76", "PC24", "DS11", "PC21",
+    "AP10", "AP25", "DS28", "DS73",
+]
+
+OPEN_DEPENDENCIES_COLS = [
+    "Order", "Permit", "Land", "FAA", "Environment", "Joint Pole", "MiscTSK",
+    "Open Dependencies", "Stage of Job",
+]
+
+# Tracker table -> canonical column order ("Order" INTEGER PRIMARY KEY, the rest TEXT)
+TRACKER_TABLES: Dict[str, List[str]] = {
+    "sap_tracker": SAP_TRACKER_COLS,
+    "open_dependencies": OPEN_DEPENDENCIES_COLS,
+    "permit_tracker": PERMIT_TRACKER_COLS,
+    "miscTSK_tracker": MTSK_COLS,
+    "faa_tracker": FAA_COLS,
+    "environment_tracker": ENV_COLS,
+    "land_tracker": LAND_COLS,
+    "joint_pole_tracker": JP_COLS,
+}
+
+# What the old per-build rebuild put in a column the table didn't have yet (default NULL)
+_REBUILD_FILL: Dict[str, str] = {"environment_tracker": "''"}
+
+
+def _q(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def tracker_table_sql(
+    table: str, name: Optional[str] = None, if_not_exists: bool = False, schema: Optional[str] = None,
+) -> str:
+    """CREATE TABLE for a tracker's canonical layout (under `name`, default the table's own)."""
+    cols = TRACKER_TABLES[table]
+    defs = ", ".join(
+        f"{_q(c)} INTEGER PRIMARY KEY" if c == "Order" else f"{_q(c)} TEXT" for c in cols
+    )
+    exists = "IF NOT EXISTS " if if_not_exists else ""
+    target = f"{schema}.{_q(name or table)}" if schema else _q(name or table)
+    return f"CREATE TABLE {exists}{target} ({defs})"
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [r[1] for r in conn.execute(f"PRAGMA table_info({_q(table)})")]
+
+
+def _conform(conn: sqlite3.Connection, table: str) -> None:
+    """Create the table, or rebuild it into the canonical column order keeping its rows."""
+    cols = TRACKER_TABLES[table]
+    new = f"{table}__new"
+    conn.execute(f"DROP TABLE IF EXISTS {_q(new)}")       # left by an interrupted rebuild
+    conn.execute(tracker_table_sql(table, if_not_exists=True))
+    have = _columns(conn, table)
+    if have == cols:
+        return
+    fill = _REBUILD_FILL.get(table, "NULL")
+    select = ", ".join(_q(c) if c in have else f"{fill} AS {_q(c)}" for c in cols)
+    conn.execute(tracker_table_sql(table, name=new))
+    conn.execute(
+        f"INSERT OR REPLACE INTO {_q(new)} ({', '.join(_q(c) for c in cols)}) "
+        f"SELECT {select} FROM {_q(table)}"
+    )
+    conn.execute(f"DROP TABLE {_q(table)}")
+    conn.execute(f"ALTER TABLE {_q(new)} RENAME TO {_q(table)}")
+
+
+def _add_missing(conn: sqlite3.Connection, table: str) -> None:
+    """Create the table, or append the columns it lacks (no reorder)."""
+    conn.execute(tracker_table_sql(table, if_not_exists=True))
+    have = set(_columns(conn, table))
+    for c in TRACKER_TABLES[table]:
+        if c not in have:
+            conn.execute(f"ALTER TABLE {_q(table)} ADD COLUMN {_q(c)} TEXT")
+
+
+def _baseline(conn: sqlite3.Connection) -> None:
+    # What the per-build checks did, once: the dependency trackers and sap_tracker were
+    # rebuilt into column order, open_dependencies only ever got columns appended
+    for table in TRACKER_TABLES:
+        if table == "open_dependencies":
+            _add_missing(conn, table)
+        else:
+            _conform(conn, table)
+
+
+TRACKER_MIGRATIONS: Sequence[Migration] = (
+    Migration(1, "tracker tables: create / conform to canonical layouts", _baseline),
+)
+
+
+def ensure_tracker_schema(conn: sqlite3.Connection) -> List[int]:
+    """
+    Apply any pending tracker migration, then create any tracker table that's missing
+    (e.g. dropped by hand after the DB was migrated). Returns the versions applied.
+    """
+    applied = apply_migrations(conn, TRACKER_MIGRATIONS)
+    for table in TRACKER_TABLES:
+        conn.execute(tracker_table_sql(table, if_not_exists=True, schema="main"))
+    return applied
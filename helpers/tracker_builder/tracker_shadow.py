@@ -0,0 +1,133 @@
+# helpers/tracker_builder/tracker_shadow.py
+from __future__ import annotations
+import re
+import sqlite3
+from typing import Iterable, List, Optional
+
+from helpers.tracker_builder.tracker_schema import TRACKER_TABLES, tracker_table_sql
+
+# ------------------------
+# Shadow-table builds for the trackers
+# ------------------------
+# build_sap_tracker_initial() used to update sap_tracker, open_dependencies and the
+# dependency trackers in place, committing after nearly every step, so a Refresh or
+# Export during an Update could show a half-built generation.
+#
+# open_shadows() puts a TEMP copy of each tracker under the same name. SQLite
+# resolves an unqualified table name to temp before main, so the builders' SQL
+# ("INSERT OR REPLACE INTO permit_tracker ...") reads and writes the shadows
+# unchanged and their commits never touch the live tables. swap_in_shadows() then
+# copies each shadow to main."<table>__shadow" (invisible to readers) and, in one
+# short IMMEDIATE transaction, drops the live table, renames the copy into place and
+# re-creates the table's indexes. A WAL reader sees the previous generation or
+# the new one, never a mix.
+#
+# Shadows start as a copy of the live rows: the builders upsert, so orders that
+# dropped off order_tracking_list keep their last values, as before.
+#
+# live / shadow name the schemas involved: by default the DB is main and the shadows
+# are in temp; memory_staging.py builds with the DB attached as "disk" and the
+# shadows in an in-memory main.
+
+SHADOW_SUFFIX = "__shadow"
+
+
+def _q(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+# "CREATE TABLE <name> (" with the name bare, "quoted", [bracketed] or `ticked`
+_rx_create_head = re.compile(r'^\s*CREATE\s+TABLE\s+(?:"(?:[^"]|"")+"|\[[^\]]+\]|`[^`]+`|[^\s(]+)\s*\(', re.I)
+# "CREATE [UNIQUE] INDEX [IF NOT EXISTS] " (the index name follows)
+_rx_index_head = re.compile(r'^\s*CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?', re.I)
+
+
+def _shadow_sql(conn: sqlite3.Connection, table: str, target: str, live: str = "main") -> str:
+    """
+    CREATE TABLE `target` (schema-qualified) shaped exactly like the live table, so a
+    swap never changes a DB's layout; layout changes are migrations (tracker_schema.py).
+    """
+    row = conn.execute(
+        f"SELECT sql FROM {live}.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()
+    if row and row[0] and _rx_create_head.match(row[0]):
+        return _rx_create_head.sub(f"CREATE TABLE {target} (", row[0], count=1)
+    schema, _, name = target.partition(".")
+    return tracker_table_sql(table, name=name.strip('"').replace('""', '"'), schema=schema)
+
+
+def _index_sql(conn: sqlite3.Connection, schema: str, table: str) -> List[tuple]:
+    """(name, sql) of the explicit indexes on schema.table (autoindexes have no sql)."""
+    return conn.execute(
+        f"SELECT name, sql FROM {schema}.sqlite_master "
+        f"WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (table,),
+    ).fetchall()
+
+
+def open_shadows(
+    conn: sqlite3.Connection, tables: Optional[Iterable[str]] = None, live: str = "main", shadow: str = "temp",
+) -> None:
+    """Copy of each tracker (default: all of them) under its own name in `shadow`. Commits."""
+    for table in (tables if tables is not None else TRACKER_TABLES):
+        t = _q(table)
+        conn.execute(f"DROP TABLE IF EXISTS {live}.{_q(table + SHADOW_SUFFIX)}")   # left by a failed swap
+        conn.execute(f"DROP TABLE IF EXISTS {shadow}.{t}")
+        conn.execute(_shadow_sql(conn, table, f"{shadow}.{t}", live))
+        conn.execute(f"INSERT INTO {shadow}.{t} SELECT * FROM {live}.{t} ORDER BY rowid")
+    conn.commit()
+
+
+def drop_shadows(conn: sqlite3.Connection, live: str = "main", shadow: str = "temp") -> None:
+    """Discard the shadows (failed build); the live tables were never touched."""
+    if conn.in_transaction:
+        conn.rollback()
+    for table in TRACKER_TABLES:
+        conn.execute(f"DROP TABLE IF EXISTS {shadow}.{_q(table)}")
+        conn.execute(f"DROP TABLE IF EXISTS {live}.{_q(table + SHADOW_SUFFIX)}")
+    conn.commit()
+
+
+def swap_in_shadows(conn: sqlite3.Connection, live: str = "main", shadow: str = "temp") -> List[str]:
+    """Make every open shadow the live table. Returns the tables swapped. Commits."""
+    if conn.in_transaction:
+        conn.commit()
+    have = {r[0] for r in conn.execute(f"SELECT name FROM {shadow}.sqlite_master WHERE type = 'table'")}
+    tables = [t for t in TRACKER_TABLES if t in have]
+
+    # Copy the shadows next to the live tables first; nobody reads "<table>__shadow",
+    # so this can take its time
+    indexes = {}
+    for table in tables:
+        t, copy = _q(table), _q(table + SHADOW_SUFFIX)
+        conn.execute(f"DROP TABLE IF EXISTS {live}.{copy}")
+        conn.execute(_shadow_sql(conn, table, f"{live}.{copy}", live))
+        conn.execute(f"INSERT INTO {live}.{copy} SELECT * FROM {shadow}.{t} ORDER BY rowid")
+        # The live table's indexes, plus any a builder created on the shadow; re-created
+        # under the live schema
+        found = dict(_index_sql(conn, live, table))
+        for name, sql in _index_sql(conn, shadow, table):
+            found.setdefault(name, sql)
+        indexes[table] = [_rx_index_head.sub(lambda m: f"{m.group(0)}{live}.", sql, count=1) for sql in found.values()]
+    conn.commit()
+
+    # legacy_alter_table: the rename must not rewrite (or trip over) views that name
+    # the live table; they should simply see the new one
+    legacy = conn.execute("PRAGMA legacy_alter_table").fetchone()[0]
+    conn.execute("PRAGMA legacy_alter_table = ON")
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for table in tables:
+                conn.execute(f"DROP TABLE {shadow}.{_q(table)}")
+                conn.execute(f"DROP TABLE {live}.{_q(table)}")
+                conn.execute(f"ALTER TABLE {live}.{_q(table + SHADOW_SUFFIX)} RENAME TO {_q(table)}")
+                for sql in indexes[table]:
+                    conn.execute(sql)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    finally:
+        conn.execute(f"PRAGMA legacy_alter_table = {'ON' if legacy else 'OFF'}")
+    return tables
@@ -1,3 +1,4 @@
+import multiprocessing
 from tkinter import Tk, ttk
 from core.theme import apply_theme
 from landing import LandingView
@@ -82,4 +83,6 @@ class App:
         self.root.mainloop()
 
 if __name__ == "__main__":
+    # Step 3 extraction uses a process pool; needed for frozen Windows builds
+    multiprocessing.freeze_support()
     App().run()
\ No newline at end of file
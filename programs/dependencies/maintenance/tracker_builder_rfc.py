@@ -11,14 +11,12 @@ import pandas as pd
 
 from ledgers.tracker_conditions_ledger.maintenance_rfc import ALLOWED_MAT, ALLOWED_SAP_STATUS
 
-from helpers.tracker_builder.pull_sap_data import pull_sap_data
-from helpers.tracker_builder.pull_epw_data import pull_epw_data
-from helpers.tracker_builder.pull_land_data import pull_land_data
-from helpers.tracker_builder.pull_joint_pole_data import pull_joint_pole_data
+from helpers.tracker_builder.parallel_extract import ExtractJob, extract_program_concurrent
 from helpers.tracker_builder.update_trackers import build_sap_tracker_initial
+from helpers.tracker_builder.source_indexes import ensure_source_indexes
 from helpers.tracker_builder.manual_inputs import save_pasted_pairs, save_from_tracker_excel
 
-from services.db.maintenance_rfc_db import default_db_path
+from services.db.maintenance_rfc_db import default_db_path, orders_in_mpp
 
 from core.base import ToolView, FONT_H1
 from helpers.maintenance_rfc_tracker_builder.logic import (
@@ -65,6 +63,9 @@ class Maintenance_Tracker_Builder_RFC(ToolView):
 
         ttk.Label(fr4, text="MPP Database:").grid(row=0, column=0, sticky="w", padx=(0, 8))
         self.path_var = tk.StringVar()
+        # Re-ingest even if the manifest says the file hasn't changed
+        self.force_mpp_var = tk.BooleanVar(value=False)
+        self.force_extract_var = tk.BooleanVar(value=False)
         self.path_entry = ttk.Entry(fr4, textvariable=self.path_var, width=70)
         self.path_entry.grid(row=0, column=1, sticky="ew", padx=(0, 8))
 
@@ -73,6 +74,9 @@ class Maintenance_Tracker_Builder_RFC(ToolView):
 
         self.generate_btn = ttk.Button(fr4, text="Generate Order List", command=self._on_generate, state="disabled")
         self.generate_btn.grid(row=0, column=3, sticky="w")
+        ttk.Checkbutton(fr4, text="Force reload", variable=self.force_mpp_var).grid(
+            row=0, column=4, sticky="w", padx=(8, 0)
+        )
 
         self.path_var.trace_add("write", lambda *_: self._update_generate_state())
 
@@ -121,6 +125,9 @@ class Maintenance_Tracker_Builder_RFC(ToolView):
         fr_btn.grid(row=10, column=0, columnspan=6, sticky="w", padx=16, pady=(4, 6))
         self.btn_extract = ttk.Button(fr_btn, text="Extract Data", command=self._on_extract_step2, state="disabled")
         self.btn_extract.grid(row=0, column=0)
+        ttk.Checkbutton(fr_btn, text="Force reload (ignore unchanged files)", variable=self.force_extract_var).grid(
+            row=0, column=1, sticky="w", padx=(8, 0)
+        )
 
         # ---- Row 11: Tracker Tools heading
         ttk.Label(self, text="Tracker Tools", font=FONT_H1).grid(
@@ -255,26 +262,16 @@ class Maintenance_Tracker_Builder_RFC(ToolView):
         """Create helpful indexes and set WAL/NORMAL pragmas. Safe to call repeatedly."""
         try:
             with sqlite3.connect(db_path) as conn:
+                # Source tables (mpp/sap/epw/land/joint pole): declared join keys + ANALYZE
+                ensure_source_indexes(conn)
                 cur = conn.cursor()
                 cur.executescript("""
                 PRAGMA journal_mode=WAL;
                 PRAGMA synchronous=NORMAL;
 
-                CREATE INDEX IF NOT EXISTS idx_mpp_order        ON mpp_data("Order");
-                CREATE INDEX IF NOT EXISTS idx_mpp_project_year ON mpp_data("Project Reporting Year");
-                CREATE INDEX IF NOT EXISTS idx_mpp_mat          ON mpp_data("MAT");
-                CREATE INDEX IF NOT EXISTS idx_mpp_program      ON mpp_data("Program");
-                CREATE INDEX IF NOT EXISTS idx_mpp_subcat       ON mpp_data("Sub-Category");
-                CREATE INDEX IF NOT EXISTS idx_mpp_div          ON mpp_data("Div");
-                CREATE INDEX IF NOT EXISTS idx_mpp_region       ON mpp_data("Region");
-                CREATE INDEX IF NOT EXISTS idx_mpp_click_start  ON mpp_data("CLICK Start Date");
-                CREATE INDEX IF NOT EXISTS idx_mpp_click_end    ON mpp_data("CLICK End Date");
-                CREATE INDEX IF NOT EXISTS idx_mpp_wpd          ON mpp_data("Work Plan Date");
-
                 CREATE INDEX IF NOT EXISTS idx_saptracker_order ON sap_tracker("Order");
                 CREATE INDEX IF NOT EXISTS idx_envtracker_order ON environment_tracker("Order");
                 CREATE INDEX IF NOT EXISTS idx_opendep_order    ON open_dependencies("Order");
-                CREATE INDEX IF NOT EXISTS idx_epw_ordernum     ON epw_data("Order Number");
                 CREATE INDEX IF NOT EXISTS idx_manual_order     ON manual_tracker("Order");
                 """)
                 conn.commit()
@@ -435,6 +432,7 @@ class Maintenance_Tracker_Builder_RFC(ToolView):
 
         db_path = default_db_path()
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        force = bool(self.force_extract_var.get())
 
         # Busy popup + background thread (same pattern as Update Trackers)
         busy = BusyPopup(self, title="Extracting Data")
@@ -444,11 +442,23 @@ class Maintenance_Tracker_Builder_RFC(ToolView):
 
         def worker():
             try:
-                msgs = []
-                tbl, n = pull_sap_data(db_path, paths["SAP"]);   msgs.append(f"- {tbl}: {n:,} rows")
-                tbl, n = pull_epw_data(db_path, paths["EPW"], ALLOWED_MAT, True, True, ALLOWED_SAP_STATUS);   msgs.append(f"- {tbl}: {n:,} rows")
-                tbl, n = pull_land_data(db_path, paths["LAND"], ALLOWED_MAT, True, True, ALLOWED_SAP_STATUS); msgs.append(f"- {tbl}: {n:,} rows")
-                tbl, n = pull_joint_pole_data(db_path, paths["JOINT"], ALLOWED_MAT); msgs.append(f"- {tbl}: {n:,} rows")
+                # Workbooks are parsed in parallel processes; this thread is the only DB writer
+                res = extract_program_concurrent(ExtractJob(
+                    label="Maintenance RFC",
+                    db_path=db_path,
+                    sap_path=paths["SAP"],
+                    epw_path=paths["EPW"],
+                    land_path=paths["LAND"],
+                    joint_path=paths["JOINT"],
+                    allowed_mat=ALLOWED_MAT,
+                    remove_btag=True,
+                    remove_sap_status=True,
+                    sap_status_to_keep=ALLOWED_SAP_STATUS,
+                    force=force,
+                ))
+                if not res.ok:
+                    raise RuntimeError(res.error)
+                msgs = [f"- {tbl}: {n:,} rows" for tbl, n in res.tables]
 
                 # Ensure indexes after loading source tables
                 self._ensure_perf_indexes(db_path)
@@ -503,6 +513,7 @@ class Maintenance_Tracker_Builder_RFC(ToolView):
         if not save_path:
             # User cancelled; do nothing
             return
+        force = bool(self.force_mpp_var.get())
 
         # --- NEW: Busy popup + background thread (same pattern as Update Trackers) ---
         busy = BusyPopup(self, title="Processing MPP / Order List")
@@ -513,7 +524,7 @@ class Maintenance_Tracker_Builder_RFC(ToolView):
         def worker():
             try:
                 # Heavy work off the UI thread
-                rows, seeded, appended = run_import_and_updates(path)
+                rows, seeded, appended = run_import_and_updates(path, force=force)
                 export_order_list_to_excel(save_path)
 
                 def done_ok():
@@ -684,6 +695,7 @@ class ManualInputsPopup(tk.Toplevel):
         self.tree.heading("value", text="Value")
         self.tree.column("order", width=160, anchor="w")
         self.tree.column("value", width=540, anchor="w")
+        self.tree.tag_configure("unknown", foreground="#B00020")
         self.tree.pack(fill="both", expand=True)
 
         self._parsed_rows: list[tuple[int, str]] = []
@@ -807,14 +819,31 @@ class ManualInputsPopup(tk.Toplevel):
             self._field_canonical = None
             return
 
+        # Orders this program's MPP data doesn't have (one query for the whole paste);
+        # their values still save but won't show up in any tracker
+        try:
+            known = orders_in_mpp(order_num for order_num, _ in rows)
+        except Exception:
+            known = None
+        unknown = [] if known is None else [o for o, _ in rows if o not in known]
+
         self._clear_tree()
         for order_num, value in rows:
-            self.tree.insert("", "end", values=(order_num, value))
+            tags = ("unknown",) if known is not None and order_num not in known else ()
+            self.tree.insert("", "end", values=(order_num, value), tags=tags)
 
         self._parsed_rows = rows
         self._field_canonical = field_canonical
         self.btn_save.configure(state="normal")
 
+        if unknown:
+            shown = ", ".join(str(o) for o in unknown[:10]) + (", ..." if len(unknown) > 10 else "")
+            messagebox.showwarning(
+                "Unknown Orders",
+                f"{len(unknown)} of {len(rows)} order(s) are not in this program's MPP data "
+                f"(highlighted in the preview):\n{shown}",
+            )
+
     def _clear_tree(self):
         for item in self.tree.get_children(""):
             self.tree.delete(item)
@@ -25,6 +25,7 @@ from helpers.wmp_custom_emailer import jp_intent as JP
 from helpers.wmp_custom_emailer import ds28 as DS28
 from helpers.wmp_custom_emailer import ap10 as AP10  # NEW
 from helpers.wmp_custom_emailer import ds73 as DS73  # NEW
+from services.db.wmp_db import orders_in_mpp
 
 TEMPLATE_PC21 = PC21.TEMPLATE_NAME
 TEMPLATE_JP_INTENT = JP.TEMPLATE_NAME
@@ -312,6 +313,30 @@ class WmpCustomEmailer(ToolView):
                 if not messagebox.askyesno("No Orders", "No orders entered. Send anyway?", default="no"):
                     return
 
+        # Catch typos: every entered order checked against WMP mpp_data in one query
+        entered = [o for o in orders_primary_list + orders_secondary if (o or "").strip()]
+        try:
+            known = orders_in_mpp(entered)
+        except Exception:
+            known = None
+        if known is not None:
+            unknown = []
+            for o in entered:
+                try:
+                    found = int(o.strip()) in known
+                except ValueError:
+                    found = False
+                if not found:
+                    unknown.append(o.strip())
+            if unknown:
+                shown = ", ".join(unknown[:10]) + (", ..." if len(unknown) > 10 else "")
+                if not messagebox.askyesno(
+                    "Unknown Orders",
+                    f"{len(unknown)} order(s) are not in the WMP MPP data:\n{shown}\n\nSend anyway?",
+                    default="yes",
+                ):
+                    return
+
         # Disable UI bits while running
         self.btn_send.configure(state="disabled")
         self.progress.configure(mode="indeterminate")
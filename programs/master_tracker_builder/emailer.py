@@ -2,21 +2,15 @@ from __future__ import annotations
 
 import os
 import sqlite3
-from typing import Any, List
+from typing import Any, Callable, List
 
 import pandas as pd
 import tkinter as tk
 from tkinter import ttk, messagebox
 
 from core.base import ToolView, FONT_H1, FONT_H2
-from services.db import (
-    wmp_db,
-    maintenance_db,
-    poles_db,
-    poles_rfc_db,
-    maintenance_rfc_db,
-)
-
+from services.db.federated import MPP_FIRST_VIEW, SOURCE_ROWID, STATIC_SCHEMA, Federation, all_view, federated
+from services.db.unified_store import PROGRAM_KEY, program_rank_sql, read_unified, unified_store_enabled
 from helpers.emailHelpers.email import df_to_excelish_html
 
 # Path to static lists DB (for pm_list)
@@ -428,73 +422,71 @@ class Master_Emailer(ToolView):
         self._populate_tree_from_df(df)
         self._update_send_state()
 
+    def _read_all_programs(
+        self,
+        unified_sql: str,
+        federated_sql: str | Callable[[Federation], str],
+        params: list,
+        tables: list[str],
+    ) -> pd.DataFrame | None:
+        """
+        Run a cross-program query as one statement: against the unified store when that
+        option is on, else over the attached program DBs (services/db/federated.py;
+        federated_sql may be a function of the Federation, to adapt to the views it has;
+        tables are the ones it reads).
+        None if neither can answer it (e.g. no program has the table yet).
+        """
+        if unified_store_enabled():
+            try:
+                return read_unified(unified_sql, params)
+            except Exception as e:
+                print(f"[Master_Emailer] Unified store unavailable: {type(e).__name__}: {e}")
+        try:
+            with federated(tables) as fed:
+                sql = federated_sql(fed) if callable(federated_sql) else federated_sql
+                return fed.read(sql, params)
+        except Exception as e:
+            print(f"[Master_Emailer] Error reading program DBs: {type(e).__name__}: {e}")
+            return None
+
     def _load_joint_pole_df_for_actions(self, action_filters: list[str]) -> pd.DataFrame:
         """
-        Scan all 5 program DBs (where available) and pull rows from joint_pole_tracker
-        where Action is in the provided list of action_filters.
+        Pull rows from joint_pole_tracker across all program DBs (one query, see
+        _read_all_programs) where Action is in the provided list of action_filters.
         Returns a single combined DataFrame with columns JP_COLUMNS.
         """
         if not action_filters:
             return pd.DataFrame(columns=JP_COLUMNS)
 
-        db_modules = [
-            wmp_db,
-            maintenance_db,
-            maintenance_rfc_db,
-            poles_db,
-            poles_rfc_db,
-        ]
-
-        frames: list[pd.DataFrame] = []
-
-        for db_mod in db_modules:
-            db_path = db_mod.default_db_path()
-            if not db_path or not os.path.isfile(db_path):
-                continue
-
-            try:
-                with sqlite3.connect(db_path) as conn:
-                    cur = conn.cursor()
-                    # Check table exists
-                    cur.execute(
-                        """
-                        SELECT name FROM sqlite_master
-                        WHERE type='table' AND name='joint_pole_tracker'
-                        """
-                    )
-                    if cur.fetchone() is None:
-                        continue
-
-                    placeholders = ",".join("?" for _ in action_filters)
-                    query = f"""
-                        SELECT
-                            "Order",
-                            "Notification Status",
-                            "SAP Status",
-                            "DS42",
-                            "PC20",
-                            "Primary Intent Status",
-                            "Status Date",
-                            "Due By",
-                            "Action"
-                        FROM joint_pole_tracker
-                        WHERE "Action" IN ({placeholders})
-                    """
-                    df = pd.read_sql_query(query, conn, params=action_filters)
-                    if not df.empty:
-                        # enforce column order and add any missing columns as blank
-                        for col in JP_COLUMNS:
-                            if col not in df.columns:
-                                df[col] = ""
-                        df = df[JP_COLUMNS].copy()
-                        frames.append(df)
-            except Exception as e:
-                print(f"[Master_Emailer] Error reading {db_path}: {type(e).__name__}: {e}")
-
-        if not frames:
+        placeholders = ",".join("?" for _ in action_filters)
+
+        def query(source: str) -> str:
+            return f"""
+                SELECT
+                    "Order",
+                    "Notification Status",
+                    "SAP Status",
+                    "DS42",
+                    "PC20",
+                    "Primary Intent Status",
+                    "Status Date",
+                    "Due By",
+                    "Action"
+                FROM {source}
+                WHERE "Action" IN ({placeholders})
+            """
+
+        # One statement across all programs (program order, then each DB's row order)
+        df = self._read_all_programs(
+            query("joint_pole_tracker") + f" ORDER BY {program_rank_sql()}, rowid",
+            query(all_view("joint_pole_tracker")) + f" ORDER BY {program_rank_sql()}, {SOURCE_ROWID}",
+            action_filters,
+            ["joint_pole_tracker"],
+        )
+        if df is None or df.empty:
             return pd.DataFrame(columns=JP_COLUMNS)
 
-        combined = pd.concat(frames, ignore_index=True)
+        combined = df[JP_COLUMNS].copy()
 
         # Sort by Order for nicer display if numeric-ish
         try:
@@ -509,75 +501,46 @@ class Master_Emailer(ToolView):
 
     def _load_permit_df_for_actions(self, action_filters: list[str]) -> pd.DataFrame:
         """
-        Scan all 5 program DBs (where available) and pull rows from permit_tracker
-        where Action is in the provided list of action_filters.
+        Pull rows from permit_tracker across all program DBs (one query, see
+        _read_all_programs) where Action is in the provided list of action_filters.
         Returns a single combined DataFrame with columns PERMIT_COLUMNS.
         """
         if not action_filters:
             return pd.DataFrame(columns=PERMIT_COLUMNS)
 
-        db_modules = [
-            wmp_db,
-            maintenance_db,
-            maintenance_rfc_db,
-            poles_db,
-            poles_rfc_db,
-        ]
-
-        frames: list[pd.DataFrame] = []
-
-        for db_mod in db_modules:
-            db_path = db_mod.default_db_path()
-            if not db_path or not os.path.isfile(db_path):
-                continue
-
-            try:
-                with sqlite3.connect(db_path) as conn:
-                    cur = conn.cursor()
-                    # Check table exists
-                    cur.execute(
-                        """
-                        SELECT name FROM sqlite_master
-                        WHERE type='table' AND name='permit_tracker'
-                        """
-                    )
-                    if cur.fetchone() is None:
-                        continue
-
-                    placeholders = ",".join("?" for _ in action_filters)
-                    query = f"""
-                        SELECT
-                            "Order",
-                            "Notification Status",
-                            "SAP Status",
-                            "SP56 Status",
-                            "RP56 Status",
-                            "E Permit Status",
-                            "Submit Days",
-                            "Permit Expiration Date",
-                            "Work Plan Date",
-                            "CLICK Start Date",
-                            "CLICK End Date",
-                            "LEAPS Cycle Time",
-                            "Action"
-                        FROM permit_tracker
-                        WHERE "Action" IN ({placeholders})
-                    """
-                    df = pd.read_sql_query(query, conn, params=action_filters)
-                    if not df.empty:
-                        # enforce column order and add any missing columns as blank
-                        for col in PERMIT_COLUMNS:
-                            if col not in df.columns:
-                                df[col] = ""
-                        df = df[PERMIT_COLUMNS].copy()
-                        frames.append(df)
-            except Exception as e:
-                print(f"[Master_Emailer] Error reading {db_path}: {type(e).__name__}: {e}")
-
-        if not frames:
+        placeholders = ",".join("?" for _ in action_filters)
+
+        def query(source: str) -> str:
+            return f"""
+                SELECT
+                    "Order",
+                    "Notification Status",
+                    "SAP Status",
+                    "SP56 Status",
+                    "RP56 Status",
+                    "E Permit Status",
+                    "Submit Days",
+                    "Permit Expiration Date",
+                    "Work Plan Date",
+                    "CLICK Start Date",
+                    "CLICK End Date",
+                    "LEAPS Cycle Time",
+                    "Action"
+                FROM {source}
+                WHERE "Action" IN ({placeholders})
+            """
+
+        # One statement across all programs (program order, then each DB's row order)
+        df = self._read_all_programs(
+            query("permit_tracker") + f" ORDER BY {program_rank_sql()}, rowid",
+            query(all_view("permit_tracker")) + f" ORDER BY {program_rank_sql()}, {SOURCE_ROWID}",
+            action_filters,
+            ["permit_tracker"],
+        )
+        if df is None or df.empty:
             return pd.DataFrame(columns=PERMIT_COLUMNS)
 
-        combined = pd.concat(frames, ignore_index=True)
+        combined = df[PERMIT_COLUMNS].copy()
 
         # Sort by Order for nicer display if numeric-ish
         try:
@@ -594,148 +557,108 @@ class Master_Emailer(ToolView):
         """
         For 'Permit: Permit expired. Need CLICK Date for extension.':
 
-        1) From each program DB, pull rows from permit_tracker where
+        1) Across all program DBs (one query), pull rows from permit_tracker where
            Action = 'Permit expired. Please provide CLICK Date for extension.'.
 
-        2) For each Order, look up MAT from mpp_data (first row per Order).
+        2) For each Order, look up MAT from the same program's mpp_data
+           (first row per Order).
 
-        3) After combining across all DBs, look up Program Manager / LAN ID
-           from data/static_lists.sqlite3 :: pm_list via MAT.
+        3) Look up Program Manager / LAN ID
+           from data/static_lists.sqlite3 :: pm_list via MAT (joined in the same
+           query when reading the attached program DBs).
 
         4) Return a combined DataFrame with columns PERMIT_CLICK_COLUMNS,
            sorted/grouped by Program Manager, MAT, then Order.
         """
         ACTION_TEXT = "Permit expired. Please provide CLICK Date for extension."
 
-        db_modules = [
-            wmp_db,
-            maintenance_db,
-            maintenance_rfc_db,
-            poles_db,
-            poles_rfc_db,
-        ]
-
-        frames: list[pd.DataFrame] = []
-
-        for db_mod in db_modules:
-            db_path = db_mod.default_db_path()
-            if not db_path or not os.path.isfile(db_path):
-                continue
+        def query(permits: str, mat: str, mpp_join: str, order_by: str, pm_cols: str = "", pm_join: str = "") -> str:
+            return f"""
+                SELECT
+                    p."Order",
+                    p."Notification Status",
+                    {mat},
+                    p."SAP Status",
+                    p."SP56 Status",
+                    p."RP56 Status",
+                    p."E Permit Status",
+                    p."Submit Days",
+                    p."Permit Expiration Date",
+                    p."Work Plan Date",
+                    p."CLICK Start Date",
+                    p."CLICK End Date",
+                    p."LEAPS Cycle Time",
+                    p."Action"{pm_cols}
+                FROM {permits} p
+                {mpp_join}
+                {pm_join}
+                WHERE p."Action" = ?
+                ORDER BY {program_rank_sql("p." + PROGRAM_KEY)}, {order_by}
+            """
+
+        # Unified store: first mpp_data row of the same program + Order (an index probe
+        # per permit row instead of grouping all of mpp_data)
+        unified_sql = query(
+            "permit_tracker",
+            'm_first."MAT"',
+            f"""LEFT JOIN mpp_data m_first
+                  ON m_first.rowid = (
+                      SELECT MIN(rowid)
+                      FROM mpp_data
+                      WHERE {PROGRAM_KEY} = p.{PROGRAM_KEY} AND "Order" = p."Order"
+                  )""",
+            "p.rowid",
+        )
 
-            try:
-                with sqlite3.connect(db_path) as conn:
-                    cur = conn.cursor()
-
-                    # Check permit_tracker exists
-                    cur.execute(
-                        """
-                        SELECT name FROM sqlite_master
-                        WHERE type='table' AND name='permit_tracker'
-                        """
-                    )
-                    if cur.fetchone() is None:
-                        continue
-
-                    # Check mpp_data exists
-                    cur.execute(
-                        """
-                        SELECT name FROM sqlite_master
-                        WHERE type='table' AND name='mpp_data'
-                        """
-                    )
-                    has_mpp = (cur.fetchone() is not None)
-
-                    if has_mpp:
-                        # Use first mpp_data row per Order via rowid
-                        query = f"""
-                            WITH m_first AS (
-                                SELECT "Order", "MAT"
-                                FROM mpp_data
-                                WHERE rowid IN (
-                                    SELECT MIN(rowid)
-                                    FROM mpp_data
-                                    GROUP BY "Order"
-                                )
-                            )
-                            SELECT
-                                p."Order",
-                                p."Notification Status",
-                                m_first."MAT",
-                                p."SAP Status",
-                                p."SP56 Status",
-                                p."RP56 Status",
-                                p."E Permit Status",
-                                p."Submit Days",
-                                p."Permit Expiration Date",
-                                p."Work Plan Date",
-                                p."CLICK Start Date",
-                                p."CLICK End Date",
-                                p."LEAPS Cycle Time",
-                                p."Action"
-                            FROM permit_tracker p
-                            LEFT JOIN m_first
-                              ON m_first."Order" = p."Order"
-                            WHERE p."Action" = ?
-                        """
-                        df = pd.read_sql_query(query, conn, params=[ACTION_TEXT])
-                    else:
-                        # No mpp_data -> we still pull permit rows, MAT will be blank
-                        query = f"""
-                            SELECT
-                                p."Order",
-                                p."Notification Status",
-                                NULL AS "MAT",
-                                p."SAP Status",
-                                p."SP56 Status",
-                                p."RP56 Status",
-                                p."E Permit Status",
-                                p."Submit Days",
-                                p."Permit Expiration Date",
-                                p."Work Plan Date",
-                                p."CLICK Start Date",
-                                p."CLICK End Date",
-                                p."LEAPS Cycle Time",
-                                p."Action"
-                            FROM permit_tracker p
-                            WHERE p."Action" = ?
-                        """
-                        df = pd.read_sql_query(query, conn, params=[ACTION_TEXT])
-
-                    if not df.empty:
-                        # Ensure MAT column exists
-                        if "MAT" not in df.columns:
-                            df["MAT"] = ""
-                        frames.append(df)
-            except Exception as e:
-                print(f"[Master_Emailer] Error reading {db_path}: {type(e).__name__}: {e}")
+        def federated_sql(fed: Federation) -> str:
+            # Programs without mpp_data still contribute their permit rows; MAT is blank
+            if not fed.has_view("mpp_data"):
+                return query(all_view("permit_tracker"), 'NULL AS "MAT"', "", f"p.{SOURCE_ROWID}")
+            # pm_list is attached as static.pm_list (MAT is its primary key)
+            pm_cols = pm_join = ""
+            if fed.has_static_table("pm_list", ["MAT", "Program Manager", "LAN ID"]):
+                pm_cols = ', pm."Program Manager", pm."LAN ID"'
+                pm_join = f'LEFT JOIN {STATIC_SCHEMA}.pm_list pm ON pm."MAT" = m_first."MAT"'
+            return query(
+                all_view("permit_tracker"),
+                'm_first."MAT"',
+                f'LEFT JOIN {MPP_FIRST_VIEW} m_first '
+                f'ON m_first.{PROGRAM_KEY} = p.{PROGRAM_KEY} AND m_first."Order" = p."Order"',
+                f"p.{SOURCE_ROWID}",
+                pm_cols,
+                pm_join,
+            )
 
-        if not frames:
+        combined = self._read_all_programs(
+            unified_sql, federated_sql, [ACTION_TEXT], ["permit_tracker", "mpp_data"]
+        )
+        if combined is None or combined.empty:
             return pd.DataFrame(columns=PERMIT_CLICK_COLUMNS)
 
-        combined = pd.concat(frames, ignore_index=True)
-
         # ------------------------------------------------------------------
         # Enrich with Program Manager / LAN ID from pm_list in static_lists
+        # (already joined when the federated query could see static.pm_list)
         # ------------------------------------------------------------------
-        pm_df: pd.DataFrame | None = None
-        if os.path.isfile(STATIC_LISTS_DB_PATH):
-            try:
-                with sqlite3.connect(STATIC_LISTS_DB_PATH) as conn:
-                    pm_df = pd.read_sql_query(
-                        'SELECT "MAT", "Program Manager", "LAN ID" FROM pm_list',
-                        conn,
-                    )
-            except Exception as e:
-                print(f"[Master_Emailer] Error reading pm_list: {type(e).__name__}: {e}")
-                pm_df = None
-
-        if pm_df is not None and not pm_df.empty:
-            # De-duplicate MAT rows; keep first
-            pm_df = pm_df.drop_duplicates(subset=["MAT"], keep="first")
-            combined = combined.merge(pm_df, on="MAT", how="left")
-        else:
-            combined["Program Manager"] = ""
-            combined["LAN ID"] = ""
+        if "Program Manager" not in combined.columns:
+            pm_df: pd.DataFrame | None = None
+            if os.path.isfile(STATIC_LISTS_DB_PATH):
+                try:
+                    with sqlite3.connect(STATIC_LISTS_DB_PATH) as conn:
+                        pm_df = pd.read_sql_query(
+                            'SELECT "MAT", "Program Manager", "LAN ID" FROM pm_list',
+                            conn,
+                        )
+                except Exception as e:
+                    print(f"[Master_Emailer] Error reading pm_list: {type(e).__name__}: {e}")
+                    pm_df = None
+
+            if pm_df is not None and not pm_df.empty:
+                # De-duplicate MAT rows; keep first
+                pm_df = pm_df.drop_duplicates(subset=["MAT"], keep="first")
+                combined = combined.merge(pm_df, on="MAT", how="left")
+            else:
+                combined["Program Manager"] = ""
+                combined["LAN ID"] = ""
 
         # ------------------------------------------------------------------
         # Enforce final column order and fill missing columns as blank
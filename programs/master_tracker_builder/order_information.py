@@ -5,6 +5,7 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 
 from core.base import ToolView  # Frame-like base
+from services.db.order_dossier import order_dossier
 
 # --- Per-tracker fetch helpers ------------------------------------
 # Adjust import paths if any of these modules have different names
@@ -195,6 +196,34 @@ class Master_Order_Information(ToolView):
     # -------------------------
     # Search / wiring
     # -------------------------
+    def _scan_trackers(self, q: str):
+        """
+        (label, {"mpp", "sap_df", "epw", "land", "od"}) per tracker, in priority order.
+        Resolved across all programs over one connection and cached until a program DB
+        changes (services/db/order_dossier.py); each tracker's own fetch helpers are the
+        fallback.
+        """
+        try:
+            return order_dossier(q)
+        except Exception:
+            pass    # fall back to the per-tracker DBs
+
+        found = []
+        for label, funcs in self.TRACKERS:
+            try:
+                found.append((label, {
+                    "mpp": funcs["mpp"](q),
+                    "sap_df": funcs["sap"](q),
+                    "epw": funcs["epw"](q),
+                    "land": funcs["land"](q),
+                    "od": funcs["open_dep"](q),
+                }))
+            except Exception:
+                # If any tracker blows up, just skip it (we don't want to
+                # break master view because one DB is cranky).
+                continue
+        return found
+
     def _update_search_state(self):
         q = self.order_query_var.get().strip()
         self.order_search_btn.configure(state=("normal" if q else "disabled"))
@@ -215,17 +244,12 @@ class Master_Order_Information(ToolView):
         hits = []
 
         # Scan all trackers
-        for label, funcs in self.TRACKERS:
-            try:
-                mpp = funcs["mpp"](q)
-                sap_df = funcs["sap"](q)
-                epw = funcs["epw"](q)
-                land = funcs["land"](q)
-                od = funcs["open_dep"](q)
-            except Exception:
-                # If any tracker blows up, just skip it (we don't want to
-                # break master view because one DB is cranky).
-                continue
+        for label, found in self._scan_trackers(q):
+            mpp = found["mpp"]
+            sap_df = found["sap_df"]
+            epw = found["epw"]
+            land = found["land"]
+            od = found["od"]
 
             has_sap = sap_df is not None and hasattr(sap_df, "empty") and not sap_df.empty
             if mpp or has_sap or epw or land or (od or {}):
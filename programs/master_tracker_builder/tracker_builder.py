@@ -2,9 +2,10 @@ from __future__ import annotations
 
 import os
 import threading
+import time
 import sqlite3
 from datetime import datetime
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 import pandas as pd
 
 import tkinter as tk
@@ -21,15 +22,22 @@ from services.db import (
     maintenance_rfc_db,
     dependency_report_db,   # <- add this
 )
+from services.db.mpp_ingest import get_last_engine, partition_mpp_csv
+from services.db.ingest_manifest import record_ingest, unchanged_rows
+from services.db.ingest_runs import IngestProfile, format_runs, recent_runs
+from services.db.arrow_dtypes import arrow_available, arrow_strings_enabled, set_arrow_strings
+from services.db.federated import federated_counts
+from services.db.unified_store import refresh_unified, set_unified_store, tracker_counts, unified_store_enabled
 
 from helpers.sap_reports.master_tracker_builder.task_management_master import (
     run_multi_tm_export,
 )
-from helpers.tracker_builder.pull_sap_data import pull_sap_data
-from helpers.tracker_builder.pull_epw_data import pull_epw_data
-from helpers.tracker_builder.pull_land_data import pull_land_data
+from helpers.tracker_builder.parallel_extract import (
+    ExtractJob,
+    default_workers,
+    run_extractions,
+)
 from helpers.tracker_builder.update_trackers import build_sap_tracker_initial
-from helpers.tracker_builder.pull_joint_pole_data import pull_joint_pole_data
 
 # table builders (shared across programs)
 from helpers.tracker_builder.table_builders.environment_table import get_environment_table
@@ -132,6 +140,15 @@ class MASTER_TRACKER_BUILDER(ToolView):
 
         # Step 1
         self.path_var = tk.StringVar()
+        # Re-ingest even if the manifest says the file hasn't changed
+        self.force_mpp_var = tk.BooleanVar(value=False)
+        self.force_extract_var = tk.BooleanVar(value=False)
+        # Step 3 runs the programs in parallel processes
+        self.extract_workers_var = tk.IntVar(value=default_workers())
+        # Arrow-backed text columns during ingest (Step 1 and Step 3)
+        self.arrow_strings_var = tk.BooleanVar(value=arrow_strings_enabled())
+        # Master tools read one cross-program DB (services/db/unified_store.py)
+        self.unified_store_var = tk.BooleanVar(value=unified_store_enabled())
 
         # Step 2 – folder + per-tracker SAP files + shared EPW / Land
         self.var_sap = tk.StringVar()  # destination folder for SAP exports
@@ -210,6 +227,20 @@ class MASTER_TRACKER_BUILDER(ToolView):
         )
         self.generate_btn.grid(row=0, column=3, sticky="w")
 
+        ttk.Checkbutton(
+            fr4,
+            text="Force reload",
+            variable=self.force_mpp_var,
+        ).grid(row=0, column=4, sticky="w", padx=(8, 0))
+
+        ttk.Checkbutton(
+            fr4,
+            text="Arrow strings (less memory)",
+            variable=self.arrow_strings_var,
+            command=lambda: set_arrow_strings(self.arrow_strings_var.get()),
+            state="normal" if arrow_available() else "disabled",
+        ).grid(row=0, column=5, sticky="w", padx=(8, 0))
+
         # ---- Row 5: Step 2 title ----
         ttk.Label(
             self,
@@ -310,6 +341,21 @@ class MASTER_TRACKER_BUILDER(ToolView):
         )
         self.btn_extract.grid(row=0, column=0)
 
+        ttk.Checkbutton(
+            fr_btn,
+            text="Force reload (ignore unchanged files)",
+            variable=self.force_extract_var,
+        ).grid(row=0, column=1, sticky="w", padx=(8, 0))
+
+        ttk.Label(fr_btn, text="Workers:").grid(row=0, column=2, sticky="w", padx=(16, 4))
+        ttk.Spinbox(
+            fr_btn,
+            from_=1,
+            to=len(DB_CHOICES),
+            width=4,
+            textvariable=self.extract_workers_var,
+        ).grid(row=0, column=3, sticky="w")
+
         # ---- Row 17: Tracker Tools heading ----
         ttk.Label(self, text="Tracker Tools", font=FONT_H1).grid(
             row=17, column=0, columnspan=6, sticky="w", padx=16, pady=(12, 4)
@@ -351,6 +397,19 @@ class MASTER_TRACKER_BUILDER(ToolView):
         )
         self.btn_add_to_report.grid(row=0, column=2, padx=(0, 8))
 
+        ttk.Button(
+            left_fr,
+            text="Ingest Log",
+            command=self._on_show_ingest_log,
+        ).grid(row=0, column=3, padx=(0, 8))
+
+        ttk.Checkbutton(
+            left_fr,
+            text="Unified store",
+            variable=self.unified_store_var,
+            command=self._on_toggle_unified_store,
+        ).grid(row=0, column=4, padx=(0, 8))
+
         # Right group: Database + Tracker dropdowns
         right_fr = ttk.Frame(fr_tools)
         right_fr.grid(row=0, column=2, sticky="e")
@@ -450,10 +509,34 @@ class MASTER_TRACKER_BUILDER(ToolView):
         self.configure(cursor="watch")
         self.update_idletasks()
 
+        count_tables = [
+            "permit_tracker",
+            "land_tracker",
+            "environment_tracker",
+            "joint_pole_tracker",
+            "faa_tracker",
+            "miscTSK_tracker",
+        ]
+
         def worker() -> None:
             rows_for_report: list[dict] = []
             errors: list[str] = []
 
+            # One statement covers every program: the unified store when that option is
+            # on, else a COUNT(*) per attached program DB (services/db/federated.py)
+            all_counts: dict | None = None
+            if unified_store_enabled():
+                try:
+                    all_counts = tracker_counts(count_tables)
+                except Exception:
+                    all_counts = None
+            count_error = ""
+            if all_counts is None:
+                try:
+                    all_counts = federated_counts(count_tables)
+                except Exception as e:
+                    all_counts, count_error = {}, f"{type(e).__name__}: {e}"
+
             for label, db_mod in trackers:
                 db_path = db_mod.default_db_path()
                 if not os.path.isfile(db_path):
@@ -463,38 +546,27 @@ class MASTER_TRACKER_BUILDER(ToolView):
                     )
                     continue
 
-                try:
-                    with sqlite3.connect(db_path) as conn:
-                        cur = conn.cursor()
-
-                        def _count(table_name: str) -> int:
-                            cur.execute(f'SELECT COUNT(*) FROM "{table_name}"')
-                            val = cur.fetchone()
-                            return int(val[0]) if val and val[0] is not None else 0
-
-                        permit       = _count("permit_tracker")
-                        land         = _count("land_tracker")
-                        environment  = _count("environment_tracker")
-                        joint_pole   = _count("joint_pole_tracker")
-                        faa          = _count("faa_tracker")
-                        misctsk      = _count("miscTSK_tracker")
-
-                    added_on = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-                    rows_for_report.append(
-                        {
-                            "Database Type": label,
-                            "Permit": permit,
-                            "Land": land,
-                            "Environment": environment,
-                            "Joint Pole": joint_pole,
-                            "FAA": faa,
-                            "MiscTSK": misctsk,
-                            "Added On": added_on,
-                        }
-                    )
-                except Exception as e:
-                    errors.append(f"- {label}: {type(e).__name__}: {e}")
+                counts = all_counts.get(db_mod.PROGRAM.spec.name)
+                if counts is None:
+                    errors.append(f"- {label}: {count_error or 'Database not found'}")
+                    continue
+                missing = [t for t in count_tables if counts[t] is None]
+                if missing:
+                    errors.append(f"- {label}: OperationalError: no such table: {missing[0]}")
+                    continue
+
+                rows_for_report.append(
+                    {
+                        "Database Type": label,
+                        "Permit": counts["permit_tracker"],
+                        "Land": counts["land_tracker"],
+                        "Environment": counts["environment_tracker"],
+                        "Joint Pole": counts["joint_pole_tracker"],
+                        "FAA": counts["faa_tracker"],
+                        "MiscTSK": counts["miscTSK_tracker"],
+                        "Added On": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    }
+                )
 
             # Write to dependency_report.sqlite3
             if rows_for_report:
@@ -677,6 +749,49 @@ class MASTER_TRACKER_BUILDER(ToolView):
 
         threading.Thread(target=worker, daemon=True).start()
 
+    def _on_toggle_unified_store(self) -> None:
+        """Switch the master tools to/from the unified store; build it in the background."""
+        enabled = bool(self.unified_store_var.get())
+        set_unified_store(enabled)
+        if enabled:
+            threading.Thread(target=self._warm_unified_store, daemon=True).start()
+
+    @staticmethod
+    def _warm_unified_store() -> None:
+        try:
+            refresh_unified()
+        except Exception as e:
+            print(f"[Unified store] {type(e).__name__}: {e}")
+
+    def _on_show_ingest_log(self, limit: int = 25) -> None:
+        """Show the last `limit` ingest_runs rows (stage timings) for the selected DB."""
+        db_path = self._get_db_path_for_selection()
+        if not db_path:
+            messagebox.showwarning("Ingest Log", "Select a database first.")
+            return
+        try:
+            text = format_runs(recent_runs(db_path, limit))
+        except Exception as e:
+            messagebox.showerror("Ingest Log", f"Could not read ingest runs:\n{e}")
+            return
+
+        win = tk.Toplevel(self)
+        win.title(f"Ingest Log - {self.db_var.get()} (last {limit} runs)")
+        win.transient(self)
+
+        txt = tk.Text(win, wrap="none", font=("Courier New", 9), width=150, height=limit + 4)
+        vsb = ttk.Scrollbar(win, orient="vertical", command=txt.yview)
+        hsb = ttk.Scrollbar(win, orient="horizontal", command=txt.xview)
+        txt.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        txt.insert("1.0", text)
+        txt.configure(state="disabled")
+
+        txt.grid(row=0, column=0, sticky="nsew")
+        vsb.grid(row=0, column=1, sticky="ns")
+        hsb.grid(row=1, column=0, sticky="ew")
+        win.rowconfigure(0, weight=1)
+        win.columnconfigure(0, weight=1)
+
     def _get_db_path_for_selection(self) -> str | None:
         """Map dropdown database name -> concrete DB path."""
         name = (self.db_var.get() or "").strip()
@@ -831,6 +946,8 @@ class MASTER_TRACKER_BUILDER(ToolView):
             messagebox.showerror("Invalid file", f"File not found:\n{path}")
             return
 
+        force = bool(self.force_mpp_var.get())
+
         # Mark UI as busy
         self.generate_btn.configure(state="disabled")
         self.browse_btn.configure(state="disabled")
@@ -849,50 +966,105 @@ class MASTER_TRACKER_BUILDER(ToolView):
             results: List[Dict[str, Any]] = []
             errors: List[Dict[str, Any]] = []
 
-            for label, db_mod in trackers:
-                popup_holder: Dict[str, BusyPopup] = {}
-                ready = threading.Event()
-
-                # Create a BusyPopup on the main thread
-                def create_popup(lbl: str = label) -> None:
-                    popup_holder["popup"] = BusyPopup(
-                        self,
-                        title=f"Updating MPP Database for {lbl}",
-                    )
-                    ready.set()
+            popup_holder: Dict[str, BusyPopup] = {}
+            ready = threading.Event()
 
-                self.after(0, create_popup)
-                # Wait until the popup is created before doing heavy work
-                ready.wait()
-                popup = popup_holder["popup"]
+            # Create a BusyPopup on the main thread
+            def create_popup() -> None:
+                popup_holder["popup"] = BusyPopup(
+                    self,
+                    title="Updating MPP Database for all trackers",
+                )
+                ready.set()
 
-                try:
-                    # Heavy work in the background thread
-                    df = db_mod.load_and_filter_csv(path)
-                    rows = db_mod.replace_mpp_data(df)
-                    existing_before, inserted = (
-                        db_mod.update_order_tracking_list_from_mpp()
-                    )
+            self.after(0, create_popup)
+            # Wait until the popup is created before doing heavy work
+            ready.wait()
+            popup = popup_holder["popup"]
 
-                    results.append(
-                        {
-                            "label": label,
-                            "rows": rows,
-                            "existing_before": existing_before,
-                            "inserted": inserted,
-                        }
-                    )
-                except Exception as e:
-                    errors.append({"label": label, "error": e})
-                finally:
-                    # Close the popup on the main thread
-                    def close_popup(p: BusyPopup = popup) -> None:
+            try:
+                # Heavy work in the background thread:
+                # parse the CSV once, then split it per program
+                # Programs whose last ingest was this exact file are skipped
+                todo: List[Tuple[str, Any]] = []
+                for label, db_mod in trackers:
+                    prev = None
+                    if not force:
                         try:
-                            p.finish()
-                        except Exception:
-                            pass
+                            prev = unchanged_rows(
+                                db_mod.default_db_path(), "MPP", path, db_mod.MPP_FILTER.params_key()
+                            )
+                        except Exception as e:
+                            errors.append({"label": label, "error": e})
+                            continue
+                    if prev is None:
+                        todo.append((label, db_mod))
+                    else:
+                        results.append(
+                            {
+                                "label": label,
+                                "rows": prev,
+                                "delta": "unchanged file, skipped",
+                                "existing_before": None,
+                                "inserted": 0,
+                            }
+                        )
 
-                    self.after(0, close_popup)
+                engine: Optional[str] = None
+                t0 = time.perf_counter()
+                shared = IngestProfile("MPP", path, "mpp_data")
+                try:
+                    partitions = partition_mpp_csv(path, todo, shared) if todo else {}
+                    engine, _reason = get_last_engine() if todo else (None, None)
+                except Exception as e:
+                    partitions = {}
+                    for label, _db_mod in todo:
+                        errors.append({"label": label, "error": e})
+                # The shared read is split evenly; each program adds only its own write
+                read_share = (time.perf_counter() - t0) / max(1, len(partitions))
+
+                for label, db_mod in todo:
+                    if label not in partitions:
+                        continue
+                    t_prog = time.perf_counter()
+                    try:
+                        # Incremental load: only changed rows are written
+                        delta = db_mod.upsert_mpp_data(
+                            partitions[label], shared.share(len(partitions[label]))
+                        )
+                        existing_before, inserted = (
+                            db_mod.update_order_tracking_list_from_mpp()
+                        )
+                        record_ingest(
+                            db_mod.default_db_path(),
+                            "MPP",
+                            path,
+                            "mpp_data",
+                            delta.rows,
+                            read_share + time.perf_counter() - t_prog,
+                            db_mod.MPP_FILTER.params_key(),
+                        )
+
+                        results.append(
+                            {
+                                "label": label,
+                                "rows": delta.rows,
+                                "delta": delta.summary(),
+                                "existing_before": existing_before,
+                                "inserted": inserted,
+                            }
+                        )
+                    except Exception as e:
+                        errors.append({"label": label, "error": e})
+            finally:
+                # Close the popup on the main thread
+                def close_popup(p: BusyPopup = popup) -> None:
+                    try:
+                        p.finish()
+                    except Exception:
+                        pass
+
+                self.after(0, close_popup)
 
             # Final UI cleanup and messaging on the main thread
             def done() -> None:
@@ -928,6 +1100,10 @@ class MASTER_TRACKER_BUILDER(ToolView):
                             f"• {r['label']}: mpp_data rows = {r['rows']}, "
                             f"new orders added = {r['inserted']}"
                         )
+                        lines.append(f"    ({r['delta']})")
+                    if engine:
+                        lines.append("")
+                        lines.append(f"CSV reader: {engine}")
                     messagebox.showinfo("MPP Update Complete", "\n".join(lines))
 
             self.after(0, done)
@@ -1044,6 +1220,8 @@ class MASTER_TRACKER_BUILDER(ToolView):
         - For Maintenance / Poles / Poles RFC we also:
             * drop Priority = 'B'
             * filter EPW rows to a subset of SAP statuses
+        - Programs run in parallel processes (Workers spinbox); each writes only
+          its own DB, and a failure in one is reported without stopping the rest.
         """
         paths = {
             "Maintenance SAP": self.var_sap_maint.get().strip(),
@@ -1064,6 +1242,12 @@ class MASTER_TRACKER_BUILDER(ToolView):
             )
             return
 
+        force = bool(self.force_extract_var.get())
+        try:
+            workers = max(1, int(self.extract_workers_var.get()))
+        except (tk.TclError, ValueError):
+            workers = default_workers()
+
         busy = BusyPopup(self, title="Extracting Data for All Trackers")
         self.btn_extract.configure(state="disabled")
         self.configure(cursor="watch")
@@ -1124,52 +1308,59 @@ class MASTER_TRACKER_BUILDER(ToolView):
                 ]
 
 
-                epw_path = paths["EPW"]
-                land_path = paths["LAND"]
-                joint_path = paths["JOINT"]
-
-                for (
-                    label,
-                    db_mod,
-                    sap_path,
-                    allowed_mat,
-                    remove_btag,
-                    remove_sap_status,
-                    sap_status_to_keep,
-                ) in trackers:
-                    db_path = db_mod.default_db_path()
-                    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-
-                    # SAP
-                    t1, n1 = pull_sap_data(db_path, sap_path)
-                    msgs.append(f"{label}: {t1} (SAP) = {n1:,} rows")
-
-                    # EPW – now using the extended signature
-                    t2, n2 = pull_epw_data(
-                        db_path,
-                        epw_path,
-                        allowed_mat,
-                        REMOVE_BTAG=remove_btag,
-                        REMOVE_SAP_STATUS=remove_sap_status,
-                        SAP_STATUS_TO_KEEP=sap_status_to_keep,
+                jobs = [
+                    ExtractJob(
+                        label=label,
+                        db_path=db_mod.default_db_path(),
+                        sap_path=sap_path,
+                        epw_path=paths["EPW"],
+                        land_path=paths["LAND"],
+                        joint_path=paths["JOINT"],
+                        allowed_mat=allowed_mat,
+                        remove_btag=remove_btag,
+                        remove_sap_status=remove_sap_status,
+                        sap_status_to_keep=sap_status_to_keep,
+                        force=force,
                     )
-                    msgs.append(f"{label}: {t2} (EPW) = {n2:,} rows")
-
-                    # Land (unchanged)
-                    # Land – now using extended signature (same flags as EPW)
-                    t3, n3 = pull_land_data(
-                        db_path,
-                        land_path,
+                    for (
+                        label,
+                        db_mod,
+                        sap_path,
                         allowed_mat,
-                        REMOVE_BTAG=remove_btag,
-                        REMOVE_SAP_STATUS=remove_sap_status,
-                        SAP_STATUS_TO_KEEP=sap_status_to_keep,
+                        remove_btag,
+                        remove_sap_status,
+                        sap_status_to_keep,
+                    ) in trackers
+                ]
+
+                # One process per program DB (independent files); errors are per program
+                t0 = time.perf_counter()
+                results = run_extractions(jobs, max_workers=workers)
+                elapsed = time.perf_counter() - t0
+
+                failed = [r for r in results if not r.ok]
+                for r in results:
+                    msgs.extend(r.msgs)
+                    if r.ok:
+                        msgs.append(f"{r.label}: done in {r.duration_s:.1f}s")
+                    else:
+                        msgs.append(f"{r.label}: FAILED – {r.error}")
+                msgs.append(f"Total: {elapsed:.1f}s with {workers} worker(s)")
+
+                if failed:
+                    err_text = (
+                        f"{len(failed)} of {len(results)} tracker(s) failed.\n\n"
+                        + "\n".join(msgs)
                     )
-                    msgs.append(f"{label}: {t3} (Land) = {n3:,} rows")
 
-                    # Joint Pole – shared file, filtered by each program's ALLOWED_MAT
-                    tbl, n = pull_joint_pole_data(db_path, joint_path, allowed_mat)
-                    msgs.append(f"{label}: {tbl} (Joint Pole) = {n:,} rows")
+                    def done_partial() -> None:
+                        busy.finish()
+                        self.btn_extract.configure(state="normal")
+                        self.configure(cursor="")
+                        messagebox.showerror("Extraction Failed", err_text)
+
+                    self.after(0, done_partial)
+                    return
 
                 def done_ok() -> None:
                     busy.finish()
@@ -1278,6 +1469,13 @@ class MASTER_TRACKER_BUILDER(ToolView):
                 except Exception as e:
                     errors.append((label, f"{type(e).__name__}: {e}"))
 
+            # Copy the fresh trackers into the unified store now rather than on first read
+            if unified_store_enabled():
+                try:
+                    refresh_unified()
+                except Exception as e:
+                    errors.append(("Unified store", f"{type(e).__name__}: {e}"))
+
             def done() -> None:
                 busy.finish()
                 if self.btn_update_trackers is not None:
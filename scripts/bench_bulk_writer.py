@@ -0,0 +1,107 @@
+# scripts/bench_bulk_writer.py
+from __future__ import annotations
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Allow running as `python scripts/bench_bulk_writer.py` from the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.db.bulk_writer import (  # noqa: E402
+    INGEST_JOURNAL_MODE,
+    INGEST_SYNCHRONOUS,
+    bulk_replace,
+)
+from services.db.mpp_ingest import MPP_INDEXES  # noqa: E402
+from services.db.wmp_db import MPP_SCHEMA  # noqa: E402
+
+# ------------------------
+# Synthetic mpp_data-shaped frame
+# ------------------------
+def build_frame(n: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    data = {}
+    for col, typ in MPP_SCHEMA.items():
+        if typ == "INTEGER":
+            s = pd.Series(rng.integers(10_000_000, 99_999_999, n), dtype="Int64")
+            s[rng.random(n) < 0.05] = pd.NA
+        else:
+            s = pd.Series(rng.choice(["A", "BB", "CCC", "01/02/2025", "some longer text"], n), dtype=object)
+            s[rng.random(n) < 0.1] = None
+        data[col] = s
+    return pd.DataFrame(data)
+
+
+def _time(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def _fresh(path: str) -> sqlite3.Connection:
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA journal_mode={INGEST_JOURNAL_MODE}")
+    conn.execute(f"PRAGMA synchronous={INGEST_SYNCHRONOUS}")
+    return conn
+
+
+# ------------------------
+# Main
+# ------------------------
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Compare DataFrame.to_sql with bulk_replace on mpp_data.")
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--repeat", type=int, default=3, help="best-of-N timing")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    df = build_frame(args.rows, args.seed)
+    tmp = tempfile.mkdtemp(prefix="bench_bulk_")
+    ref_path = os.path.join(tmp, "to_sql.sqlite3")
+    bulk_path = os.path.join(tmp, "bulk.sqlite3")
+
+    def run_to_sql(with_indexes: bool) -> None:
+        conn = _fresh(ref_path)
+        df.to_sql("mpp_data", conn, if_exists="replace", index=False)
+        if with_indexes:
+            for name, cols in MPP_INDEXES:
+                col_sql = ", ".join(f'"{c}"' for c in cols)
+                conn.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON mpp_data({col_sql})')
+        conn.commit()
+        conn.close()
+
+    def run_bulk(with_indexes: bool) -> None:
+        conn = _fresh(bulk_path)
+        bulk_replace(conn, "mpp_data", df, MPP_SCHEMA, MPP_INDEXES if with_indexes else ())
+        conn.close()
+
+    results = {}
+    for label, fn in (("to_sql", run_to_sql), ("bulk_replace", run_bulk)):
+        for with_idx in (False, True):
+            results[(label, with_idx)] = min(_time(lambda: fn(with_idx)) for _ in range(args.repeat))
+
+    ref = sqlite3.connect(ref_path).execute("SELECT * FROM mpp_data").fetchall()
+    got = sqlite3.connect(bulk_path).execute("SELECT * FROM mpp_data").fetchall()
+
+    print(f"rows:          {args.rows:,} x {len(MPP_SCHEMA)} cols (best of {args.repeat})")
+    print(f"{'':14} {'load':>9} {'load+indexes':>14}")
+    for label in ("to_sql", "bulk_replace"):
+        print(f"{label + ':':14} {results[(label, False)]:8.3f}s {results[(label, True)]:13.3f}s")
+    speed_load = results[("to_sql", False)] / max(results[("bulk_replace", False)], 1e-9)
+    speed_all = results[("to_sql", True)] / max(results[("bulk_replace", True)], 1e-9)
+    print(f"speedup:       {speed_load:8.2f}x {speed_all:13.2f}x")
+    print(f"identical:     {ref == got}")
+    return 0 if ref == got else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,88 @@
+# scripts/bench_date_normalize.py
+from __future__ import annotations
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# Allow running as `python scripts/bench_date_normalize.py` from the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.db.date_normalize import legacy_to_mdy, normalize_dates_mdy  # noqa: E402
+
+# ------------------------
+# Synthetic MPP-like date column
+# ------------------------
+def _sample_value(rng: random.Random) -> str:
+    y = rng.randint(2018, 2030)
+    m = rng.randint(1, 12)
+    d = rng.randint(1, 28)
+    pick = rng.random()
+    if pick < 0.30:
+        return ""                                    # most date cells are blank
+    if pick < 0.70:
+        return f"{m}/{d}/{y}"                        # what the MPP export normally has
+    if pick < 0.80:
+        return f"{y}-{m:02d}-{d:02d}"
+    if pick < 0.85:
+        return f"{y}-{m:02d}-{d:02d}T13:45:00Z"
+    if pick < 0.88:
+        return f"{m:02d}/{d:02d}/{y % 100:02d}"
+    if pick < 0.90:
+        return str(rng.randint(40000, 50000))        # Excel serial
+    if pick < 0.905:
+        return str(rng.randint(1_500_000_000, 1_900_000_000))            # epoch seconds
+    if pick < 0.91:
+        return str(rng.randint(100_000_000_001, 1_900_000_000_000))      # epoch millis
+    if pick < 0.915:
+        return str(rng.randint(10**13, 10**18))      # IDs etc.: too big for any date
+    if pick < 0.93:
+        return rng.choice(["N/A", "TBD", "-", "NULL"])
+    if pick < 0.95:
+        return f"{d:02d}-Jan-{y}"
+    if pick < 0.97:
+        return f"Mar {d}, {y}"
+    return rng.choice(["13/40/2025", "garbage", "2/30/2024", "Q3 2025"])
+
+
+def build_series(n: int, seed: int) -> pd.Series:
+    rng = random.Random(seed)
+    return pd.Series([_sample_value(rng) for _ in range(n)], dtype=object)
+
+
+# ------------------------
+# Main
+# ------------------------
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark per-cell vs column-at-a-time date coercion.")
+    ap.add_argument("--rows", type=int, default=50_000)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    s = build_series(args.rows, args.seed)
+
+    t0 = time.perf_counter()
+    legacy = s.apply(legacy_to_mdy)
+    t_legacy = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    fast = normalize_dates_mdy(s)
+    t_fast = time.perf_counter() - t0
+
+    mismatches = int((legacy != fast).sum())
+    print(f"rows:        {args.rows:,}")
+    print(f"legacy:      {t_legacy:8.3f}s")
+    print(f"vectorized:  {t_fast:8.3f}s  ({t_legacy / max(t_fast, 1e-9):.1f}x)")
+    print(f"mismatches:  {mismatches}")
+    if mismatches:
+        diff = pd.DataFrame({"input": s, "legacy": legacy, "vectorized": fast})[legacy != fast]
+        print(diff.head(20).to_string())
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
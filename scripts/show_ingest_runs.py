@@ -0,0 +1,48 @@
+# scripts/show_ingest_runs.py
+from __future__ import annotations
+import argparse
+import sys
+from pathlib import Path
+
+# Allow running as `python scripts/show_ingest_runs.py` from the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from services.db import maintenance_db, maintenance_rfc_db, poles_db, poles_rfc_db, wmp_db  # noqa: E402
+from services.db.db_maintenance import format_maintenance, recent_maintenance  # noqa: E402
+from services.db.ingest_runs import format_runs, recent_runs  # noqa: E402
+
+# Relative to the repo root, like the app itself
+PROGRAM_DBS = {
+    "wmp": wmp_db.DB_PATH,
+    "maintenance": maintenance_db.DB_PATH,
+    "maintenance_rfc": maintenance_rfc_db.DB_PATH,
+    "poles": poles_db.DB_PATH,
+    "poles_rfc": poles_rfc_db.DB_PATH,
+}
+
+
+# ------------------------
+# Main
+# ------------------------
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Print the last N ingest runs (per-stage timings) of a tracker DB.")
+    ap.add_argument("db", help=f"path to a .sqlite3 file, or one of: {', '.join(PROGRAM_DBS)}")
+    ap.add_argument("-n", "--limit", type=int, default=20)
+    ap.add_argument("--source", help="only this source (MPP, SAP, EPW, LAND, JOINT_POLE)")
+    ap.add_argument("--maintenance", action="store_true",
+                    help="show the post-Extract / Update maintenance runs (sizes, timings) instead")
+    args = ap.parse_args()
+
+    db_path = PROGRAM_DBS.get(args.db.lower(), args.db)
+    if not Path(db_path).exists():
+        print(f"no such database: {db_path}", file=sys.stderr)
+        return 1
+    if args.maintenance:
+        print(format_maintenance(recent_maintenance(db_path, args.limit)))
+    else:
+        print(format_runs(recent_runs(db_path, args.limit, args.source)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
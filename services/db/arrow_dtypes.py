@@ -0,0 +1,84 @@
+# services/db/arrow_dtypes.py
+from __future__ import annotations
+import importlib.util
+import os
+from typing import Callable, Optional
+import numpy as np
+import pandas as pd
+
+# ------------------------
+# Arrow-backed text columns for ingest (opt-in)
+# ------------------------
+# By default ingest keeps text as Python str objects in object columns (~50+ bytes
+# per cell plus a pointer). With the option on, the readers hand back Arrow-backed
+# strings instead: one contiguous buffer per column, and .str.upper() / .isin() /
+# .str.strip() run in Arrow compute instead of a Python loop.
+#
+# The dtype is pandas' StringDtype("pyarrow", na_value=NaN), i.e. the pandas 3
+# default string type. Its missing-value rules are the object ones the ingest code
+# was written against: comparisons and .isin() give plain numpy bools (NaN != "B"
+# is True), so the existing filter expressions keep the same rows. Integers are
+# already nullable Int64 on both paths. The bulk writer turns NaN into NULL, so the
+# DB ends up byte-for-byte the same either way.
+#
+# Only the producers (CSV / Excel readers, date formatting) look at the option.
+# Everything downstream dispatches on the dtype it's given.
+#
+# The switch is an environment variable so ProcessPool workers follow the parent.
+
+ARROW_STRINGS_ENV = "TRACKER_ARROW_STRINGS"
+_TRUE = {"1", "true", "yes", "on"}
+
+
+def arrow_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def arrow_strings_enabled() -> bool:
+    """True when the option is on and pyarrow is importable."""
+    return os.environ.get(ARROW_STRINGS_ENV, "").strip().lower() in _TRUE and arrow_available()
+
+
+def set_arrow_strings(enabled: bool) -> None:
+    """Turn the option on/off for this process and any workers it starts."""
+    os.environ[ARROW_STRINGS_ENV] = "1" if enabled else "0"
+
+
+def text_dtype() -> pd.StringDtype:
+    """Arrow-backed string dtype with NaN as the missing value."""
+    try:
+        return pd.StringDtype("pyarrow", na_value=np.nan)
+    except TypeError:
+        # pandas < 2.3 spells the same dtype "pyarrow_numpy"
+        return pd.StringDtype("pyarrow_numpy")
+
+
+def is_text_dtype(dtype) -> bool:
+    return isinstance(dtype, pd.StringDtype)
+
+
+def to_text(series: pd.Series) -> pd.Series:
+    """A column of str / None as Arrow strings when the option is on, else unchanged."""
+    if not arrow_strings_enabled() or is_text_dtype(series.dtype):
+        return series
+    return series.astype(text_dtype())
+
+
+def cells_to_text(series: pd.Series) -> pd.Series:
+    """
+    Excel cells -> text column: str(value), missing stays missing. The object path
+    is the original `.astype(str).where(notna, None)`; the Arrow cast gives the same
+    strings without building the intermediate object column.
+    """
+    if arrow_strings_enabled():
+        return series.astype(text_dtype())
+    return series.astype(str).where(series.notna(), None)
+
+
+def arrow_types_mapper() -> Optional[Callable]:
+    """types_mapper for pyarrow Table.to_pandas(): Arrow strings when on, None (object) when off."""
+    if not arrow_strings_enabled():
+        return None
+    import pyarrow as pa
+    mapping = {pa.string(): text_dtype(), pa.large_string(): text_dtype()}
+    return mapping.get
@@ -0,0 +1,196 @@
+# services/db/bulk_writer.py
+from __future__ import annotations
+import sqlite3
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+# ------------------------
+# Bulk SQLite writer
+# ------------------------
+# Shared replacement for DataFrame.to_sql in the ingest paths:
+#   - the table is created from an explicit schema (MPP_SCHEMA etc.) instead of
+#     pandas' type inference
+#   - rows go in with executemany() in one transaction, in fixed-size batches,
+#     several rows per INSERT statement
+#   - indexes are created after the rows are in (one sort per index instead of
+#     maintaining every index on every insert)
+#   - journal_mode / synchronous are chosen per call
+#   - analyze=True refreshes the planner stats for the table once its indexes exist,
+#     so joins on the fresh table pick the index instead of a scan
+#
+# Values are stored the same way to_sql stores them: NA -> NULL, numpy scalars ->
+# Python int/float, text as-is.
+#
+# This is about having one writer (explicit schemas, index/ANALYZE handling, pragma
+# control) rather than speed: scripts/bench_bulk_writer.py puts the load alone at
+# ~1.2x to_sql and load + indexes about even, since building the indexes is the same
+# work either way. Larger/smaller multi-row batches, synchronous=OFF, a bigger
+# cache_size and temp_store=MEMORY made no difference beyond run-to-run noise.
+
+IndexSpec = Tuple[str, Sequence[str]]      # (index name, [columns])
+
+_BATCH_ROWS = 20_000
+_MAX_ROWS_PER_STMT = 100        # multi-row VALUES; stays well under SQLite's compound limit
+
+# What the ingest paths pass (same as get_connection() in the program DB modules)
+INGEST_JOURNAL_MODE = "WAL"
+INGEST_SYNCHRONOUS = "NORMAL"
+
+
+def _q(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def schema_from_frame(df: pd.DataFrame) -> Dict[str, str]:
+    """SQLite column types for df, using the same mapping to_sql uses."""
+    out: Dict[str, str] = {}
+    for col, dtype in df.dtypes.items():
+        if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+            out[str(col)] = "INTEGER"
+        elif pd.api.types.is_float_dtype(dtype):
+            out[str(col)] = "REAL"
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            out[str(col)] = "TIMESTAMP"
+        else:
+            out[str(col)] = "TEXT"
+    return out
+
+
+def _py_value(v):
+    if v is None or v is pd.NA or v is pd.NaT:
+        return None
+    if isinstance(v, float) and v != v:
+        return None
+    if isinstance(v, np.generic):
+        v = v.item()
+        return None if isinstance(v, float) and v != v else v
+    if isinstance(v, (pd.Timestamp, datetime, date)):
+        return str(v)
+    return v
+
+
+def _column_values(s: pd.Series) -> np.ndarray:
+    """One column as a 1-D object array of plain Python values with None for missing."""
+    if pd.api.types.is_datetime64_any_dtype(s.dtype):
+        # to_sql stores datetimes as ISO text
+        return np.asarray([None if pd.isna(v) else str(v) for v in s], dtype=object)
+    if pd.api.types.is_bool_dtype(s.dtype) and s.dtype != object:
+        return np.asarray([None if pd.isna(v) else int(v) for v in s.astype(object)], dtype=object)
+    if s.dtype == object:
+        if pd.api.types.infer_dtype(s, skipna=True) in ("string", "empty"):
+            # Plain text column (the common case): only the blanks need fixing
+            arr = s.to_numpy(dtype=object, copy=True)
+            arr[pd.isna(arr)] = None
+            return arr
+        return np.asarray([_py_value(v) for v in s], dtype=object)
+    # numeric (incl. nullable Int64 / Float64): object array of Python scalars
+    return s.to_numpy(dtype=object, na_value=None)
+
+
+def row_matrix(df: pd.DataFrame) -> np.ndarray:
+    """df as a 2-D object array of plain Python values (rows x columns)."""
+    arr = np.empty((len(df), len(df.columns)), dtype=object)
+    for j, c in enumerate(df.columns):
+        arr[:, j] = _column_values(df[c])
+    return arr
+
+
+def iter_rows(df: pd.DataFrame, batch_rows: int = _BATCH_ROWS) -> Iterator[List[tuple]]:
+    """Yield lists of row tuples, batch_rows at a time."""
+    for start in range(0, len(df), batch_rows):
+        yield [tuple(r) for r in row_matrix(df.iloc[start:start + batch_rows]).tolist()]
+
+
+def _apply_pragmas(conn: sqlite3.Connection, journal_mode: Optional[str], synchronous: Optional[str]) -> None:
+    # journal_mode can't change inside a transaction; callers pass settings per call
+    if journal_mode:
+        conn.execute(f"PRAGMA journal_mode={journal_mode}")
+    if synchronous:
+        conn.execute(f"PRAGMA synchronous={synchronous}")
+
+
+def create_indexes(conn: sqlite3.Connection, table: str, indexes: Iterable[IndexSpec]) -> None:
+    for name, cols in indexes:
+        cols_sql = ", ".join(_q(c) for c in cols)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {_q(name)} ON {_q(table)}({cols_sql})")
+
+
+def analyze_table(conn: sqlite3.Connection, table: str) -> None:
+    """ANALYZE one table (its sqlite_stat1 rows); commits."""
+    conn.execute(f"ANALYZE {_q(table)}")
+    conn.commit()
+
+
+def _rows_per_statement(n_cols: int) -> int:
+    # Bound parameters per statement: 999 before SQLite 3.32, 32766 after
+    max_vars = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+    return max(1, min(_MAX_ROWS_PER_STMT, max_vars // max(1, n_cols)))
+
+
+def bulk_insert(conn: sqlite3.Connection, table: str, df: pd.DataFrame, batch_rows: int = _BATCH_ROWS) -> int:
+    """Append df to an existing table (no transaction handling; caller commits)."""
+    if df.empty:
+        return 0
+    cols_sql = ", ".join(_q(c) for c in df.columns)
+    one_row = "(" + ", ".join("?" for _ in df.columns) + ")"
+    head = f"INSERT INTO {_q(table)} ({cols_sql}) VALUES "
+
+    # Several rows per INSERT: far fewer statement steps than one row at a time.
+    # Reshaping the row matrix gives each statement's flat parameter list directly.
+    n_cols = len(df.columns)
+    k = _rows_per_statement(n_cols)
+    multi_sql = head + ", ".join([one_row] * k)
+    for start in range(0, len(df), batch_rows):
+        arr = row_matrix(df.iloc[start:start + batch_rows])
+        full = len(arr) // k * k
+        if full:
+            conn.executemany(multi_sql, arr[:full].reshape(-1, k * n_cols).tolist())
+        if full < len(arr):
+            rest = arr[full:]
+            conn.execute(head + ", ".join([one_row] * len(rest)), rest.ravel().tolist())
+    return len(df)
+
+
+def bulk_replace(
+    conn: sqlite3.Connection,
+    table: str,
+    df: pd.DataFrame,
+    schema: Optional[Dict[str, str]] = None,
+    indexes: Sequence[IndexSpec] = (),
+    journal_mode: Optional[str] = None,
+    synchronous: Optional[str] = None,
+    batch_rows: int = _BATCH_ROWS,
+    analyze: bool = False,
+) -> int:
+    """
+    Drop + recreate `table` from `schema` (default: inferred like to_sql), load df in one
+    transaction, then build `indexes` (and ANALYZE the table if `analyze`). Columns in
+    schema but not in df are left NULL; df columns not in schema are appended as TEXT.
+    Returns rows written.
+    """
+    if schema is None:
+        schema = schema_from_frame(df)
+    schema = dict(schema)
+    for c in df.columns:
+        schema.setdefault(str(c), "TEXT")
+
+    cols_sql = ", ".join(f"{_q(c)} {t}" for c, t in schema.items())
+    if conn.in_transaction:
+        conn.commit()
+    _apply_pragmas(conn, journal_mode, synchronous)
+
+    conn.execute("BEGIN")
+    try:
+        conn.execute(f"DROP TABLE IF EXISTS {_q(table)}")
+        conn.execute(f"CREATE TABLE {_q(table)} ({cols_sql})")
+        n = bulk_insert(conn, table, df, batch_rows)
+        create_indexes(conn, table, indexes)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    if analyze:
+        analyze_table(conn, table)
+    return n
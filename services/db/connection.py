@@ -0,0 +1,114 @@
+# services/db/connection.py
+from __future__ import annotations
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+# ------------------------
+# Per-thread connections + one-time schema bootstrap
+# ------------------------
+# The program DB lookups (get_mpp_first_row_by_order & co.) used to open a fresh
+# connection and run ensure_db()'s CREATE TABLE / PRAGMA table_info on every call.
+# Here:
+#   - thread_connection(path) hands back one tuned connection per thread per DB
+#     (sqlite3 connections can't be shared across threads), pragmas applied once
+#   - bootstrap_once(path, fn) runs a schema bootstrap once per process per DB
+#
+# Both key on the DB file's identity (device + inode), not just its path, so a DB
+# that was deleted or swapped for a new file gets a new connection and is
+# bootstrapped again.
+#
+# Cached connections are never closed by callers. `with conn:` still works as a
+# transaction scope (commit / rollback) the way it did with sqlite3.connect().
+
+TUNING_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-100000",    # ~100MB
+)
+
+_local = threading.local()
+_boot_lock = threading.Lock()
+_booted: Dict[Tuple[str, Callable], Tuple[int, int]] = {}
+
+
+def _file_id(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_dev, st.st_ino)
+
+
+def open_connection(path: str) -> sqlite3.Connection:
+    """New connection with the tuning pragmas (caller owns and closes it)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path)
+    try:
+        for pragma in TUNING_PRAGMAS:
+            conn.execute(pragma)
+    except sqlite3.Error:
+        pass
+    return conn
+
+
+def thread_connection(path: str) -> sqlite3.Connection:
+    """This thread's connection to `path`, opened (and tuned) on first use."""
+    key = os.path.abspath(path)
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+
+    hit = conns.get(key)
+    if hit is not None:
+        conn, fid = hit
+        if fid is not None and _file_id(key) == fid:
+            return conn
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    conn = open_connection(key)
+    conns[key] = (conn, _file_id(key))
+    return conn
+
+
+def close_thread_connections() -> None:
+    """Close this thread's cached connections (e.g. before deleting a DB file)."""
+    conns = getattr(_local, "conns", None) or {}
+    for conn, _ in conns.values():
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    conns.clear()
+
+
+def bootstrap_once(path: str, fn: Callable[[sqlite3.Connection], None]) -> None:
+    """Run fn(conn) + commit the first time this process sees this DB file; no-op after."""
+    key = (os.path.abspath(path), fn)
+    fid = _booted.get(key)
+    if fid is not None and _file_id(key[0]) == fid:
+        return
+    with _boot_lock:
+        fid = _booted.get(key)
+        if fid is not None and _file_id(key[0]) == fid:
+            return
+        conn = thread_connection(key[0])
+        with conn:
+            fn(conn)
+        _booted[key] = _file_id(key[0])
+
+
+def reset_bootstrap(path: Optional[str] = None) -> None:
+    """Forget which DBs were bootstrapped (all, or just `path`)."""
+    with _boot_lock:
+        if path is None:
+            _booted.clear()
+            return
+        dbp = os.path.abspath(path)
+        for key in [k for k in _booted if k[0] == dbp]:
+            del _booted[key]
@@ -0,0 +1,406 @@
+# services/db/date_normalize.py
+from __future__ import annotations
+import sqlite3
+from datetime import datetime
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+
+from services.db.arrow_dtypes import is_text_dtype
+
+# ------------------------
+# Shared MM/DD/YYYY date normalizer for ingest
+# ------------------------
+# normalize_dates_mdy() is a column-at-a-time replacement for the old per-cell
+# _coerce_date_mdy closure. The common shapes (ISO, M/D/Y, 2-digit years, month
+# names, Excel serials, epoch seconds/millis) are handled with vectorized passes;
+# anything those passes can't prove is handled by legacy_to_mdy(), the original
+# per-cell routine, so the output is identical to what ingest produced before.
+
+_BLANK_TOKENS = {"", "NA", "N/A", "NULL", "NONE", "NAN", "-", "—", "TBD"}
+
+_MDY_FMT = "%m/%d/%Y"
+
+_MONTHS = {
+    "JAN": 1, "FEB": 2, "MAR": 3, "APR": 4, "MAY": 5, "JUN": 6,
+    "JUL": 7, "AUG": 8, "SEP": 9, "OCT": 10, "NOV": 11, "DEC": 12,
+    "JANUARY": 1, "FEBRUARY": 2, "MARCH": 3, "APRIL": 4, "JUNE": 6, "JULY": 7,
+    "AUGUST": 8, "SEPTEMBER": 9, "OCTOBER": 10, "NOVEMBER": 11, "DECEMBER": 12,
+}
+
+# Optional time tail accepted after a date (validated numerically below)
+_TIME = r"(?:[T ]+(?P<hh>\d{1,2}):(?P<mi>\d{2})(?::(?P<ss>\d{2})(?:\.\d+)?)?)?"
+
+_PATTERNS = [
+    # 2025-01-02, 2025-01-02T13:45:00Z, 2025-01-02 13:45:00+05:30
+    ("ymd", r"^(?P<y>\d{4})-(?P<m>\d{1,2})-(?P<d>\d{1,2})" + _TIME + r"(?:Z|[+-]\d{2}:?\d{2})?$"),
+    # 2025/01/02
+    ("ymd", r"^(?P<y>\d{4})/(?P<m>\d{1,2})/(?P<d>\d{1,2})$"),
+    # 01/02/2025, 1/2/25, 01/02/2025 13:45
+    ("mdy", r"^(?P<m>\d{1,2})/(?P<d>\d{1,2})/(?P<y>\d{4}|\d{2})" + _TIME + r"$"),
+    # 01-02-2025, 1-2-25
+    ("mdy", r"^(?P<m>\d{1,2})-(?P<d>\d{1,2})-(?P<y>\d{4}|\d{2})$"),
+    # 05-Jan-2025, 05-Jan-25
+    ("dmony", r"^(?P<d>\d{1,2})-(?P<mon>[A-Za-z]{3})-(?P<y>\d{4}|\d{2})$"),
+    # Jan 5, 2025 / January 5 2025
+    ("mondy", r"^(?P<mon>[A-Za-z]{3,9})\.?\s+(?P<d>\d{1,2}),?\s+(?P<y>\d{4})$"),
+]
+
+_NUMERIC_RE = r"^[0-9]*\.?[0-9]*$"
+
+# Year window that round-trips through pandas Timestamps and 4-digit %Y
+_MIN_YEAR, _MAX_YEAR = 1678, 2261
+
+# Excel serials (days since 1899-12-30) that land inside that window. Anything
+# larger is not a serial (epoch seconds / millis, IDs); pandas >= 3 no longer
+# coerces those to NaT on its own.
+_EXCEL_ORIGIN = "1899-12-30"
+_EXCEL_SERIAL_MAX = (pd.Timestamp(f"{_MAX_YEAR + 1}-01-01") - pd.Timestamp(_EXCEL_ORIGIN)).days
+
+
+# ------------------------
+# Legacy per-cell routine (reference + fallback)
+# ------------------------
+def _from_excel_serial(x):
+    # Pandas handles Excel 1900 system via origin='1899-12-30'
+    try:
+        x = float(x)
+        if not 0 <= x < _EXCEL_SERIAL_MAX:
+            return pd.NaT
+        return pd.to_datetime(x, unit='D', origin=_EXCEL_ORIGIN, errors='coerce')
+    except Exception:
+        return pd.NaT
+
+
+def _from_epoch_number(x):
+    # Decide seconds vs millis by magnitude
+    try:
+        x = float(x)
+    except Exception:
+        return pd.NaT
+    if x > 1e12:   # micro/nano—too big, bail
+        return pd.NaT
+    if x > 1e11:   # ~> 1973 in milliseconds
+        return pd.to_datetime(x, unit='ms', errors='coerce')
+    if x > 1e9:    # ~> 2001 in seconds
+        return pd.to_datetime(x, unit='s', errors='coerce')
+    return pd.NaT
+
+
+def legacy_to_mdy(val) -> str:
+    """Original per-cell coercion: any date-ish value -> 'MM/DD/YYYY' or ''."""
+    if val is None:
+        return ""
+    s = str(val).strip()
+
+    if s == "" or s.upper() in _BLANK_TOKENS:
+        return ""
+
+    # If it's already a Timestamp or datetime-like
+    if isinstance(val, (pd.Timestamp, )):
+        dt = pd.Timestamp(val)
+        if pd.isna(dt):
+            return ""
+        return dt.strftime(_MDY_FMT)
+
+    # Numeric? Try Excel serial or epoch
+    if isinstance(val, (int, float)) or s.replace('.', '', 1).isdigit():
+        # 1) Excel serial
+        dt = _from_excel_serial(val)
+        if not pd.isna(dt):
+            return dt.strftime(_MDY_FMT)
+        # 2) Epoch
+        dt = _from_epoch_number(val)
+        if not pd.isna(dt):
+            return dt.strftime(_MDY_FMT)
+
+    # 1) Let pandas try broadly (handles ISO, timezone, and most datetime strings)
+    dt = pd.to_datetime(s, errors="coerce", utc=False)
+    if not pd.isna(dt):
+        return pd.Timestamp(dt).strftime(_MDY_FMT)
+
+    # 2) Try common explicit formats (including 2-digit years and month names)
+    fmts = [
+        "%m/%d/%Y", "%m-%d-%Y", "%Y-%m-%d",
+        "%m/%d/%y", "%m-%d-%y",
+        "%Y/%m/%d", "%d-%b-%Y", "%d-%b-%y", "%b %d, %Y",
+        "%m/%d/%Y %H:%M", "%Y-%m-%d %H:%M", "%m/%d/%y %H:%M",
+    ]
+    for fmt in fmts:
+        try:
+            dt = datetime.strptime(s, fmt)
+            return dt.strftime(_MDY_FMT)
+        except Exception:
+            pass
+
+    return ""
+
+
+# ------------------------
+# Vectorized passes
+# ------------------------
+def _two_digit_pivot() -> int:
+    """2-digit years follow the parser's sliding window: within 50 years of today."""
+    return (datetime.now().year + 50) % 100
+
+
+def _expand_years(y: pd.Series) -> pd.Series:
+    """Widen 2-digit years the same way the broad parser does; 4-digit years pass through."""
+    yi = y.astype("int64")
+    short = y.str.len() <= 2
+    if short.any():
+        century = (datetime.now().year // 100) * 100
+        widened = yi + century
+        widened = widened.where(yi < _two_digit_pivot(), widened - 100)
+        yi = yi.where(~short, widened)
+    return yi
+
+
+def _format_ymd(y: pd.Series, m: pd.Series, d: pd.Series) -> pd.Series:
+    return (
+        m.astype(str).str.zfill(2) + "/"
+        + d.astype(str).str.zfill(2) + "/"
+        + y.astype(str).str.zfill(4)
+    )
+
+
+def _valid_ymd(y: pd.Series, m: pd.Series, d: pd.Series) -> pd.Series:
+    """True where (y, m, d) is a real calendar date inside the Timestamp-safe window."""
+    in_window = y.between(_MIN_YEAR, _MAX_YEAR) & m.between(1, 12) & d.between(1, 31)
+    ok = pd.Series(False, index=y.index)
+    if in_window.any():
+        parts = pd.DataFrame(
+            {"year": y[in_window], "month": m[in_window], "day": d[in_window]}
+        )
+        ok.loc[in_window] = pd.to_datetime(parts, errors="coerce").notna().to_numpy()
+    return ok
+
+
+def _valid_time(g: pd.DataFrame) -> pd.Series:
+    """Optional HH:MM[:SS] tail must be a real wall-clock time."""
+    if "hh" not in g.columns:
+        return pd.Series(True, index=g.index)
+    hh = pd.to_numeric(g["hh"], errors="coerce")
+    mi = pd.to_numeric(g["mi"], errors="coerce")
+    ss = pd.to_numeric(g["ss"], errors="coerce")
+    no_time = hh.isna()
+    return no_time | ((hh <= 23) & (mi <= 59) & (ss.isna() | (ss <= 59)))
+
+
+def _parse_numeric(s: pd.Series) -> pd.Series:
+    """Excel serials first, then epoch seconds / millis; NaN where neither applies."""
+    x = pd.to_numeric(s, errors="coerce").astype("float64")
+    out = pd.Series(pd.NaT, index=s.index, dtype="datetime64[ns]")
+
+    serial = x.where((x >= 0) & (x < _EXCEL_SERIAL_MAX))
+    excel = pd.to_datetime(serial, unit="D", origin=_EXCEL_ORIGIN, errors="coerce")
+    out = out.where(excel.isna(), excel)
+
+    todo = out.isna() & x.notna()
+    if todo.any():
+        xt = x[todo]
+        ms = xt[(xt > 1e11) & (xt <= 1e12)]
+        sec = xt[(xt > 1e9) & (xt <= 1e11)]
+        if len(ms):
+            out.loc[ms.index] = pd.to_datetime(ms, unit="ms", errors="coerce")
+        if len(sec):
+            out.loc[sec.index] = pd.to_datetime(sec, unit="s", errors="coerce")
+    return out
+
+
+def _parse_patterns(s: pd.Series) -> pd.Series:
+    """Regex passes over text; returns MM/DD/YYYY where proven, NaN elsewhere."""
+    out = pd.Series(np.nan, index=s.index, dtype=object)
+    todo = s
+    for kind, pat in _PATTERNS:
+        if todo.empty:
+            break
+        g = todo.str.extract(pat)
+        hit = g["d"].notna()
+        if not hit.any():
+            continue
+        g = g[hit]
+
+        if kind in ("dmony", "mondy"):
+            m = g["mon"].str.upper().map(_MONTHS)
+            known = m.notna()
+            g, m = g[known], m[known].astype("int64")
+        else:
+            m = g["m"].astype("int64")
+
+        d = g["d"].astype("int64")
+        if kind == "ymd":
+            y = g["y"].astype("int64")
+        else:
+            y = _expand_years(g["y"])
+
+        ok = _valid_ymd(y, m, d) & _valid_time(g)
+        if ok.any():
+            out.loc[ok[ok].index] = _format_ymd(y[ok], m[ok], d[ok]).to_numpy()
+            todo = todo.drop(index=ok[ok].index)
+    return out
+
+
+def normalize_dates_mdy(series: pd.Series, fallback: bool = True) -> pd.Series:
+    """
+    Coerce a whole column to MM/DD/YYYY text; '' where blank or not a date.
+    Same output as the legacy per-cell routine. Cells no vectorized pass can
+    prove are sent through legacy_to_mdy() unless fallback=False, in which case
+    they come back as ''.
+    """
+    if len(series) == 0:
+        return pd.Series([], index=series.index, dtype=object)
+
+    out = pd.Series("", index=series.index, dtype=object)
+
+    # Already datetime-typed columns: just format
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.strftime(_MDY_FMT).fillna("").astype(object)
+
+    values = series.astype(object)
+    missing = values.isna()
+    is_str = values.map(lambda v: isinstance(v, str)) & ~missing
+    pending = pd.Series(False, index=series.index)
+
+    # Non-string, non-missing cells (numbers, datetimes in object columns, ...)
+    other = ~missing & ~is_str
+    if other.any():
+        pending |= other
+
+    if is_str.any():
+        s = values[is_str].str.strip()
+        blank = s.str.upper().isin(_BLANK_TOKENS)
+        s = s[~blank]
+
+        # Excel serials / epoch numbers
+        numeric = s.str.match(_NUMERIC_RE) & s.str.contains(r"[0-9]", regex=True)
+        if numeric.any():
+            dt = _parse_numeric(s[numeric])
+            got = dt.notna()
+            out.loc[got[got].index] = dt[got].dt.strftime(_MDY_FMT).to_numpy()
+            pending.loc[got[~got].index] = True
+
+        # Text patterns
+        text = s[~numeric]
+        if not text.empty:
+            parsed = _parse_patterns(text)
+            got = parsed.notna()
+            out.loc[got[got].index] = parsed[got].to_numpy()
+            pending.loc[got[~got].index] = True
+
+    if pending.any():
+        if fallback:
+            out.loc[pending] = values[pending].map(legacy_to_mdy).to_numpy()
+        else:
+            out.loc[pending] = ""
+    return out
+
+
+
+# ------------------------
+# ISO / Julian-day shadow columns
+# ------------------------
+# Date fields are stored as MM/DD/YYYY text, which doesn't sort or compare as a
+# date. Ingest also writes two companions next to each date column:
+#
+#   "<col>__iso"  TEXT     YYYY-MM-DD (NULL when the text isn't MM/DD/YYYY)
+#   "<col>__jd"   INTEGER  Julian day number of that date (= julianday(iso) + 0.5)
+#
+# The ISO value is exactly what mdy_to_iso_sql() computes in SQL, so builders can
+# read the stored column instead of re-deriving it on every run. iso_sql() picks
+# the stored column when the table has it and falls back to the SQL expression
+# for tables written before the shadows existed.
+
+ISO_SUFFIX = "__iso"
+JD_SUFFIX = "__jd"
+
+_UNIX_EPOCH_JD = 2440588  # Julian day number of 1970-01-01
+
+
+def iso_col(col: str) -> str:
+    return f"{col}{ISO_SUFFIX}"
+
+
+def jd_col(col: str) -> str:
+    return f"{col}{JD_SUFFIX}"
+
+
+def shadow_schema(date_cols) -> Dict[str, str]:
+    """SQLite types for the shadow columns of date_cols (in that order)."""
+    out: Dict[str, str] = {}
+    for c in date_cols:
+        out[iso_col(c)] = "TEXT"
+        out[jd_col(c)] = "INTEGER"
+    return out
+
+
+def mdy_to_iso(series: pd.Series) -> pd.Series:
+    """MM/DD/YYYY text -> YYYY-MM-DD text (None otherwise); same rule as mdy_to_iso_sql()."""
+    if is_text_dtype(series.dtype):
+        # Arrow strings: same slicing in Arrow compute; missing stays NaN (NULL on write)
+        txt = series.fillna("")
+        ok = (txt.str.len() == 10) & (txt.str[2] == "/") & (txt.str[5] == "/")
+        iso = txt.str[6:10] + "-" + txt.str[0:2] + "-" + txt.str[3:5]
+        return iso.where(ok)
+
+    s = series.astype(object)
+    is_str = s.map(lambda v: isinstance(v, str))
+    txt = s.where(is_str, "").astype(str)
+    ok = (txt.str.len() == 10) & (txt.str[2] == "/") & (txt.str[5] == "/")
+    iso = txt.str[6:10] + "-" + txt.str[0:2] + "-" + txt.str[3:5]
+    return iso.where(ok, None).astype(object)
+
+
+def iso_to_jd(iso: pd.Series) -> pd.Series:
+    """YYYY-MM-DD text -> Julian day number (Int64); NA when not a real date."""
+    dt = pd.to_datetime(iso, format="%Y-%m-%d", errors="coerce")
+    days = (dt - pd.Timestamp("1970-01-01")).dt.days
+    return (days + _UNIX_EPOCH_JD).astype("Int64")
+
+
+def add_date_shadows(df: pd.DataFrame, date_cols) -> pd.DataFrame:
+    """Append "<col>__iso" / "<col>__jd" for every date column present in df (in place)."""
+    for c in date_cols:
+        if c not in df.columns:
+            continue
+        iso = mdy_to_iso(df[c])
+        df[iso_col(c)] = iso
+        df[jd_col(c)] = iso_to_jd(iso)
+    return df
+
+
+def mdy_to_iso_sql(col_expr: str) -> str:
+    """CASE expression turning MM/DD/YYYY text into YYYY-MM-DD; anything else -> NULL."""
+    return f"""
+    CASE
+      WHEN {col_expr} IS NOT NULL AND LENGTH({col_expr})=10
+           AND SUBSTR({col_expr},3,1)='/' AND SUBSTR({col_expr},6,1)='/'
+        THEN SUBSTR({col_expr},7,4) || '-' || SUBSTR({col_expr},1,2) || '-' || SUBSTR({col_expr},4,2)
+      ELSE NULL
+    END
+    """
+
+
+def has_shadow(conn: sqlite3.Connection, table: str, col: str) -> bool:
+    cols = {r[1] for r in conn.execute(f'PRAGMA table_info("{table}")')}
+    return iso_col(col) in cols
+
+
+def iso_sql(
+    conn: sqlite3.Connection,
+    table: str,
+    col: str,
+    ref: str = "",
+    fallback_sql: Optional[str] = None,
+) -> str:
+    """
+    SQL for the ISO date of table.col: the stored shadow column when present,
+    else `fallback_sql` (default: mdy_to_iso_sql on the text column).
+    `ref` is the table alias used in the query ('' for none).
+    """
+    prefix = f"{ref}." if ref else ""
+    if has_shadow(conn, table, col):
+        return f'{prefix}"{iso_col(col)}"'
+    if fallback_sql is not None:
+        return fallback_sql
+    return mdy_to_iso_sql(f'{prefix}"{col}"')
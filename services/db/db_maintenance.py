@@ -0,0 +1,275 @@
+# services/db/db_maintenance.py
+from __future__ import annotations
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+import pandas as pd
+
+# ------------------------
+# Post-rebuild maintenance (ANALYZE / optimize / WAL checkpoint / VACUUM)
+# ------------------------
+# Extract replaces the source tables and Update Trackers swaps in new trackers, so
+# after either one a program DB has:
+#   - tables without sqlite_stat1 rows: a dropped table takes its stats with it, and
+#     the planner is back to guessing between e.g. the idx_mpp_* indexes
+#   - a -wal file that only shrinks on a TRUNCATE checkpoint (and keeps growing while
+#     a reader blocks the automatic ones)
+#   - free pages where the old tables were
+#
+# maintain_db() runs at the end of both (extract_program*, build_sap_tracker_initial):
+#   1. ANALYZE the tables the caller changed, plus any table that has no stats
+#   2. PRAGMA optimize=0x10002 (SQLite 3.46+ re-checks every table; older versions
+#      only look at what this connection queried, i.e. the step-1 tables)
+#   3. PRAGMA wal_checkpoint(TRUNCATE), waiting at most CHECKPOINT_WAIT_MS for readers
+#   4. VACUUM when more than VACUUM_FREE_RATIO of the pages are free and the
+#      checkpoint got through, then checkpoint again (VACUUM goes through the WAL)
+# and records one maintenance_runs row: file sizes before / after, seconds per step.
+#
+# Best-effort: the data is committed before this runs, so a failing step (a busy
+# checkpoint, a locked VACUUM) is recorded, never raised. The log row is written
+# after the checkpoint, so the -wal file may hold those few pages afterwards.
+
+MAINT_TABLE = "maintenance_runs"
+STEPS = ("analyze", "optimize", "checkpoint", "vacuum")
+VACUUM_FREE_RATIO = 0.25
+CHECKPOINT_WAIT_MS = 500    # a TRUNCATE checkpoint waits for readers; don't hold up the caller for long
+MAX_RUNS = 500          # older rows are trimmed on insert
+
+
+def _q(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def free_ratio(conn: sqlite3.Connection) -> float:
+    """Share of the DB's pages on the freelist."""
+    pages = conn.execute("PRAGMA page_count").fetchone()[0]
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return free / pages if pages else 0.0
+
+
+def _unanalyzed(conn: sqlite3.Connection) -> List[str]:
+    """User tables with no sqlite_stat1 row (never analyzed, or dropped and re-created since)."""
+    tables = [
+        r[0] for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite%' ORDER BY name"
+        )
+    ]
+    try:
+        have = {r[0] for r in conn.execute("SELECT DISTINCT tbl FROM sqlite_stat1")}
+    except sqlite3.OperationalError:
+        have = set()    # no ANALYZE has ever run on this DB
+    return [t for t in tables if t not in have]
+
+
+@dataclass
+class MaintenanceReport:
+    trigger: str                    # what ran it: "extract", "update", ...
+    analyzed: List[str] = field(default_factory=list)
+    steps: Dict[str, float] = field(default_factory=dict)     # step -> seconds
+    db_before: int = 0              # bytes
+    db_after: int = 0
+    wal_before: int = 0
+    wal_after: int = 0
+    free_before: float = 0.0        # freelist share of the pages
+    free_after: float = 0.0
+    checkpoint_busy: bool = False   # a reader kept the checkpoint from finishing
+    vacuumed: bool = False
+    error: Optional[str] = None
+    started: float = field(default_factory=time.time)
+
+    @property
+    def total_s(self) -> float:
+        return sum(self.steps.values())
+
+
+def maintain_db(
+    db_path: str,
+    trigger: str,
+    analyze: Iterable[str] = (),
+    vacuum_ratio: float = VACUUM_FREE_RATIO,
+) -> MaintenanceReport:
+    """
+    Stats, WAL checkpoint and (if worth it) VACUUM for db_path after a rebuild;
+    analyze = tables the caller rewrote. Records the run; never raises.
+    """
+    rep = MaintenanceReport(trigger)
+    wal_path = db_path + "-wal"
+    rep.db_before, rep.wal_before = _size(db_path), _size(wal_path)
+    if not os.path.isfile(db_path):
+        return rep
+
+    conn = sqlite3.connect(db_path)
+    step = STEPS[0]
+    try:
+        rep.free_before = free_ratio(conn)
+
+        t0 = time.perf_counter()
+        have = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        todo = [t for t in analyze if t in have]
+        todo += [t for t in _unanalyzed(conn) if t not in todo]
+        for table in todo:
+            conn.execute(f"ANALYZE {_q(table)}")
+        conn.commit()
+        rep.analyzed = todo
+        rep.steps[step] = time.perf_counter() - t0
+
+        step = STEPS[1]
+        t0 = time.perf_counter()
+        conn.execute("PRAGMA optimize=0x10002")
+        conn.commit()
+        rep.steps[step] = time.perf_counter() - t0
+
+        step = STEPS[2]
+        t0 = time.perf_counter()
+        conn.execute(f"PRAGMA busy_timeout = {int(CHECKPOINT_WAIT_MS)}")
+        busy, _log, _done = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        rep.checkpoint_busy = bool(busy)
+        rep.steps[step] = time.perf_counter() - t0
+
+        step = STEPS[3]
+        # Not while a reader pins the WAL: VACUUM would only add a copy of the DB to it
+        if not rep.checkpoint_busy and free_ratio(conn) > vacuum_ratio:
+            t0 = time.perf_counter()
+            conn.execute("VACUUM")
+            busy, _log, _done = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+            rep.checkpoint_busy = bool(busy)
+            rep.vacuumed = True
+            rep.steps[step] = time.perf_counter() - t0
+
+        rep.free_after = free_ratio(conn)
+    except sqlite3.Error as e:
+        rep.error = f"{step}: {type(e).__name__}: {e}"
+        try:
+            conn.rollback()
+        except sqlite3.Error:
+            pass
+    finally:
+        conn.close()
+
+    rep.db_after, rep.wal_after = _size(db_path), _size(wal_path)
+    record_maintenance(db_path, rep)
+    return rep
+
+
+def ensure_maintenance_table(conn: sqlite3.Connection) -> None:
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {MAINT_TABLE} (
+            id              INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at      TEXT,
+            trigger         TEXT,
+            analyze_s       REAL,
+            optimize_s      REAL,
+            checkpoint_s    REAL,
+            vacuum_s        REAL,
+            total_s         REAL,
+            db_bytes_before INTEGER,
+            db_bytes_after  INTEGER,
+            wal_bytes_before INTEGER,
+            wal_bytes_after INTEGER,
+            free_pct_before REAL,
+            free_pct_after  REAL,
+            tables_analyzed TEXT,
+            checkpoint_busy INTEGER,
+            vacuumed        INTEGER,
+            status          TEXT,
+            error           TEXT
+        )
+    ''')
+
+
+def record_maintenance(db_path: str, rep: MaintenanceReport) -> None:
+    """Append one maintenance_runs row. Best-effort, like ingest_runs.record_run()."""
+    def _s(name: str) -> Optional[float]:
+        v = rep.steps.get(name)
+        return None if v is None else round(v, 4)
+
+    try:
+        with sqlite3.connect(db_path) as conn:
+            ensure_maintenance_table(conn)
+            conn.execute(
+                f'''
+                INSERT INTO {MAINT_TABLE}
+                    (started_at, trigger, analyze_s, optimize_s, checkpoint_s, vacuum_s, total_s,
+                     db_bytes_before, db_bytes_after, wal_bytes_before, wal_bytes_after,
+                     free_pct_before, free_pct_after, tables_analyzed, checkpoint_busy, vacuumed,
+                     status, error)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''',
+                (
+                    datetime.fromtimestamp(rep.started).strftime("%m/%d/%Y %H:%M:%S"),
+                    rep.trigger,
+                    *(_s(name) for name in STEPS),
+                    round(rep.total_s, 4),
+                    rep.db_before,
+                    rep.db_after,
+                    rep.wal_before,
+                    rep.wal_after,
+                    round(rep.free_before * 100, 2),
+                    round(rep.free_after * 100, 2),
+                    ", ".join(rep.analyzed),
+                    int(rep.checkpoint_busy),
+                    int(rep.vacuumed),
+                    "error" if rep.error else "ok",
+                    rep.error,
+                ),
+            )
+            conn.execute(
+                f"DELETE FROM {MAINT_TABLE} WHERE id <= (SELECT MAX(id) FROM {MAINT_TABLE}) - ?",
+                (MAX_RUNS,),
+            )
+            conn.commit()
+    except sqlite3.Error:
+        pass
+
+
+def recent_maintenance(db_path: str, limit: int = 20) -> pd.DataFrame:
+    """Last `limit` maintenance runs, newest first."""
+    with sqlite3.connect(db_path) as conn:
+        ensure_maintenance_table(conn)
+        return pd.read_sql_query(
+            f"SELECT * FROM {MAINT_TABLE} ORDER BY id DESC LIMIT ?", conn, params=(int(limit),)
+        )
+
+
+def format_maintenance(df: pd.DataFrame) -> str:
+    """Fixed-width text table of recent_maintenance() output."""
+    if df.empty:
+        return "No maintenance runs recorded yet."
+
+    def _t(v) -> str:
+        return "" if v is None or pd.isna(v) else f"{v:.2f}"
+
+    def _mb(v) -> str:
+        return "" if v is None or pd.isna(v) else f"{v / (1024 * 1024):.1f}"
+
+    header = (
+        f"{'When':19}  {'Trigger':8} "
+        f"{'analyze':>7} {'optim':>7} {'ckpt':>7} {'vacuum':>7} {'total':>7} "
+        f"{'dbMB':>13} {'walMB':>13} {'free%':>13}  status"
+    )
+    lines = [header, "-" * len(header)]
+    for r in df.itertuples(index=False):
+        line = (
+            f"{str(r.started_at):19}  {str(r.trigger)[:8]:8} "
+            f"{_t(r.analyze_s):>7} {_t(r.optimize_s):>7} {_t(r.checkpoint_s):>7} "
+            f"{_t(r.vacuum_s):>7} {_t(r.total_s):>7} "
+            f"{_mb(r.db_bytes_before) + '>' + _mb(r.db_bytes_after):>13} "
+            f"{_mb(r.wal_bytes_before) + '>' + _mb(r.wal_bytes_after):>13} "
+            f"{_t(r.free_pct_before) + '>' + _t(r.free_pct_after):>13}  {r.status}"
+        )
+        if r.checkpoint_busy:
+            line += "  (checkpoint busy)"
+        if r.error:
+            line += f"  ({r.error})"
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,195 @@
+# services/db/federated.py
+from __future__ import annotations
+import os
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+import pandas as pd
+
+from services.db.program_db import DATA_DIR, ProgramDB
+from services.db.programs import PROGRAMS
+from services.db.unified_store import PROGRAM_KEY, UNIFIED_TABLES
+
+# ------------------------
+# Federated queries over the program DBs
+# ------------------------
+# The lighter sibling of unified_store: nothing is copied. open_federation() attaches
+# every program DB (plus data/static_lists.sqlite3) to one in-memory connection and
+# puts TEMP views over them:
+#
+#   all_<table>     UNION ALL of <table> from each program DB that has it, tagged with
+#                   program_key (the program's name, as in the unified store) and
+#                   source_rowid (the row's rowid in that program DB)
+#   all_mpp_first   same, but only the first mpp_data row (lowest rowid) per Order
+#   static.<table>  the static lists (pm_list, ...), when that DB exists
+#
+# Branches follow registry order (WMP first). A column some program lacks reads as
+# NULL in its branch. The views read the program DBs live, so there is nothing to keep
+# in sync; a federation is cheap to open and is meant to live for one read.
+
+STATIC_LISTS_DB_NAME = "static_lists.sqlite3"
+STATIC_SCHEMA = "static"
+SOURCE_ROWID = "source_rowid"
+MPP_FIRST_VIEW = "all_mpp_first"
+
+
+def _q(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def all_view(table: str) -> str:
+    """Name of the federated view over `table` ("permit_tracker" -> "all_permit_tracker")."""
+    return f"all_{table}"
+
+
+@dataclass
+class Federation:
+    conn: sqlite3.Connection
+    schemas: Dict[str, str] = field(default_factory=dict)        # program name -> attached schema
+    present: Dict[str, Set[str]] = field(default_factory=dict)   # program name -> its tables
+    views: Dict[str, List[str]] = field(default_factory=dict)    # table -> programs in all_<table>
+    has_static: bool = False
+
+    def read(self, sql: str, params: Sequence[Any] = ()) -> pd.DataFrame:
+        return pd.read_sql_query(sql, self.conn, params=list(params))
+
+    def has_view(self, table: str) -> bool:
+        return table in self.views
+
+    def has_static_table(self, table: str, columns: Sequence[str] = ()) -> bool:
+        """True if static.<table> is attached and has every one of `columns`."""
+        if not self.has_static:
+            return False
+        cols = _columns(self.conn, STATIC_SCHEMA, table)
+        return bool(cols) and all(c in cols for c in columns)
+
+    def counts(self, tables: Sequence[str]) -> Dict[str, Dict[str, Optional[int]]]:
+        """
+        Row counts per program for each table, in one statement.
+        {program name: {table: count, or None if that program's DB has no such table}}
+        """
+        out: Dict[str, Dict[str, Optional[int]]] = {
+            name: {t: None for t in tables} for name in self.schemas
+        }
+        parts = [
+            f"SELECT '{name}', '{t}', COUNT(*) FROM {_q(schema)}.{_q(t)}"
+            for name, schema in self.schemas.items()
+            for t in tables if t in self.present[name]
+        ]
+        if parts:
+            for name, t, n in self.conn.execute(" UNION ALL ".join(parts)):
+                out[name][t] = int(n)
+        return out
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def _columns(conn: sqlite3.Connection, schema: str, table: str) -> List[str]:
+    return [r[1] for r in conn.execute(f"PRAGMA {_q(schema)}.table_info({_q(table)})")]
+
+
+def _union_sql(fed: Federation, table: str, cols_by_program: Dict[str, List[str]], where: str = "") -> str:
+    """SELECT for all_<table>: one branch per program, columns aligned by name (case-insensitive)."""
+    all_cols: List[str] = []
+    seen: Set[str] = set()
+    for cols in cols_by_program.values():
+        for c in cols:
+            if c.lower() not in seen:
+                seen.add(c.lower())
+                all_cols.append(c)
+
+    branches = []
+    for name, cols in cols_by_program.items():
+        have = {c.lower() for c in cols}
+        src = f"{_q(fed.schemas[name])}.{_q(table)}"
+        select = ", ".join(_q(c) if c.lower() in have else f"NULL AS {_q(c)}" for c in all_cols)
+        branches.append(
+            f"SELECT '{name}' AS {PROGRAM_KEY}, rowid AS {SOURCE_ROWID}, {select} "
+            f"FROM {src} {where.format(src=src)}"
+        )
+    return "\nUNION ALL\n".join(branches)
+
+
+def _create_views(fed: Federation, tables: Sequence[str]) -> None:
+    cols_by_table: Dict[str, Dict[str, List[str]]] = {}
+    for name, schema in fed.schemas.items():
+        fed.present[name] = {
+            r[0] for r in fed.conn.execute(f"SELECT name FROM {_q(schema)}.sqlite_master WHERE type = 'table'")
+        }
+        for table in tables:
+            if table not in fed.present[name]:
+                continue
+            cols = _columns(fed.conn, schema, table)
+            if cols == ["dummy"]:
+                continue        # ensure_db() placeholder; nothing extracted yet
+            cols_by_table.setdefault(table, {})[name] = cols
+
+    for table, cols_by_program in cols_by_table.items():
+        fed.conn.execute(
+            f"CREATE TEMP VIEW {_q(all_view(table))} AS {_union_sql(fed, table, cols_by_program)}"
+        )
+        fed.views[table] = list(cols_by_program)
+
+    if "mpp_data" in cols_by_table:       # all_mpp_first comes with all_mpp_data
+        first = 'WHERE rowid IN (SELECT MIN(rowid) FROM {src} GROUP BY "Order")'
+        fed.conn.execute(
+            f"CREATE TEMP VIEW {_q(MPP_FIRST_VIEW)} AS "
+            f"{_union_sql(fed, 'mpp_data', cols_by_table['mpp_data'], first)}"
+        )
+
+
+def open_federation(
+    programs: Optional[Iterable[Tuple[str, ProgramDB]]] = None,
+    tables: Optional[Iterable[str]] = None,
+    static_lists_path: Optional[str] = None,
+) -> Federation:
+    """
+    Attach every existing program DB (and the static lists) to a new connection and
+    create the all_<table> views for `tables` (default: every table the unified store
+    mirrors; building a view costs ~0.5 ms, so pass the ones the query needs).
+    Caller closes it.
+    """
+    fed = Federation(sqlite3.connect(":memory:"))
+    try:
+        for _label, prog in (programs if programs is not None else PROGRAMS):
+            db_path = prog.default_db_path()
+            if not os.path.isfile(db_path):
+                continue
+            schema = f"p_{prog.spec.name}"
+            fed.conn.execute(f"ATTACH DATABASE ? AS {_q(schema)}", (db_path,))
+            fed.schemas[prog.spec.name] = schema
+
+        static = static_lists_path or os.path.join(os.path.abspath(DATA_DIR), STATIC_LISTS_DB_NAME)
+        if os.path.isfile(static):
+            fed.conn.execute(f"ATTACH DATABASE ? AS {STATIC_SCHEMA}", (static,))
+            fed.has_static = True
+
+        _create_views(fed, list(tables) if tables is not None else list(UNIFIED_TABLES))
+    except Exception:
+        fed.close()
+        raise
+    return fed
+
+
+@contextmanager
+def federated(
+    tables: Optional[Iterable[str]] = None,
+    programs: Optional[Iterable[Tuple[str, ProgramDB]]] = None,
+) -> Iterator[Federation]:
+    fed = open_federation(programs, tables)
+    try:
+        yield fed
+    finally:
+        fed.close()
+
+
+def read_federated(sql: str, params: Sequence[Any] = (), tables: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    with federated(tables) as fed:
+        return fed.read(sql, params)
+
+
+def federated_counts(tables: Sequence[str]) -> Dict[str, Dict[str, Optional[int]]]:
+    with federated(tables=()) as fed:      # counts read the attached tables directly
+        return fed.counts(tables)
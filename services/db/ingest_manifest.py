@@ -0,0 +1,150 @@
+# services/db/ingest_manifest.py
+from __future__ import annotations
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+# ------------------------
+# Ingest manifest (one table per program DB)
+# ------------------------
+# Records what was last loaded from each source (MPP / SAP / EPW / LAND / JOINT_POLE)
+# so Generate / Extract can skip a file that hasn't changed since the last run.
+#
+#   ingest_manifest(source PK, path, size, mtime, content_hash, params,
+#                   target_table, rows, duration_s, ingested_at)
+#
+# `params` is a short string describing the filter settings used for the load
+# (allowed MATs, flags, ...). A hash match only short-circuits when the params
+# match too, so changing a ledger still forces a reload.
+
+MANIFEST_TABLE = "ingest_manifest"
+
+_digest_lock = threading.Lock()
+_digest_memo: Dict[Tuple[str, int, int], str] = {}
+
+
+def file_sha256(path: str) -> str:
+    """sha256 of the file's bytes; memoized on (path, mtime, size) within the process."""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    with _digest_lock:
+        hit = _digest_memo.get(key)
+    if hit is not None:
+        return hit
+
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+
+    with _digest_lock:
+        _digest_memo[key] = digest
+    return digest
+
+
+def ensure_manifest(conn: sqlite3.Connection) -> None:
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+            source        TEXT PRIMARY KEY,
+            path          TEXT,
+            size          INTEGER,
+            mtime         REAL,
+            content_hash  TEXT,
+            params        TEXT,
+            target_table  TEXT,
+            rows          INTEGER,
+            duration_s    REAL,
+            ingested_at   TEXT
+        )
+    ''')
+
+
+def unchanged_rows(
+    db_path: str,
+    source: str,
+    file_path: str,
+    params: str = "",
+) -> Optional[int]:
+    """
+    If `file_path` has the same content (and params) as the last recorded ingest of
+    `source` into `db_path`, and the target table is still there, return the row
+    count from that run. Otherwise None (caller should ingest).
+    """
+    if not os.path.exists(db_path):
+        return None
+
+    with sqlite3.connect(db_path) as conn:
+        ensure_manifest(conn)
+        row = conn.execute(
+            f"SELECT content_hash, params, target_table, rows FROM {MANIFEST_TABLE} WHERE source = ?",
+            (source,),
+        ).fetchone()
+        if row is None:
+            return None
+
+        content_hash, last_params, target_table, rows = row
+        if (last_params or "") != params:
+            return None
+
+        if target_table:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                (target_table,),
+            ).fetchone()
+            if not exists:
+                return None
+
+    if content_hash != file_sha256(file_path):
+        return None
+    return int(rows or 0)
+
+
+def record_ingest(
+    db_path: str,
+    source: str,
+    file_path: str,
+    target_table: str,
+    rows: int,
+    duration_s: float,
+    params: str = "",
+) -> None:
+    """Upsert the manifest row for `source` after a successful load."""
+    st = os.stat(file_path)
+    with sqlite3.connect(db_path) as conn:
+        ensure_manifest(conn)
+        conn.execute(
+            f'''
+            INSERT OR REPLACE INTO {MANIFEST_TABLE}
+                (source, path, size, mtime, content_hash, params,
+                 target_table, rows, duration_s, ingested_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''',
+            (
+                source,
+                os.path.abspath(file_path),
+                int(st.st_size),
+                float(st.st_mtime),
+                file_sha256(file_path),
+                params,
+                target_table,
+                int(rows),
+                round(float(duration_s), 3),
+                datetime.now().strftime("%m/%d/%Y %H:%M:%S"),
+            ),
+        )
+        conn.commit()
+
+
+def params_key(*parts) -> str:
+    """Order-independent text key for filter settings (sets are sorted)."""
+    out = []
+    for p in parts:
+        if isinstance(p, (set, frozenset)):
+            out.append(",".join(sorted(str(x) for x in p)))
+        else:
+            out.append(str(p))
+    return "|".join(out)
@@ -0,0 +1,246 @@
+# services/db/ingest_runs.py
+from __future__ import annotations
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+import pandas as pd
+
+# ------------------------
+# Ingest run log (one table per program DB)
+# ------------------------
+# Every ingest entry point (MPP load / replace / upsert / stream and the pull_*
+# extracts) records one row per run with per-stage timings, so a slow Generate or
+# Extract can be traced to the stage and the file shape that caused it.
+#
+#   ingest_runs(id, started_at, source, path, target_table,
+#               read_s, resolve_s, coerce_s, filter_s, write_s, total_s,
+#               rows_in, rows_kept, rows_rejected, peak_mem_mb, status, error)
+#
+# rows_in is what the reader handed back. For the MPP CSV that's after the Arrow
+# scan has already dropped rows no program keeps (see mpp_ingest.read_mpp_csv).
+# peak_mem_mb is the process's peak RSS so far (max of the worker and this process
+# when a parse ran in a worker), not the growth caused by this run alone.
+
+RUNS_TABLE = "ingest_runs"
+STAGES = ("read", "resolve", "coerce", "filter", "write")
+MAX_RUNS = 500          # older rows are trimmed on insert
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process in MB (None if the platform won't say)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class _PMC(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            pmc = _PMC()
+            pmc.cb = ctypes.sizeof(_PMC)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(pmc), pmc.cb):
+                return pmc.PeakWorkingSetSize / (1024 * 1024)
+        except Exception:
+            pass
+    return None
+
+
+@dataclass
+class IngestProfile:
+    """Stage timings + row counts for one ingest run. Plain data, so it pickles to/from workers."""
+    source: str
+    path: str = ""
+    target_table: str = ""
+    stages: Dict[str, float] = field(default_factory=dict)
+    rows_in: int = 0
+    rows_kept: int = 0
+    peak_mem_mb: Optional[float] = None
+    started: float = field(default_factory=time.time)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a block and add it to `name` (repeated stages accumulate, e.g. per chunk)."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        self.note_peak()
+
+    def note_peak(self) -> None:
+        mb = peak_rss_mb()
+        if mb is not None:
+            self.peak_mem_mb = mb if self.peak_mem_mb is None else max(self.peak_mem_mb, mb)
+
+    def reset(self) -> None:
+        """Drop stage times and counts (a retry starts the run over)."""
+        self.stages.clear()
+        self.rows_in = self.rows_kept = 0
+
+    def share(self, rows_kept: int) -> "IngestProfile":
+        """Copy for one consumer of a shared read (e.g. one program's slice of the MPP CSV)."""
+        return replace(self, stages=dict(self.stages), rows_kept=int(rows_kept))
+
+    def count(self, rows_in: int, rows_kept: int) -> None:
+        self.rows_in += int(rows_in)
+        self.rows_kept += int(rows_kept)
+
+    @property
+    def rows_rejected(self) -> int:
+        return max(0, self.rows_in - self.rows_kept)
+
+
+def ensure_runs_table(conn: sqlite3.Connection) -> None:
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {RUNS_TABLE} (
+            id            INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at    TEXT,
+            source        TEXT,
+            path          TEXT,
+            target_table  TEXT,
+            read_s        REAL,
+            resolve_s     REAL,
+            coerce_s      REAL,
+            filter_s      REAL,
+            write_s       REAL,
+            total_s       REAL,
+            rows_in       INTEGER,
+            rows_kept     INTEGER,
+            rows_rejected INTEGER,
+            peak_mem_mb   REAL,
+            status        TEXT,
+            error         TEXT
+        )
+    ''')
+
+
+def record_run(db_path: str, prof: IngestProfile, error: Optional[str] = None) -> None:
+    """Append one ingest_runs row. Best-effort: never fails the ingest it describes."""
+    prof.note_peak()
+
+    def _s(name: str) -> Optional[float]:
+        v = prof.stages.get(name)
+        return None if v is None else round(v, 4)
+
+    try:
+        with sqlite3.connect(db_path) as conn:
+            ensure_runs_table(conn)
+            conn.execute(
+                f'''
+                INSERT INTO {RUNS_TABLE}
+                    (started_at, source, path, target_table,
+                     read_s, resolve_s, coerce_s, filter_s, write_s, total_s,
+                     rows_in, rows_kept, rows_rejected, peak_mem_mb, status, error)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''',
+                (
+                    datetime.fromtimestamp(prof.started).strftime("%m/%d/%Y %H:%M:%S"),
+                    prof.source,
+                    prof.path,
+                    prof.target_table,
+                    *(_s(name) for name in STAGES),
+                    round(time.time() - prof.started, 4),
+                    prof.rows_in,
+                    prof.rows_kept,
+                    prof.rows_rejected,
+                    None if prof.peak_mem_mb is None else round(prof.peak_mem_mb, 1),
+                    "error" if error else "ok",
+                    error,
+                ),
+            )
+            conn.execute(
+                f"DELETE FROM {RUNS_TABLE} WHERE id <= (SELECT MAX(id) FROM {RUNS_TABLE}) - ?",
+                (MAX_RUNS,),
+            )
+            conn.commit()
+    except sqlite3.Error:
+        pass
+
+
+@contextmanager
+def ingest_run(
+    db_path: str,
+    source: str,
+    path: str = "",
+    target_table: str = "",
+    profile: Optional[IngestProfile] = None,
+) -> Iterator[IngestProfile]:
+    """
+    with ingest_run(db_path, "EPW", xlsx_path, "epw_data") as prof: ...
+    Records the run on exit, including failed runs (status='error').
+    """
+    prof = profile if profile is not None else IngestProfile(source, path, target_table)
+    try:
+        yield prof
+    except Exception as e:
+        record_run(db_path, prof, error=f"{type(e).__name__}: {e}")
+        raise
+    record_run(db_path, prof)
+
+
+def recent_runs(db_path: str, limit: int = 20, source: Optional[str] = None) -> pd.DataFrame:
+    """Last `limit` runs, newest first (optionally only one source)."""
+    with sqlite3.connect(db_path) as conn:
+        ensure_runs_table(conn)
+        sql = f"SELECT * FROM {RUNS_TABLE}"
+        params: tuple = ()
+        if source:
+            sql += " WHERE source = ?"
+            params = (source,)
+        sql += " ORDER BY id DESC LIMIT ?"
+        return pd.read_sql_query(sql, conn, params=params + (int(limit),))
+
+
+def format_runs(df: pd.DataFrame) -> str:
+    """Fixed-width text table of recent_runs() output (for popups / the CLI)."""
+    if df.empty:
+        return "No ingest runs recorded yet."
+
+    def _t(v) -> str:
+        return "" if v is None or pd.isna(v) else f"{v:.2f}"
+
+    header = (
+        f"{'When':19}  {'Source':10} {'Table':16} "
+        f"{'read':>7} {'resolve':>7} {'coerce':>7} {'filter':>7} {'write':>7} {'total':>7} "
+        f"{'in':>9} {'kept':>9} {'rej':>8} {'peakMB':>7}  status"
+    )
+    lines = [header, "-" * len(header)]
+    for r in df.itertuples(index=False):
+        line = (
+            f"{str(r.started_at):19}  {str(r.source)[:10]:10} {str(r.target_table or '')[:16]:16} "
+            f"{_t(r.read_s):>7} {_t(r.resolve_s):>7} {_t(r.coerce_s):>7} {_t(r.filter_s):>7} "
+            f"{_t(r.write_s):>7} {_t(r.total_s):>7} "
+            f"{int(r.rows_in or 0):>9,} {int(r.rows_kept or 0):>9,} {int(r.rows_rejected or 0):>8,} "
+            f"{'' if pd.isna(r.peak_mem_mb) else f'{r.peak_mem_mb:.0f}':>7}  {r.status}"
+        )
+        if r.error:
+            line += f"  ({r.error})"
+        lines.append(line)
+    return "\n".join(lines)
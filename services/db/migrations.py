@@ -0,0 +1,60 @@
+# services/db/migrations.py
+from __future__ import annotations
+import sqlite3
+from dataclasses import dataclass
+from typing import Callable, List, Sequence
+
+# ------------------------
+# Versioned schema migrations
+# ------------------------
+# A DB records the last migration it got in PRAGMA user_version (0 for a new or
+# never-migrated file). apply_migrations() runs the steps above that number, each in
+# its own transaction together with the user_version bump, so a step either lands
+# completely or not at all and never runs twice. Once a DB is current the whole check
+# is one pragma read.
+#
+# Steps are plain functions of the connection. They must not commit (no
+# conn.commit(), no executescript()), and should be written so a DB that already has
+# the change passes through unharmed: a file may have been fixed by hand or by older
+# code that did the same thing per build.
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[sqlite3.Connection], None]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return int(conn.execute("PRAGMA user_version").fetchone()[0])
+
+
+def apply_migrations(conn: sqlite3.Connection, migrations: Sequence[Migration]) -> List[int]:
+    """
+    Bring the DB up to the last version in `migrations`. Returns the versions applied
+    (empty when it was already current). Commits.
+    """
+    steps = sorted(migrations, key=lambda m: m.version)
+    if not steps or schema_version(conn) >= steps[-1].version:
+        return []
+
+    if conn.in_transaction:
+        conn.commit()
+    applied: List[int] = []
+    for m in steps:
+        # IMMEDIATE: take the write lock before re-reading, so two processes opening
+        # the same old DB don't both run a step
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if schema_version(conn) >= m.version:
+                conn.rollback()
+                continue
+            m.apply(conn)
+            conn.execute(f"PRAGMA user_version = {int(m.version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(m.version)
+    return applied
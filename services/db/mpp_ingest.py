@@ -0,0 +1,529 @@
+# services/db/mpp_ingest.py
+from __future__ import annotations
+import csv
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import sqlite3
+from types import ModuleType
+import pandas as pd
+
+from services.db.bulk_writer import (
+    INGEST_JOURNAL_MODE,
+    INGEST_SYNCHRONOUS,
+    analyze_table,
+    bulk_insert,
+    bulk_replace,
+    create_indexes,
+)
+from services.db.ingest_manifest import params_key
+from services.db.ingest_runs import IngestProfile
+from services.db.arrow_dtypes import arrow_strings_enabled, arrow_types_mapper, is_text_dtype, text_dtype, to_text
+
+# ------------------------
+# Columns pulled from the MPP CSV
+# ------------------------
+# Same list for every program; "Mega Bundle Flag" is only used for filtering.
+MPP_NEEDED_COLS: List[str] = [
+    "Region",
+    "Div",
+    "Notification",
+    "Order",
+    "Planning Order",
+    "Resource",
+    "Work Plan Date",
+    "Permit Exp Date",
+    "CLICK Start Date",
+    "CLICK End Date",
+    "Project Reporting Year",
+    "Program",
+    "Sub-Category",
+    "Est Req",
+    "Priority",
+    "MAT",
+    "Notif Status",
+    "Order User Status",
+    "Primary Status",
+    "Job Owner",
+    "Project Managed Flag",
+    "Mega Bundle Flag",
+
+    "WMP Commitments",
+    "PEND In",
+    "Shovel Ready Date",
+    "LEAPS Combined Exp Out Date",
+    "Est Out Date",
+    "Completion Deadline Date",
+]
+
+# Indexes rebuilt (then ANALYZEd) after every full mpp_data load. idx_mpp_order also
+# serves the one-row-per-Order MIN(rowid) lookups (rowid is part of every index).
+MPP_INDEXES: List[Tuple[str, List[str]]] = [
+    ("idx_mpp_order", ["Order"]),
+    ("idx_mpp_project_year", ["Project Reporting Year"]),
+    ("idx_mpp_mat", ["MAT"]),
+    ("idx_mpp_program", ["Program"]),
+    ("idx_mpp_subcat", ["Sub-Category"]),
+    ("idx_mpp_div", ["Div"]),
+    ("idx_mpp_region", ["Region"]),
+    ("idx_mpp_click_start", ["CLICK Start Date"]),
+    ("idx_mpp_click_end", ["CLICK End Date"]),
+    ("idx_mpp_wpd", ["Work Plan Date"]),
+]
+
+# ------------------------
+# Per-program filter spec (built from each tracker_conditions_ledger)
+# ------------------------
+@dataclass(frozen=True)
+class MppFilter:
+    allowed_mat: frozenset
+    allowed_years: frozenset
+    required_pm_flag: str
+    notif_status_to_remove: str
+    allowed_sap_status: Optional[frozenset] = None   # None -> no Primary Status filter
+    not_allowed_priority: Optional[str] = None       # None -> no Priority filter
+    drop_mega_bundle: bool = False
+
+    @classmethod
+    def from_ledger(
+        cls,
+        allowed_mat: Iterable[str],
+        allowed_years: Iterable[int],
+        required_pm_flag: str,
+        notif_status_to_remove: str,
+        allowed_sap_status: Optional[Iterable[str]] = None,
+        not_allowed_priority: Optional[str] = None,
+        drop_mega_bundle: bool = False,
+    ) -> "MppFilter":
+        return cls(
+            allowed_mat=frozenset(m.upper() for m in allowed_mat),
+            # treat PRY as string for filtering to avoid full numeric conversion
+            allowed_years=frozenset(str(y) for y in allowed_years),
+            required_pm_flag=required_pm_flag.upper(),
+            notif_status_to_remove=notif_status_to_remove,
+            allowed_sap_status=(
+                frozenset(s.upper() for s in allowed_sap_status)
+                if allowed_sap_status is not None else None
+            ),
+            not_allowed_priority=(
+                not_allowed_priority.upper() if not_allowed_priority is not None else None
+            ),
+            drop_mega_bundle=drop_mega_bundle,
+        )
+
+    def params_key(self) -> str:
+        """Stable text form of the filter, for the ingest manifest."""
+        return params_key(
+            self.allowed_mat,
+            self.allowed_years,
+            self.required_pm_flag,
+            self.notif_status_to_remove,
+            self.allowed_sap_status if self.allowed_sap_status is not None else "-",
+            self.not_allowed_priority,
+            self.drop_mega_bundle,
+        )
+
+
+# ------------------------
+# Read once
+# ------------------------
+# Which reader actually ran, per process. The Arrow path used to fail silently on
+# every call (callable usecols isn't supported by engine="pyarrow"), so keep a tally
+# that the UI / logs can show.
+_ENGINE_COUNTS: Dict[str, int] = {"pyarrow": 0, "c": 0}
+_LAST_ENGINE: Dict[str, Optional[str]] = {"engine": None, "fallback_reason": None}
+
+
+def get_engine_counts() -> Dict[str, int]:
+    """How many MPP reads went through each engine in this process."""
+    return dict(_ENGINE_COUNTS)
+
+
+def get_last_engine() -> Tuple[Optional[str], Optional[str]]:
+    """(engine, fallback_reason) for the most recent read_mpp_csv() call."""
+    return _LAST_ENGINE["engine"], _LAST_ENGINE["fallback_reason"]
+
+
+def _read_csv_header(csv_path: str) -> List[str]:
+    with open(csv_path, "r", encoding="utf-8-sig", newline="") as fh:
+        return next(csv.reader(fh), [])
+
+
+def _arrow_filter_expr(filters: Sequence[MppFilter], present: Iterable[str]):
+    """
+    OR of every program's conditions as an Arrow expression, or None when it can't
+    be pushed down (a filter column missing from the file). The pandas mask is still
+    applied afterwards, so this only has to keep a superset of the rows.
+    """
+    import pyarrow.compute as pc
+
+    present = set(present)
+    needed = {"MAT", "Project Reporting Year", "Project Managed Flag", "Notif Status"}
+    for flt in filters:
+        if flt.allowed_sap_status is not None:
+            needed.add("Primary Status")
+        if flt.not_allowed_priority is not None:
+            needed.add("Priority")
+        if flt.drop_mega_bundle:
+            needed.add("Mega Bundle Flag")
+    if not needed <= present:
+        return None
+
+    def up(col: str):
+        return pc.utf8_upper(pc.field(col))
+
+    expr = None
+    for flt in filters:
+        cond = (
+            up("MAT").isin(sorted(flt.allowed_mat))
+            & pc.field("Project Reporting Year").isin(sorted(flt.allowed_years))
+            & (up("Project Managed Flag") == flt.required_pm_flag)
+            & (up("Notif Status") != flt.notif_status_to_remove)
+        )
+        if flt.allowed_sap_status is not None:
+            cond = cond & up("Primary Status").isin(sorted(flt.allowed_sap_status))
+        if flt.not_allowed_priority is not None:
+            cond = cond & (up("Priority") != flt.not_allowed_priority)
+        if flt.drop_mega_bundle:
+            cond = cond & (up("Mega Bundle Flag") != "Y")
+        expr = cond if expr is None else (expr | cond)
+    return expr
+
+
+def _read_mpp_arrow(csv_path: str, filters: Optional[Sequence[MppFilter]]) -> pd.DataFrame:
+    """Arrow scan: project needed cols as strings, filter in the scan, then to pandas."""
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.dataset as ds
+
+    header = _read_csv_header(csv_path)
+    present = [c for c in MPP_NEEDED_COLS if c in header]
+
+    fmt = ds.CsvFileFormat(
+        convert_options=pacsv.ConvertOptions(
+            # every needed column as plain text, empty cells stay "" (same as na_filter=False)
+            column_types={c: pa.string() for c in present},
+            strings_can_be_null=False,
+            quoted_strings_can_be_null=False,
+        ),
+    )
+    dataset = ds.dataset(csv_path, format=fmt)
+
+    expr = _arrow_filter_expr(filters, present) if filters else None
+    table = dataset.to_table(columns=present, filter=expr)
+    return table.to_pandas(types_mapper=arrow_types_mapper())
+
+
+def _csv_text_dtype():
+    return text_dtype() if arrow_strings_enabled() else str
+
+
+def _read_mpp_pandas(csv_path: str) -> pd.DataFrame:
+    return pd.read_csv(
+        csv_path,
+        usecols=lambda c: c in MPP_NEEDED_COLS,  # loads intersection; no error on missing
+        dtype=_csv_text_dtype(),                 # plain Python strings (or Arrow, see arrow_dtypes)
+        na_filter=False,                         # faster: don't try to infer NaNs
+        low_memory=False,
+    )
+
+
+def read_mpp_csv(csv_path: str, filters: Optional[Sequence[MppFilter]] = None) -> pd.DataFrame:
+    """
+    Read the MPP CSV (only needed cols) as raw strings, in MPP_NEEDED_COLS order.
+
+    If `filters` is given, rows no program could keep are dropped during the Arrow
+    scan. Callers still apply mpp_filter_mask() per program on the result.
+    """
+    reason: Optional[str] = None
+    try:
+        df = _read_mpp_arrow(csv_path, filters)
+        engine = "pyarrow"
+    except Exception as e:
+        # pyarrow missing or the file trips the Arrow parser (ragged rows, bad quoting)
+        reason = f"{type(e).__name__}: {e}"
+        df = _read_mpp_pandas(csv_path)
+        engine = "c"
+
+    _ENGINE_COUNTS[engine] += 1
+    _LAST_ENGINE["engine"] = engine
+    _LAST_ENGINE["fallback_reason"] = reason
+
+    # Ensure all needed columns exist (even if missing in file)
+    for c in MPP_NEEDED_COLS:
+        if c not in df.columns:
+            df[c] = to_text(pd.Series("", index=df.index))
+
+    return df[MPP_NEEDED_COLS]
+
+
+def _as_str(s: pd.Series) -> pd.Series:
+    return s if is_text_dtype(s.dtype) else s.astype(str)
+
+
+class _UpperCache:
+    """Uppercased raw columns, computed once and shared by every program's mask."""
+
+    def __init__(self, df: pd.DataFrame):
+        self._df = df
+        self._cache: Dict[str, pd.Series] = {}
+
+    def __getitem__(self, col: str) -> pd.Series:
+        s = self._cache.get(col)
+        if s is None:
+            s = self._df[col].str.upper()
+            self._cache[col] = s
+        return s
+
+
+def mpp_filter_mask(df: pd.DataFrame, flt: MppFilter, upper: Optional[_UpperCache] = None) -> pd.Series:
+    """Boolean mask of the rows one program keeps, on raw (uncoerced) MPP strings."""
+    up = upper if upper is not None else _UpperCache(df)
+
+    mask = (
+        up["MAT"].isin(flt.allowed_mat)
+        & _as_str(df["Project Reporting Year"]).isin(flt.allowed_years)
+        & (up["Project Managed Flag"] == flt.required_pm_flag)
+        & (up["Notif Status"] != flt.notif_status_to_remove)
+    )
+    if flt.allowed_sap_status is not None:
+        mask &= up["Primary Status"].isin(flt.allowed_sap_status)
+    if flt.not_allowed_priority is not None:
+        mask &= up["Priority"] != flt.not_allowed_priority
+    if flt.drop_mega_bundle:
+        mask &= up["Mega Bundle Flag"] != "Y"
+    return mask
+
+
+# ------------------------
+# Fan-out: one read, one coercion, N partitions
+# ------------------------
+def partition_mpp_csv(
+    csv_path: str,
+    programs: Sequence[Tuple[str, ModuleType]],
+    profile: Optional[IngestProfile] = None,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Read the MPP CSV once and split it into one coerced mpp_data frame per program.
+
+    `programs` is a list of (label, db_module); each db module exposes MPP_FILTER and
+    _apply_target_dtypes. Rows kept by several programs are coerced only once.
+    Returns {label: DataFrame} ready for db_module.replace_mpp_data().
+    `profile` (optional) gets the shared read / filter / coerce times; hand each
+    program profile.share(len(part)) so its ingest_runs row covers the whole load.
+    """
+    if not programs:
+        return {}
+
+    prof = profile if profile is not None else IngestProfile("MPP", csv_path)
+    with prof.stage("read"):
+        raw = read_mpp_csv(csv_path, [db_mod.MPP_FILTER for _label, db_mod in programs])
+
+    with prof.stage("filter"):
+        upper = _UpperCache(raw)
+        masks: Dict[str, pd.Series] = {
+            label: mpp_filter_mask(raw, db_mod.MPP_FILTER, upper) for label, db_mod in programs
+        }
+
+        union = pd.Series(False, index=raw.index)
+        for m in masks.values():
+            union |= m
+
+    # Expensive dtype coercion runs once over the union of all partitions
+    with prof.stage("coerce"):
+        kept = raw.loc[union]
+        coerced = programs[0][1]._apply_target_dtypes(kept.reset_index(drop=True))
+        coerced.index = kept.index
+    prof.count(len(raw), len(kept))
+
+    out: Dict[str, pd.DataFrame] = {}
+    for label, _db_mod in programs:
+        part = coerced.loc[masks[label][union].to_numpy()]
+        out[label] = part.reset_index(drop=True)
+    return out
+
+
+# ------------------------
+# Streaming load (bounded memory)
+# ------------------------
+# read_mpp_csv() holds every needed column of the whole file as Python strings
+# before filtering. The streaming path reads the CSV in blocks sized from a memory
+# ceiling, filters + coerces each block and appends it to a staging table, then
+# swaps the staging table in for mpp_data in one short transaction. Peak memory is
+# roughly one block plus the coerced rows of that block, not the whole file.
+
+STREAM_MEMORY_LIMIT_MB = 256
+STAGING_SUFFIX = "__staging"
+
+# In-memory size of a parsed block (object strings + masks + coerced copy) per byte
+# of CSV text, measured on MPP exports. Used to turn the ceiling into a block size.
+_CHUNK_EXPANSION = 12
+_MIN_BLOCK_BYTES = 1 << 20
+
+
+def _block_bytes(memory_limit_mb: int) -> int:
+    return max(_MIN_BLOCK_BYTES, int(memory_limit_mb * 1024 * 1024 / _CHUNK_EXPANSION))
+
+
+def _estimate_rows(csv_path: str, n_bytes: int) -> int:
+    """Rows that fit in n_bytes of this CSV, from the average line length of its head."""
+    with open(csv_path, "rb") as fh:
+        sample = fh.read(1 << 20)
+    lines = max(1, sample.count(b"\n"))
+    return max(1000, int(n_bytes / max(1, len(sample) / lines)))
+
+
+def _with_needed_cols(df: pd.DataFrame) -> pd.DataFrame:
+    for c in MPP_NEEDED_COLS:
+        if c not in df.columns:
+            df[c] = to_text(pd.Series("", index=df.index))
+    return df[MPP_NEEDED_COLS]
+
+
+def _iter_arrow_chunks(
+    csv_path: str,
+    filters: Optional[Sequence[MppFilter]],
+    block_bytes: int,
+) -> Iterator[pd.DataFrame]:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    header = _read_csv_header(csv_path)
+    present = [c for c in MPP_NEEDED_COLS if c in header]
+    expr = _arrow_filter_expr(filters, present) if filters else None
+
+    reader = pacsv.open_csv(
+        csv_path,
+        read_options=pacsv.ReadOptions(block_size=block_bytes),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=present,
+            column_types={c: pa.string() for c in present},
+            strings_can_be_null=False,
+            quoted_strings_can_be_null=False,
+        ),
+    )
+    for batch in reader:
+        table = pa.Table.from_batches([batch])
+        if expr is not None:
+            table = table.filter(expr)
+        if table.num_rows:
+            yield _with_needed_cols(table.to_pandas(types_mapper=arrow_types_mapper()))
+
+
+def _iter_pandas_chunks(csv_path: str, block_bytes: int) -> Iterator[pd.DataFrame]:
+    reader = pd.read_csv(
+        csv_path,
+        usecols=lambda c: c in MPP_NEEDED_COLS,
+        dtype=_csv_text_dtype(),
+        na_filter=False,
+        chunksize=_estimate_rows(csv_path, block_bytes),
+    )
+    with reader:
+        for chunk in reader:
+            yield _with_needed_cols(chunk)
+
+
+def iter_mpp_chunks(
+    csv_path: str,
+    filters: Optional[Sequence[MppFilter]] = None,
+    memory_limit_mb: int = STREAM_MEMORY_LIMIT_MB,
+    engine: str = "pyarrow",
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield raw MPP frames (needed cols, strings) block by block, in file order.
+    With the Arrow engine, rows no filter could keep are dropped inside each block.
+    """
+    block = _block_bytes(memory_limit_mb)
+    _ENGINE_COUNTS[engine] += 1
+    _LAST_ENGINE["engine"] = engine
+    if engine == "pyarrow":
+        yield from _iter_arrow_chunks(csv_path, filters, block)
+    else:
+        yield from _iter_pandas_chunks(csv_path, block)
+
+
+def _stream_into(
+    conn: sqlite3.Connection,
+    csv_path: str,
+    flt: MppFilter,
+    filter_frame: Callable[..., pd.DataFrame],
+    schema: Optional[Dict[str, str]],
+    memory_limit_mb: int,
+    engine: str,
+    staging: str,
+    prof: IngestProfile,
+) -> int:
+    rows = 0
+    created = False
+    chunks = iter_mpp_chunks(csv_path, [flt], memory_limit_mb, engine)
+    while True:
+        with prof.stage("read"):
+            raw = next(chunks, None)
+        if raw is None:
+            break
+        part = filter_frame(raw.reset_index(drop=True), profile=prof)
+        with prof.stage("write"):
+            if not created:
+                bulk_replace(
+                    conn, staging, part, schema,
+                    journal_mode=INGEST_JOURNAL_MODE, synchronous=INGEST_SYNCHRONOUS,
+                )
+                created = True
+            else:
+                bulk_insert(conn, staging, part)
+                conn.commit()
+        rows += len(part)
+
+    if not created:
+        # Empty file: still produce a correctly-typed, empty table
+        empty = filter_frame(pd.DataFrame({c: pd.Series([], dtype=object) for c in MPP_NEEDED_COLS}))
+        bulk_replace(conn, staging, empty, schema)
+    return rows
+
+
+def stream_mpp_csv_into(
+    conn: sqlite3.Connection,
+    csv_path: str,
+    flt: MppFilter,
+    filter_frame: Callable[..., pd.DataFrame],
+    memory_limit_mb: int = STREAM_MEMORY_LIMIT_MB,
+    table: str = "mpp_data",
+    schema: Optional[Dict[str, str]] = None,
+    profile: Optional[IngestProfile] = None,
+) -> int:
+    """
+    Chunked equivalent of filter_frame(read_mpp_csv(csv_path)) -> bulk_replace().
+
+    Blocks are appended to "<table>__staging"; the live table is only replaced at the
+    end, so a failure part-way leaves the current mpp_data untouched. Returns rows written.
+    filter_frame is called as filter_frame(raw, profile=...) so it can time its own
+    filter / coerce stages; read and write are timed here, summed over the blocks.
+    """
+    prof = profile if profile is not None else IngestProfile("MPP", csv_path, table)
+    staging = f"{table}{STAGING_SUFFIX}"
+    try:
+        try:
+            rows = _stream_into(conn, csv_path, flt, filter_frame, schema, memory_limit_mb, "pyarrow", staging, prof)
+            _LAST_ENGINE["fallback_reason"] = None
+        except Exception as e:
+            # pyarrow missing or the Arrow parser choked part-way: start over on the C engine
+            reason = f"{type(e).__name__}: {e}"
+            conn.rollback()
+            prof.reset()
+            rows = _stream_into(conn, csv_path, flt, filter_frame, schema, memory_limit_mb, "c", staging, prof)
+            _LAST_ENGINE["fallback_reason"] = reason
+
+        conn.commit()
+        with prof.stage("write"):
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+            conn.execute(f'ALTER TABLE "{staging}" RENAME TO "{table}"')
+            if table == "mpp_data":
+                create_indexes(conn, table, MPP_INDEXES)
+            conn.commit()
+            analyze_table(conn, table)
+        return rows
+    except Exception:
+        conn.rollback()
+        conn.execute(f'DROP TABLE IF EXISTS "{staging}"')
+        conn.commit()
+        raise
@@ -0,0 +1,264 @@
+# services/db/mpp_upsert.py
+from __future__ import annotations
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+import pandas as pd
+
+from services.db.bulk_writer import INGEST_JOURNAL_MODE, INGEST_SYNCHRONOUS, bulk_replace, row_matrix
+from services.db.mpp_ingest import MPP_INDEXES
+
+# ------------------------
+# Incremental mpp_data load
+# ------------------------
+# replace_mpp_data() drops and rewrites the whole table every run. upsert_mpp_frame()
+# keeps mpp_data in place and only touches rows whose content changed.
+#
+# Bookkeeping lives in a side table so mpp_data itself (and every SELECT * on it)
+# keeps exactly the MPP columns:
+#
+#   mpp_row_fp(row_key TEXT PRIMARY KEY, row_hash INTEGER, rid INTEGER, "Order" INTEGER)
+#
+#   row_key  = Order|Notification|n   (n = nth occurrence of that pair in the file)
+#   row_hash = stable 64-bit hash of the coerced row
+#   rid      = rowid of the row in mpp_data
+#
+# If the side table doesn't line up with mpp_data (first run, someone ran
+# replace_mpp_data(), a VACUUM renumbered rows, schema changed) the load falls back to
+# a full replace and rebuilds the fingerprints, so the result is always correct.
+#
+# A full replace commits mpp_data on its own (bulk_replace), so the fingerprints are
+# cleared and committed *before* it and rewritten after. A crash anywhere in between
+# leaves the side table empty, which the next load treats as "reload in full".
+#
+# Readers pick "the first row per Order" by rowid (MIN(rowid), LIMIT 1, GROUP BY).
+# Inserts land at new rowids past the end, so the upsert is only applied when every
+# Order's rows would come out in the same rowid order as the file; otherwise (a row
+# added ahead of an existing one, rows swapped in the file) it does a full replace.
+
+FP_TABLE = "mpp_row_fp"
+
+
+@dataclass
+class MppDelta:
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    full_reload: bool = False
+    changed_orders: Set[int] = field(default_factory=set)
+
+    @property
+    def rows(self) -> int:
+        """Rows in mpp_data after the load."""
+        return self.inserted + self.updated + self.unchanged
+
+    def summary(self) -> str:
+        if self.full_reload:
+            return f"full reload, {self.rows} rows"
+        return (
+            f"+{self.inserted} new, ~{self.updated} changed, "
+            f"-{self.deleted} removed, {self.unchanged} unchanged"
+        )
+
+
+def ensure_fp_table(conn: sqlite3.Connection) -> None:
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {FP_TABLE} (
+            row_key  TEXT PRIMARY KEY,
+            row_hash INTEGER NOT NULL,
+            rid      INTEGER NOT NULL,
+            "Order"  INTEGER
+        )
+    ''')
+
+
+def clear_fingerprints(conn: sqlite3.Connection) -> None:
+    """Forget fingerprints; the next upsert will do a full reload."""
+    ensure_fp_table(conn)
+    conn.execute(f"DELETE FROM {FP_TABLE}")
+
+
+# ------------------------
+# Fingerprints
+# ------------------------
+def _row_keys(df: pd.DataFrame) -> pd.Series:
+    order = df["Order"].astype("string").fillna("")
+    notif = df["Notification"].astype("string").fillna("")
+    pair = order + "|" + notif
+    nth = pair.groupby(pair, sort=False).cumcount().astype(str)
+    return pair + "|" + nth
+
+
+def _row_hashes(df: pd.DataFrame) -> pd.Series:
+    # Deterministic across runs for the same values + dtypes (fixed hash key)
+    h = pd.util.hash_pandas_object(df, index=False).to_numpy(dtype="uint64")
+    return pd.Series(h.view("int64"))
+
+
+def _records(df: pd.DataFrame) -> List[tuple]:
+    """Rows as plain Python values (None for NA) ready for sqlite3."""
+    return [tuple(r) for r in row_matrix(df).tolist()]
+
+
+def _order_or_none(v) -> Optional[int]:
+    return None if pd.isna(v) else int(v)
+
+
+def _same_row_order(
+    keys: pd.Series,
+    orders: pd.Series,
+    old: Dict[str, Tuple[int, int, Optional[int]]],
+    ins_idx: List[int],
+) -> bool:
+    """
+    True when applying the delta leaves each Order's rows in file order by rowid,
+    i.e. the upsert and a full replace agree on every first-row-per-Order pick.
+    """
+    new_keys = set(keys)
+    after: Dict[Optional[int], List[str]] = {}
+    # Surviving rows keep their rowids ...
+    for k, (_, _, o) in sorted(old.items(), key=lambda kv: kv[1][1]):
+        if k in new_keys:
+            after.setdefault(o, []).append(k)
+    # ... and inserts get fresh ones past the end, in file order
+    for i in ins_idx:
+        after.setdefault(_order_or_none(orders.iat[i]), []).append(keys.iat[i])
+
+    in_file: Dict[Optional[int], List[str]] = {}
+    for k, o in zip(keys, orders):
+        in_file.setdefault(_order_or_none(o), []).append(k)
+    return after == in_file
+
+
+# ------------------------
+# Load
+# ------------------------
+def _fingerprints_valid(conn: sqlite3.Connection, columns: List[str]) -> bool:
+    cur = conn.cursor()
+    cur.execute("PRAGMA table_info(mpp_data)")
+    if [r[1] for r in cur.fetchall()] != columns:
+        return False
+
+    n_data = cur.execute("SELECT COUNT(*) FROM mpp_data").fetchone()[0]
+    n_fp = cur.execute(f"SELECT COUNT(*) FROM {FP_TABLE}").fetchone()[0]
+    if n_fp == 0 or n_fp != n_data:
+        return False
+
+    # Every fingerprint must still point at a live row holding the same Order
+    n_linked = cur.execute(f'''
+        SELECT COUNT(*)
+        FROM {FP_TABLE} f
+        JOIN mpp_data m ON m.rowid = f.rid AND m."Order" IS f."Order"
+    ''').fetchone()[0]
+    return n_linked == n_data
+
+
+def _full_reload(
+    conn: sqlite3.Connection,
+    df: pd.DataFrame,
+    keys: pd.Series,
+    hashes: pd.Series,
+    schema: Optional[Dict[str, str]],
+) -> MppDelta:
+    clear_fingerprints(conn)
+    conn.commit()
+    bulk_replace(
+        conn, "mpp_data", df, schema, MPP_INDEXES,
+        journal_mode=INGEST_JOURNAL_MODE, synchronous=INGEST_SYNCHRONOUS, analyze=True,
+    )
+    rids = [r[0] for r in conn.execute("SELECT rowid FROM mpp_data ORDER BY rowid")]
+
+    conn.executemany(
+        f'INSERT INTO {FP_TABLE}(row_key, row_hash, rid, "Order") VALUES (?, ?, ?, ?)',
+        [
+            (k, int(h), int(rid), _order_or_none(o))
+            for k, h, rid, o in zip(keys, hashes, rids, df["Order"])
+        ],
+    )
+    orders = {int(o) for o in df["Order"].dropna()}
+    return MppDelta(inserted=len(df), full_reload=True, changed_orders=orders)
+
+
+def upsert_mpp_frame(
+    conn: sqlite3.Connection,
+    df: pd.DataFrame,
+    schema: Optional[Dict[str, str]] = None,
+) -> MppDelta:
+    """
+    Bring mpp_data in line with df (already filtered + coerced) touching only
+    changed rows. The incremental path runs in one transaction on `conn`; caller
+    commits/closes. A full reload commits mpp_data itself and leaves only the new
+    fingerprints for the caller to commit.
+    """
+    ensure_fp_table(conn)
+
+    df = df.reset_index(drop=True)
+    columns = [str(c) for c in df.columns]
+    keys = _row_keys(df)
+    hashes = _row_hashes(df)
+
+    if not _fingerprints_valid(conn, columns):
+        return _full_reload(conn, df, keys, hashes, schema)
+
+    old: Dict[str, Tuple[int, int, Optional[int]]] = {
+        k: (h, rid, o)
+        for k, h, rid, o in conn.execute(f'SELECT row_key, row_hash, rid, "Order" FROM {FP_TABLE}')
+    }
+
+    new_pos: Dict[str, int] = {k: i for i, k in enumerate(keys)}
+    ins_idx = [i for k, i in new_pos.items() if k not in old]
+    upd_idx = [i for k, i in new_pos.items() if k in old and old[k][0] != int(hashes.iat[i])]
+    gone = [k for k in old if k not in new_pos]
+
+    if not _same_row_order(keys, df["Order"], old, ins_idx):
+        return _full_reload(conn, df, keys, hashes, schema)
+
+    delta = MppDelta(
+        inserted=len(ins_idx),
+        updated=len(upd_idx),
+        deleted=len(gone),
+        unchanged=len(df) - len(ins_idx) - len(upd_idx),
+    )
+
+    cols_sql = ", ".join(f'"{c}"' for c in columns)
+    marks = ", ".join("?" for _ in columns)
+    set_sql = ", ".join(f'"{c}" = ?' for c in columns)
+
+    # Deletes
+    if gone:
+        conn.executemany("DELETE FROM mpp_data WHERE rowid = ?", [(old[k][1],) for k in gone])
+        conn.executemany(f"DELETE FROM {FP_TABLE} WHERE row_key = ?", [(k,) for k in gone])
+        delta.changed_orders.update(old[k][2] for k in gone if old[k][2] is not None)
+
+    # Updates (in place, same rowid)
+    if upd_idx:
+        recs = _records(df.iloc[upd_idx])
+        conn.executemany(
+            f"UPDATE mpp_data SET {set_sql} WHERE rowid = ?",
+            [rec + (old[keys.iat[i]][1],) for rec, i in zip(recs, upd_idx)],
+        )
+        conn.executemany(
+            f"UPDATE {FP_TABLE} SET row_hash = ? WHERE row_key = ?",
+            [(int(hashes.iat[i]), keys.iat[i]) for i in upd_idx],
+        )
+        # Order is part of row_key, so it's the same before and after
+        delta.changed_orders.update(old[keys.iat[i]][2] for i in upd_idx if old[keys.iat[i]][2] is not None)
+
+    # Inserts (one at a time to capture rowids; deltas are small)
+    if ins_idx:
+        recs = _records(df.iloc[ins_idx])
+        cur = conn.cursor()
+        fp_rows = []
+        for rec, i in zip(recs, ins_idx):
+            cur.execute(f"INSERT INTO mpp_data ({cols_sql}) VALUES ({marks})", rec)
+            o = _order_or_none(df["Order"].iat[i])
+            fp_rows.append((keys.iat[i], int(hashes.iat[i]), cur.lastrowid, o))
+            if o is not None:
+                delta.changed_orders.add(o)
+        conn.executemany(
+            f'INSERT INTO {FP_TABLE}(row_key, row_hash, rid, "Order") VALUES (?, ?, ?, ?)',
+            fp_rows,
+        )
+
+    return delta
@@ -0,0 +1,166 @@
+# services/db/order_dossier.py
+from __future__ import annotations
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import pandas as pd
+
+from services.db.federated import Federation, open_federation
+from services.db.program_db import summarize_sap_rows
+from services.db.programs import PROGRAMS
+from services.db.unified_store import order_lookup, unified_store_enabled
+
+# ------------------------
+# Cross-program order dossier (Master Order Information)
+# ------------------------
+# One search used to call five fetchers per tracker: 25 lookups, each with its own
+# connection and ensure_db(). order_dossier() resolves an order in every program
+# over one connection (the program DBs attached, see federated.py) and keeps the
+# result in an LRU cache.
+#
+# A cached dossier is valid while no program DB changed: every lookup compares
+# each DB's PRAGMA data_version (bumped by any commit from another connection)
+# against the ones the entry was built at. data_version only means something on
+# the connection that read it, so each thread's cache lives next to its
+# connection and is dropped whenever that connection is reopened (a DB file was
+# replaced / created / deleted). A repeat search therefore costs five pragmas; any
+# write to any program DB makes the next search re-resolve.
+
+DOSSIER_CACHE_SIZE = 256
+
+# The single-order lookups' statements (ProgramDB / logic.fetch_open_dependencies_for_order),
+# qualified with the program's attached schema
+_SQL_FIRST = {
+    "mpp": 'SELECT * FROM {s}.mpp_data WHERE "Order" = ? LIMIT 1',
+    "epw": 'SELECT * FROM {s}.epw_data WHERE "Order Number" = ? LIMIT 1',
+    "land": 'SELECT * FROM {s}.land_data WHERE "Order" = ? LIMIT 1',
+}
+_SQL_SAP_ROWS = 'SELECT * FROM {s}.sap_data WHERE "Order" = ?'
+_SQL_OPEN_DEP = 'SELECT "Open Dependencies" FROM {s}.open_dependencies WHERE "Order" = ? LIMIT 1'
+
+Dossier = List[Tuple[str, Dict[str, Any]]]
+
+_local = threading.local()
+# Bumped by clear_dossier_cache(); every thread drops its cache when it sees a new value
+_generation = 0
+
+
+def _db_ids() -> tuple:
+    """(name, device, inode) of every program DB that exists."""
+    ids = []
+    for _label, prog in PROGRAMS:
+        try:
+            st = os.stat(prog.default_db_path())
+        except OSError:
+            continue
+        ids.append((prog.spec.name, st.st_dev, st.st_ino))
+    return tuple(ids)
+
+
+def _federation() -> Tuple[Federation, "OrderedDict[Tuple[int, bool], Tuple[tuple, Dossier]]"]:
+    """
+    This thread's connection with the program DBs attached and the dossier cache
+    tied to it. Both are rebuilt when a DB file changes.
+    """
+    ids = _db_ids()
+    fed = getattr(_local, "fed", None)
+    if fed is not None and _local.ids == ids:
+        if _local.generation != _generation:
+            _local.cache, _local.generation = OrderedDict(), _generation
+        return fed, _local.cache
+    if fed is not None:
+        fed.close()
+    _local.fed, _local.ids = open_federation(tables=()), ids
+    _local.cache, _local.generation = OrderedDict(), _generation
+    return _local.fed, _local.cache
+
+
+def _token(fed: Federation) -> tuple:
+    return tuple(
+        fed.conn.execute(f'PRAGMA "{schema}".data_version').fetchone()[0]
+        for schema in fed.schemas.values()
+    )
+
+
+def _first(conn: sqlite3.Connection, sql: str, order_num: int) -> Optional[Dict]:
+    cur = conn.execute(sql, (order_num,))
+    row = cur.fetchone()
+    if row is None:
+        return None
+    # Same values as ProgramDB's _first_row(): NULL -> None, numbers stay int / float
+    return dict(zip([d[0] for d in cur.description], row))
+
+
+def _resolve(fed: Federation, order_num: int) -> Dossier:
+    out: Dossier = []
+    for label, prog in PROGRAMS:
+        schema = fed.schemas.get(prog.spec.name)
+        if schema is None:
+            continue
+        s = f'"{schema}"'
+        try:
+            found = {k: _first(fed.conn, sql.format(s=s), order_num) for k, sql in _SQL_FIRST.items()}
+            cur = fed.conn.execute(_SQL_SAP_ROWS.format(s=s), (order_num,))
+            sap = pd.DataFrame.from_records(
+                cur.fetchall(), columns=[d[0] for d in cur.description], coerce_float=True
+            )
+            od = fed.conn.execute(_SQL_OPEN_DEP.format(s=s), (order_num,)).fetchone()
+        except sqlite3.Error:
+            # Same as the per-tracker fetchers: a DB missing a table is skipped
+            continue
+        out.append((label, {
+            "mpp": found["mpp"],
+            "sap_df": summarize_sap_rows(sap),
+            "epw": found["epw"],
+            "land": found["land"],
+            "od": None if od is None else {"Open Dependencies": "" if od[0] is None else str(od[0])},
+        }))
+    return out
+
+
+def _copy(dossier: Dossier) -> Dossier:
+    """Callers get their own dicts / frames; the cached entry stays as built."""
+    return [
+        (label, {
+            k: (v.copy() if isinstance(v, (dict, pd.DataFrame)) else v)
+            for k, v in found.items()
+        })
+        for label, found in dossier
+    ]
+
+
+def order_dossier(order_text: str) -> Dossier:
+    """
+    [(label, {"mpp", "sap_df", "epw", "land", "od"})] for every program whose DB has the
+    source tables, in registry order, shaped like the per-tracker fetchers return them.
+    Invalid order text -> []. With the unified store on, resolved by order_lookup().
+    """
+    try:
+        order_num = int(str(order_text).strip())
+    except (TypeError, ValueError):
+        return []
+
+    unified = unified_store_enabled()
+    fed, cache = _federation()
+    token = _token(fed)
+    key = (order_num, unified)
+    hit = cache.get(key)
+    if hit is not None and hit[0] == token:
+        cache.move_to_end(key)
+        return _copy(hit[1])
+
+    dossier = order_lookup(str(order_num)) if unified else _resolve(fed, order_num)
+
+    cache[key] = (token, dossier)
+    cache.move_to_end(key)
+    while len(cache) > DOSSIER_CACHE_SIZE:
+        cache.popitem(last=False)
+    return _copy(dossier)
+
+
+def clear_dossier_cache() -> None:
+    """Drop every thread's cached dossiers (each thread notices on its next lookup)."""
+    global _generation
+    _generation += 1
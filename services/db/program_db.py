@@ -0,0 +1,582 @@
+# services/db/program_db.py
+from __future__ import annotations
+import json
+import os
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import pandas as pd
+
+from services.db.mpp_ingest import (
+    MPP_INDEXES,
+    STREAM_MEMORY_LIMIT_MB,
+    MppFilter,
+    mpp_filter_mask,
+    read_mpp_csv,
+    stream_mpp_csv_into,
+)
+from services.db.date_normalize import add_date_shadows, normalize_dates_mdy, shadow_schema
+from services.db.bulk_writer import INGEST_JOURNAL_MODE, INGEST_SYNCHRONOUS, bulk_replace
+from services.db.mpp_upsert import MppDelta, clear_fingerprints, upsert_mpp_frame
+from services.db.ingest_runs import IngestProfile, ingest_run
+from services.db.arrow_dtypes import is_text_dtype, to_text
+from services.db.connection import bootstrap_once, open_connection, thread_connection
+
+# ------------------------
+# One program tracker DB
+# ------------------------
+# wmp_db / maintenance_db / maintenance_rfc_db / poles_db / poles_rfc_db used to be
+# five copies of the same module that differed only in the DB file name and the
+# ledger the MPP filter came from. The code lives here once. Each of those modules
+# now builds a ProgramSpec from its ledger, wraps it in a ProgramDB and re-exports
+# the methods under the old function names.
+
+DATA_DIR = "data"
+
+
+@dataclass(frozen=True)
+class ProgramSpec:
+    """What differs between programs: DB file + MPP row filter (from the program's ledger)."""
+    name: str                   # "wmp", "poles_rfc", ...
+    db_name: str                # file name under DATA_DIR
+    mpp_filter: MppFilter
+    data_dir: str = DATA_DIR
+
+    @property
+    def db_path(self) -> str:
+        """Relative path (the old module-level DB_PATH)."""
+        return os.path.join(self.data_dir, self.db_name)
+
+
+# ------------------------
+# MPP schema (shared by every program)
+# ------------------------
+# Columns & target dtypes (storage dtypes tuned for SQLite)
+# Note: SQLite has dynamic typing; we coerce in Python and store as TEXT/INTEGER
+MPP_SCHEMA: Dict[str, str] = {
+    "Region": "TEXT",                       #not needed
+    "Div": "TEXT",
+    "Notification": "INTEGER",
+    "Order": "INTEGER",
+    "Planning Order": "INTEGER",           #not needed
+    "Resource": "TEXT",                    #not needed
+    "Work Plan Date": "TEXT",              # stored as "MM/DD/YYYY"
+    "Permit Exp Date": "TEXT",             # stored as "MM/DD/YYYY"
+    "CLICK Start Date": "TEXT",            # stored as "MM/DD/YYYY"
+    "CLICK End Date": "TEXT",              # stored as "MM/DD/YYYY"
+    "Project Reporting Year": "INTEGER",
+    "Program": "TEXT",
+    "Sub-Category": "TEXT",
+    "Est Req": "TEXT",
+    "Priority": "TEXT",
+    "MAT": "TEXT",
+    "Notif Status": "TEXT",
+    "Order User Status": "TEXT",           #not needed
+    "Primary Status": "TEXT",
+    "Job Owner": "TEXT",                   #not needed
+    "Project Managed Flag": "TEXT",
+
+    # --- NEW MPP COLUMNS ---
+    "WMP Commitments": "TEXT",
+    "PEND In": "TEXT",
+    "Shovel Ready Date": "TEXT",
+    "LEAPS Combined Exp Out Date": "TEXT",
+    "Est Out Date": "TEXT",
+    "Completion Deadline Date": "TEXT",
+}
+
+_DATE_COLS = {
+    "Work Plan Date",
+    "Permit Exp Date",
+    "CLICK Start Date",
+    "CLICK End Date",
+    # --- NEW date-like columns ---
+    "Shovel Ready Date",
+    "LEAPS Combined Exp Out Date",
+    "Est Out Date",
+    "Completion Deadline Date",
+}
+
+# Date columns in schema order; mpp_data also stores an ISO + Julian-day shadow for each
+_DATE_COL_ORDER = [c for c in MPP_SCHEMA if c in _DATE_COLS]
+MPP_TABLE_SCHEMA: Dict[str, str] = {**MPP_SCHEMA, **shadow_schema(_DATE_COL_ORDER)}
+
+SAP_SUMMARY_COLS = ["Code", "ActualStart", "Completed On", "TaskUsrStatus", "Completed By"]
+
+# Statements the lookups run (same text for every program, so sqlite3's per-connection
+# statement cache reuses the prepared form)
+_SQL_ORDERS_IN_MPP = 'SELECT DISTINCT "Order" FROM mpp_data WHERE "Order" IS NOT NULL'
+_SQL_ADD_ORDER = 'INSERT OR IGNORE INTO order_tracking_list("Order", "Added On") VALUES (?, ?)'
+_SQL_MPP_FIRST = 'SELECT * FROM mpp_data WHERE "Order" = ? LIMIT 1'
+_SQL_MPP_ROWS = 'SELECT * FROM mpp_data WHERE "Order" = ?'
+_SQL_SAP_ROWS = 'SELECT * FROM sap_data WHERE "Order" = ?'
+_SQL_EPW_FIRST = 'SELECT * FROM epw_data WHERE "Order Number" = ? LIMIT 1'
+_SQL_LAND_FIRST = 'SELECT * FROM land_data WHERE "Order" = ? LIMIT 1'
+
+# Batch versions: the orders go in as one JSON array bound to json_each(?). CROSS JOIN
+# keeps json_each as the outer loop, so each order is probed with the same plan (index,
+# row order, LIMIT 1 pick) as the single-order statement above.
+_SQL_BATCH_FIRST = """
+    SELECT j.value, t.* FROM json_each(?) j
+    CROSS JOIN {table} t
+    WHERE t.rowid = (SELECT rowid FROM {table} WHERE {key} = j.value LIMIT 1)
+"""
+_SQL_BATCH_ROWS = """
+    SELECT j.value, t.* FROM json_each(?) j
+    CROSS JOIN {table} t
+    WHERE t.{key} = j.value
+"""
+_SQL_BATCH_IN_MPP = """
+    SELECT j.value FROM json_each(?) j
+    WHERE EXISTS (SELECT 1 FROM mpp_data WHERE "Order" = j.value)
+"""
+
+
+# ------------------------
+# DB bootstrap
+# ------------------------
+def _bootstrap_schema(conn: sqlite3.Connection) -> None:
+    """Create tables if missing (with current schema). Run once per DB file by ensure_db()."""
+    cur = conn.cursor()
+    # mpp_data table (create if missing; on replace we’ll overwrite via bulk_replace)
+    cols_sql = ", ".join([f'"{c}" {t}' for c, t in MPP_TABLE_SCHEMA.items()])
+    cur.execute(f'''
+        CREATE TABLE IF NOT EXISTS mpp_data (
+            {cols_sql}
+        )
+    ''')
+
+    # order_tracking_list (unique Order list we track forever)
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS order_tracking_list (
+            "Order" INTEGER PRIMARY KEY
+        )
+    ''')
+
+    # --- NEW: make sure "Added On" column exists (migration-safe) ---
+    cur.execute("PRAGMA table_info(order_tracking_list)")
+    ot_cols = {row[1] for row in cur.fetchall()}
+    if "Added On" not in ot_cols:
+        cur.execute('ALTER TABLE order_tracking_list ADD COLUMN "Added On" TEXT')
+
+    # Placeholder shells; real importers will replace these
+    cur.execute('CREATE TABLE IF NOT EXISTS sap_data (dummy TEXT);')
+    cur.execute('CREATE TABLE IF NOT EXISTS epw_data (dummy TEXT);')
+    cur.execute('CREATE TABLE IF NOT EXISTS land_data (dummy TEXT);')
+
+
+# ------------------------
+# Coercion helpers
+# ------------------------
+def _coerce_int(series: pd.Series) -> pd.Series:
+    return pd.to_numeric(series, errors="coerce").astype("Int64")
+
+
+def _coerce_text(series: pd.Series) -> pd.Series:
+    if is_text_dtype(series.dtype):
+        # Arrow strings (see arrow_dtypes): same trim, missing stays missing
+        return series.str.strip()
+    # Preserve None; trim strings
+    s = series.where(series.notna(), None)
+    return s.astype(object).apply(lambda v: v.strip() if isinstance(v, str) else v)
+
+
+def _coerce_date_mdy(series: pd.Series) -> pd.Series:
+    """Coerce to MM/DD/YYYY text; blank if invalid. Robust to:
+       - ISO datetimes with/without timezone (e.g., 2025-11-10T13:45:00Z)
+       - 'YYYY-MM-DD HH:MM', 'MM/DD/YYYY HH:MM'
+       - Excel serial dates (1900 system)
+       - Epoch seconds / milliseconds
+       - 2-digit years and month-name formats
+    """
+    return to_text(normalize_dates_mdy(series))
+
+
+def _apply_target_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Coerce df columns to schema dtypes for consistent storage."""
+    out = pd.DataFrame()
+    for col, dtype in MPP_SCHEMA.items():
+        if col not in df.columns:
+            out[col] = pd.Series([None] * len(df))
+            continue
+        s = df[col]
+        if dtype == "INTEGER":
+            out[col] = _coerce_int(s)
+        elif col in _DATE_COLS:
+            out[col] = _coerce_date_mdy(s)
+        else:
+            out[col] = _coerce_text(s)
+    return add_date_shadows(out, _DATE_COL_ORDER)
+
+
+# ------------------------
+# Shared helpers
+# ------------------------
+def _existing_orders(conn: sqlite3.Connection) -> set:
+    cur = conn.cursor()
+    cur.execute('SELECT "Order" FROM order_tracking_list')
+    rows = cur.fetchall()
+    return {r[0] for r in rows}
+
+
+def _order_ints(df_orders: pd.DataFrame) -> List[int]:
+    return (
+        df_orders["Order"]
+        .dropna()
+        .astype("Int64")
+        .dropna()
+        .astype(int)
+        .tolist()
+    )
+
+
+def _first_row(df: pd.DataFrame) -> Optional[Dict]:
+    if df.empty:
+        return None
+    return df.iloc[0].where(pd.notna(df.iloc[0]), None).to_dict()
+
+
+def _order_list(orders: Iterable[Any]) -> List[int]:
+    """Orders as distinct ints, first-seen order; blanks / non-numeric entries are skipped."""
+    out: Dict[int, None] = {}
+    for o in orders:
+        try:
+            out[int(str(o).strip())] = None
+        except (TypeError, ValueError):
+            continue
+    return list(out)
+
+
+def _frame(rows: List[tuple], columns: List[str]) -> pd.DataFrame:
+    """Rows -> DataFrame the way pd.read_sql_query builds one."""
+    return pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+
+
+def _fmt_mdy(dt: pd.Timestamp | None) -> str:
+    if dt is None or pd.isna(dt):
+        return ""
+    return pd.Timestamp(dt).strftime("%m/%d/%Y")
+
+
+def summarize_sap_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """sap_data rows of one Order -> one row per Code (see get_sap_code_summary_by_order)."""
+    if df.empty:
+        return pd.DataFrame(columns=SAP_SUMMARY_COLS)
+
+    # Ensure required columns exist
+    for c in SAP_SUMMARY_COLS:
+        if c not in df.columns:
+            df[c] = None
+
+    # Parse dates
+    astart = pd.to_datetime(df["ActualStart"], errors="coerce", infer_datetime_format=True)
+    cdone  = pd.to_datetime(df["Completed On"], errors="coerce", infer_datetime_format=True)
+
+    # Sort key: prefer the latest among Completed On / ActualStart
+    sort_key = pd.concat([cdone.rename("k1"), astart.rename("k2")], axis=1).max(axis=1)
+    df = df.assign(_sort_key=sort_key)
+
+    # Keep the most recent record per Code
+    df_sorted = df.sort_values(by=["_sort_key"], ascending=False)
+
+    # Deduplicate by Code
+    keep = df_sorted.drop_duplicates(subset=["Code"], keep="first").copy()
+
+    # Format date columns to MM/DD/YYYY text
+    keep["ActualStart"]  = pd.to_datetime(keep["ActualStart"], errors="coerce").apply(_fmt_mdy)
+    keep["Completed On"] = pd.to_datetime(keep["Completed On"], errors="coerce").apply(_fmt_mdy)
+
+    return keep.loc[:, SAP_SUMMARY_COLS].reset_index(drop=True)
+
+
+def fetch_order_tracking_list(db_path: str) -> List[int]:
+    """
+    Read order_tracking_list.Order and return as list[int].
+    Ignores nulls/non-numeric safely.
+    """
+    with thread_connection(db_path) as conn:
+        df = pd.read_sql_query('SELECT "Order" FROM order_tracking_list', conn)
+
+    if df.empty or "Order" not in df.columns:
+        return []
+
+    orders = (
+        pd.to_numeric(df["Order"], errors="coerce")
+        .dropna()
+        .astype(int)
+        .tolist()
+    )
+    return orders
+
+
+class ProgramDB:
+    """
+    Everything the program modules used to define per copy, parameterized by a
+    ProgramSpec. Method names match the old module functions.
+    """
+
+    def __init__(self, spec: ProgramSpec):
+        self.spec = spec
+
+    def __repr__(self) -> str:
+        return f"ProgramDB({self.spec.name!r})"
+
+    @property
+    def mpp_filter(self) -> MppFilter:
+        return self.spec.mpp_filter
+
+    # ------------------------
+    # Paths & connections
+    # ------------------------
+    def default_db_path(self) -> str:
+        """
+        Absolute path for the tracker DB. Also ensures the 'data/' folder exists.
+        Use this from UI/helpers instead of DB_PATH when you need an absolute path.
+        """
+        abs_data = os.path.abspath(self.spec.data_dir)
+        os.makedirs(abs_data, exist_ok=True)
+        return os.path.join(abs_data, self.spec.db_name)
+
+    def get_connection(self, path: Optional[str] = None) -> sqlite3.Connection:
+        """
+        Open a SQLite connection with safe, ETL-friendly PRAGMAs.
+        """
+        return open_connection(path or self.default_db_path())
+
+    def ensure_db(self) -> None:
+        """
+        Ensure data dir and DB exist; create tables if missing (with current schema).
+        Only the first call per process (per DB file) does any work.
+        """
+        bootstrap_once(self.default_db_path(), _bootstrap_schema)
+
+    # ------------------------
+    # MPP CSV → DataFrame (filtered)
+    # ------------------------
+    def filter_mpp_frame(self, raw: pd.DataFrame, profile: Optional[IngestProfile] = None) -> pd.DataFrame:
+        """Apply this program's ledger filters to a raw MPP frame, then coerce dtypes."""
+        prof = profile if profile is not None else IngestProfile("MPP")
+        with prof.stage("filter"):
+            df = raw.loc[mpp_filter_mask(raw, self.spec.mpp_filter)].reset_index(drop=True)
+
+        # ---------- Only now apply expensive dtype coercion ----------
+        with prof.stage("coerce"):
+            out = _apply_target_dtypes(df)
+        prof.count(len(raw), len(out))
+        return out
+
+    def load_and_filter_csv(self, csv_path: str) -> pd.DataFrame:
+        """Read CSV (only needed cols), apply filters & dtype coercion faster."""
+        with ingest_run(self.default_db_path(), "MPP", csv_path, "mpp_data") as prof:
+            with prof.stage("read"):
+                raw = read_mpp_csv(csv_path, [self.spec.mpp_filter])
+            return self.filter_mpp_frame(raw, prof)
+
+    # ------------------------
+    # Write mpp_data table
+    # ------------------------
+    def replace_mpp_data(self, df: pd.DataFrame, profile: Optional[IngestProfile] = None) -> int:
+        """
+        Replace mpp_data with df; returns rows written. Pass the profile that produced df
+        (read / filter / coerce) to log the whole load as one ingest_runs row.
+        """
+        self.ensure_db()
+        dbp = self.default_db_path()
+        with ingest_run(dbp, "MPP", "", "mpp_data", profile) as prof, sqlite3.connect(dbp) as conn:
+            with prof.stage("write"):
+                # Row fingerprints won't match; next upsert_mpp_data() reloads in full.
+                # Cleared first so a crash mid-replace can't leave stale ones behind.
+                clear_fingerprints(conn)
+                conn.commit()
+                bulk_replace(
+                    conn, "mpp_data", df, MPP_TABLE_SCHEMA, MPP_INDEXES,
+                    journal_mode=INGEST_JOURNAL_MODE, synchronous=INGEST_SYNCHRONOUS, analyze=True,
+                )
+            if profile is None:
+                prof.count(len(df), len(df))
+            return len(df)
+
+    def stream_mpp_data(self, csv_path: str, memory_limit_mb: int = STREAM_MEMORY_LIMIT_MB) -> int:
+        """
+        Bounded-memory load_and_filter_csv() + replace_mpp_data(): the CSV is filtered and
+        coerced block by block into a staging table that replaces mpp_data at the end.
+        Returns rows written.
+        """
+        self.ensure_db()
+        dbp = self.default_db_path()
+        with ingest_run(dbp, "MPP", csv_path, "mpp_data") as prof, sqlite3.connect(dbp) as conn:
+            clear_fingerprints(conn)
+            conn.commit()
+            return stream_mpp_csv_into(
+                conn, csv_path, self.spec.mpp_filter, self.filter_mpp_frame, memory_limit_mb,
+                schema=MPP_TABLE_SCHEMA, profile=prof,
+            )
+
+    def upsert_mpp_data(self, df: pd.DataFrame, profile: Optional[IngestProfile] = None) -> MppDelta:
+        """
+        Incremental alternative to replace_mpp_data(): insert new rows, update changed
+        ones, delete vanished ones. Returns the delta (counts + changed Orders).
+        """
+        self.ensure_db()
+        dbp = self.default_db_path()
+        with ingest_run(dbp, "MPP", "", "mpp_data", profile) as prof, sqlite3.connect(dbp) as conn:
+            with prof.stage("write"):
+                delta = upsert_mpp_frame(conn, df, MPP_TABLE_SCHEMA)
+                conn.commit()
+            if profile is None:
+                prof.count(len(df), len(df))
+            return delta
+
+    # ------------------------
+    # Order-tracking list management
+    # ------------------------
+    def update_order_tracking_list_from_mpp(self) -> Tuple[int, int]:
+        """
+        Reads Orders from mpp_data, appends any new into order_tracking_list.
+        Returns (existing_count_before, inserted_count).
+
+        NEW: also sets "Added On" = today's date (MM/DD/YYYY) for any newly inserted orders.
+        Existing orders keep their original "Added On" value.
+        """
+        self.ensure_db()
+        with thread_connection(self.default_db_path()) as conn:
+            new_orders = set(_order_ints(pd.read_sql_query(_SQL_ORDERS_IN_MPP, conn)))
+
+            have = _existing_orders(conn)
+            to_insert = sorted(list(new_orders - have))
+
+            inserted_count = 0
+            if to_insert:
+                today_str = datetime.today().strftime("%m/%d/%Y")
+                conn.executemany(_SQL_ADD_ORDER, [(int(o), today_str) for o in to_insert])
+                inserted_count = len(to_insert)
+
+            conn.commit()
+            return (len(have), inserted_count)
+
+    def seed_order_tracking_list_if_empty(self) -> int:
+        """If order_tracking_list empty, copy all orders from mpp_data with an Added On date."""
+        self.ensure_db()
+        with thread_connection(self.default_db_path()) as conn:
+            has = conn.execute('SELECT COUNT(1) FROM order_tracking_list').fetchone()[0]
+            if has > 0:
+                return 0
+
+            vals = _order_ints(pd.read_sql_query(_SQL_ORDERS_IN_MPP, conn))
+            if vals:
+                today_str = datetime.today().strftime("%m/%d/%Y")
+                conn.executemany(_SQL_ADD_ORDER, [(int(v), today_str) for v in vals])
+                conn.commit()
+                return len(vals)
+            return 0
+
+    def get_order_tracking_df(self) -> pd.DataFrame:
+        self.ensure_db()
+        with thread_connection(self.default_db_path()) as conn:
+            df = pd.read_sql_query('SELECT "Order" FROM order_tracking_list ORDER BY "Order" ASC', conn)
+        return df
+
+    def fetch_order_tracking_list(self, db_path: Optional[str] = None) -> List[int]:
+        return fetch_order_tracking_list(db_path or self.default_db_path())
+
+    # ------------------------
+    # LOOKUP HELPERS
+    # ------------------------
+    def _lookup(self, sql: str, order_num: int) -> pd.DataFrame:
+        self.ensure_db()
+        conn = thread_connection(self.default_db_path())
+        return pd.read_sql_query(sql, conn, params=(int(order_num),))
+
+    def get_mpp_first_row_by_order(self, order_num: int) -> Optional[Dict]:
+        """Return the first row for an order from mpp_data as a dict (or None)."""
+        return _first_row(self._lookup(_SQL_MPP_FIRST, order_num))
+
+    def get_mpp_rows_by_order(self, order_num: int) -> pd.DataFrame:
+        """Return all rows for an order from mpp_data (may be multiple)."""
+        return self._lookup(_SQL_MPP_ROWS, order_num)
+
+    def get_sap_rows_by_order(self, order_num: int) -> pd.DataFrame:
+        """
+        Raw rows for an order from sap_data. Expected columns include:
+        "Order", "Code", "ActualStart", "Completed On", "TaskUsrStatus", "Completed By".
+        """
+        return self._lookup(_SQL_SAP_ROWS, order_num)
+
+    def get_sap_code_summary_by_order(self, order_num: int) -> pd.DataFrame:
+        """
+        Returns one row per unique Code for a given Order with columns:
+        Code | ActualStart | Completed On | TaskUsrStatus | Completed By
+
+        If multiple rows exist for a Code, takes the row with the latest
+        coalesced date among ("Completed On", "ActualStart").
+        """
+        return summarize_sap_rows(self.get_sap_rows_by_order(order_num))
+
+    def get_epw_first_row_by_order(self, order_num: int) -> Optional[Dict]:
+        """
+        Return the first row for an order from epw_data (matched on 'Order Number') as a dict, or None.
+        """
+        return _first_row(self._lookup(_SQL_EPW_FIRST, order_num))
+
+    def get_land_first_row_by_order(self, order_num: int) -> Optional[Dict]:
+        """
+        Return the first row for an order from land_data (matched on 'Order') as a dict, or None.
+        """
+        return _first_row(self._lookup(_SQL_LAND_FIRST, order_num))
+
+    # ------------------------
+    # BATCH LOOKUPS (one query per source for any number of orders)
+    # ------------------------
+    def _batch(self, sql: str, orders: Iterable[Any]) -> Tuple[List[str], Dict[int, List[tuple]]]:
+        """Run a _SQL_BATCH_* statement; returns (columns, {order: rows}) for the orders found."""
+        wanted = _order_list(orders)
+        if not wanted:
+            return [], {}
+        self.ensure_db()
+        cur = thread_connection(self.default_db_path()).execute(sql, (json.dumps(wanted),))
+        columns = [d[0] for d in cur.description][1:]
+        grouped: Dict[int, List[tuple]] = {}
+        for row in cur:
+            grouped.setdefault(int(row[0]), []).append(row[1:])
+        return columns, grouped
+
+    def _batch_first(self, table: str, key: str, orders: Iterable[Any]) -> Dict[int, Dict]:
+        columns, grouped = self._batch(_SQL_BATCH_FIRST.format(table=table, key=key), orders)
+        # Same values as _first_row(): NULL -> None, numbers stay int / float
+        return {o: dict(zip(columns, rows[0])) for o, rows in grouped.items()}
+
+    def get_mpp_first_rows_by_orders(self, orders: Iterable[Any]) -> Dict[int, Dict]:
+        """{order: first mpp_data row as a dict} for the orders found (see get_mpp_first_row_by_order)."""
+        return self._batch_first("mpp_data", '"Order"', orders)
+
+    def get_epw_first_rows_by_orders(self, orders: Iterable[Any]) -> Dict[int, Dict]:
+        """{order: first epw_data row as a dict}, matched on 'Order Number'."""
+        return self._batch_first("epw_data", '"Order Number"', orders)
+
+    def get_land_first_rows_by_orders(self, orders: Iterable[Any]) -> Dict[int, Dict]:
+        """{order: first land_data row as a dict}, matched on 'Order'."""
+        return self._batch_first("land_data", '"Order"', orders)
+
+    def get_mpp_rows_by_orders(self, orders: Iterable[Any]) -> pd.DataFrame:
+        """All mpp_data rows for the orders, grouped by order in the order given."""
+        columns, grouped = self._batch(_SQL_BATCH_ROWS.format(table="mpp_data", key='"Order"'), orders)
+        return _frame([r for rows in grouped.values() for r in rows], columns)
+
+    def get_sap_rows_by_orders(self, orders: Iterable[Any]) -> pd.DataFrame:
+        """All sap_data rows for the orders, grouped by order in the order given."""
+        columns, grouped = self._batch(_SQL_BATCH_ROWS.format(table="sap_data", key='"Order"'), orders)
+        return _frame([r for rows in grouped.values() for r in rows], columns)
+
+    def get_sap_code_summaries_by_orders(self, orders: Iterable[Any]) -> Dict[int, pd.DataFrame]:
+        """
+        {order: get_sap_code_summary_by_order(order)} for the orders with sap_data rows,
+        from one query.
+        """
+        columns, grouped = self._batch(_SQL_BATCH_ROWS.format(table="sap_data", key='"Order"'), orders)
+        return {o: summarize_sap_rows(_frame(rows, columns)) for o, rows in grouped.items()}
+
+    def orders_in_mpp(self, orders: Iterable[Any]) -> Set[int]:
+        """The given orders that have at least one mpp_data row (input validation)."""
+        _columns, grouped = self._batch(_SQL_BATCH_IN_MPP, orders)
+        return set(grouped)
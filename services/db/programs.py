@@ -0,0 +1,35 @@
+# services/db/programs.py
+from __future__ import annotations
+from typing import List, Optional, Tuple
+
+from services.db import wmp_db, maintenance_db, maintenance_rfc_db, poles_db, poles_rfc_db
+from services.db.program_db import ProgramDB
+
+# ------------------------
+# Program registry
+# ------------------------
+# Every program DB with its UI label, in the order the master tools list them
+# (and pick the "primary" tracker for an order).
+
+PROGRAMS: List[Tuple[str, ProgramDB]] = [
+    ("WMP", wmp_db.PROGRAM),
+    ("Maintenance", maintenance_db.PROGRAM),
+    ("Maintenance RFC", maintenance_rfc_db.PROGRAM),
+    ("Poles", poles_db.PROGRAM),
+    ("Poles RFC", poles_rfc_db.PROGRAM),
+]
+
+
+def program_by_name(name: str) -> Optional[ProgramDB]:
+    """ProgramDB for a spec name ("wmp", "poles_rfc", ...) or None."""
+    for _label, prog in PROGRAMS:
+        if prog.spec.name == name:
+            return prog
+    return None
+
+
+def label_for(name: str) -> str:
+    for label, prog in PROGRAMS:
+        if prog.spec.name == name:
+            return label
+    return name
@@ -0,0 +1,338 @@
+# services/db/unified_store.py
+from __future__ import annotations
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import pandas as pd
+
+from services.db.bulk_writer import analyze_table
+from services.db.connection import thread_connection
+from services.db.program_db import DATA_DIR, ProgramDB, summarize_sap_rows
+from services.db.programs import PROGRAMS
+
+# ------------------------
+# Unified multi-program store (opt-in)
+# ------------------------
+# The five program DBs share one schema and overlap heavily in orders, so the master
+# tools (Master_Emailer, Master_Order_Information, Add to Report) used to open five
+# files, check sqlite_master in each and concat the results in Python. With this
+# option on, they run one query against data/all_programs.sqlite3 instead. That
+# file holds the source and tracker tables of every program, tagged with the
+# program they came from:
+#
+#   <table>(program_key, <the program DB's columns>)
+#   idx_u_<table>_order    (<order column>, program_key)   cross-program lookups
+#   idx_u_<table>_program  (program_key, <order column>)   per-program reads / counts
+#   "<table>__<program>"   view: WHERE program_key = '<program>'
+#
+# ("program_key" rather than "program": SQLite column names are case-insensitive
+# and mpp_data already has a "Program" column.)
+#
+# The program DBs stay the source of truth and every writer keeps writing them.
+# refresh_unified() re-copies a program only when its DB file (or WAL) changed since
+# the last copy. unified_connection() calls it first, so readers never see stale
+# rows. Copied columns are untyped, so values come back exactly as the program DB
+# stored them.
+
+UNIFIED_ENV = "TRACKER_UNIFIED_STORE"
+UNIFIED_DB_NAME = "all_programs.sqlite3"
+PROGRAM_KEY = "program_key"
+SYNC_TABLE = "unified_sync"
+
+# Mirrored tables -> the column orders are looked up by
+UNIFIED_TABLES: Dict[str, str] = {
+    "mpp_data": "Order",
+    "sap_data": "Order",
+    "epw_data": "Order Number",
+    "land_data": "Order",
+    "open_dependencies": "Order",
+    "permit_tracker": "Order",
+    "land_tracker": "Order",
+    "environment_tracker": "Order",
+    "joint_pole_tracker": "Order",
+    "faa_tracker": "Order",
+    "miscTSK_tracker": "Order",
+}
+
+# Cross-program filters the Master Emailer runs
+EXTRA_INDEXES: Dict[str, List[Tuple[str, List[str]]]] = {
+    "permit_tracker": [("idx_u_permit_tracker_action", ["Action", PROGRAM_KEY])],
+    "joint_pole_tracker": [("idx_u_joint_pole_tracker_action", ["Action", PROGRAM_KEY])],
+}
+
+_TRUE = {"1", "true", "yes", "on"}
+_sync_lock = threading.Lock()
+
+
+def unified_store_enabled() -> bool:
+    return os.environ.get(UNIFIED_ENV, "").strip().lower() in _TRUE
+
+
+def set_unified_store(enabled: bool) -> None:
+    """Turn the option on/off for this process (and anything it starts)."""
+    os.environ[UNIFIED_ENV] = "1" if enabled else "0"
+
+
+def unified_db_path() -> str:
+    abs_data = os.path.abspath(DATA_DIR)
+    os.makedirs(abs_data, exist_ok=True)
+    return os.path.join(abs_data, UNIFIED_DB_NAME)
+
+
+def _q(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _signature(db_path: str) -> Optional[str]:
+    """mtime + size of the DB file and its WAL (None if the DB doesn't exist)."""
+    parts = []
+    for p in (db_path, db_path + "-wal"):
+        try:
+            st = os.stat(p)
+        except OSError:
+            if p == db_path:
+                return None
+            continue
+        parts.append(f"{st.st_mtime_ns}:{st.st_size}")
+    return "|".join(parts)
+
+
+def _columns(conn: sqlite3.Connection, schema: str, table: str) -> List[str]:
+    return [r[1] for r in conn.execute(f"PRAGMA {schema}.table_info({_q(table)})")]
+
+
+def _ensure_sync_table(conn: sqlite3.Connection) -> None:
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {SYNC_TABLE} (
+            {PROGRAM_KEY} TEXT PRIMARY KEY,
+            source_path   TEXT,
+            signature     TEXT,
+            tables        TEXT,
+            synced_at     TEXT
+        )
+    ''')
+
+
+def _ensure_table(conn: sqlite3.Connection, table: str, program: str, cols: Sequence[str]) -> None:
+    """Create the unified table (or add columns a program brings), its indexes and the program's view."""
+    have = _columns(conn, "main", table)
+    if not have:
+        cols_sql = ", ".join(_q(c) for c in cols)
+        conn.execute(f"CREATE TABLE {_q(table)} ({PROGRAM_KEY} TEXT NOT NULL, {cols_sql})")
+        have = [PROGRAM_KEY, *cols]
+    else:
+        lower = {c.lower() for c in have}
+        for c in cols:
+            if c.lower() not in lower:
+                conn.execute(f"ALTER TABLE {_q(table)} ADD COLUMN {_q(c)}")
+                have.append(c)
+                lower.add(c.lower())
+
+    key = UNIFIED_TABLES[table]
+    specs = [(f"idx_u_{table}_program", [PROGRAM_KEY])]
+    if key in have:
+        specs = [
+            (f"idx_u_{table}_order", [key, PROGRAM_KEY]),
+            (f"idx_u_{table}_program", [PROGRAM_KEY, key]),
+        ]
+    specs += [s for s in EXTRA_INDEXES.get(table, []) if all(c in have for c in s[1])]
+    for name, icols in specs:
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {_q(name)} ON {_q(table)}({', '.join(_q(c) for c in icols)})"
+        )
+    conn.execute(
+        f"CREATE VIEW IF NOT EXISTS {_q(f'{table}__{program}')} AS "
+        f"SELECT * FROM {_q(table)} WHERE {PROGRAM_KEY} = '{program}'"
+    )
+
+
+def _drop_program_rows(conn: sqlite3.Connection, program: str) -> None:
+    for table in UNIFIED_TABLES:
+        if _columns(conn, "main", table):
+            conn.execute(f"DELETE FROM {_q(table)} WHERE {PROGRAM_KEY} = ?", (program,))
+
+
+def _copy_program(conn: sqlite3.Connection, program: str, src_path: str, signature: str) -> List[str]:
+    """Replace one program's rows with a fresh copy of its DB. Returns the tables copied."""
+    conn.execute("ATTACH DATABASE ? AS src", (src_path,))
+    try:
+        src_tables = {
+            r[0] for r in conn.execute("SELECT name FROM src.sqlite_master WHERE type = 'table'")
+        }
+        copied: List[str] = []
+        conn.execute("BEGIN")
+        try:
+            _drop_program_rows(conn, program)
+            for table in UNIFIED_TABLES:
+                if table not in src_tables:
+                    continue
+                cols = _columns(conn, "src", table)
+                if cols == ["dummy"]:
+                    continue        # ensure_db() placeholder; nothing extracted yet
+                _ensure_table(conn, table, program, cols)
+                cols_sql = ", ".join(_q(c) for c in cols)
+                conn.execute(
+                    f"INSERT INTO main.{_q(table)} ({PROGRAM_KEY}, {cols_sql}) "
+                    f"SELECT ?, {cols_sql} FROM src.{_q(table)} ORDER BY rowid",
+                    (program,),
+                )
+                copied.append(table)
+            conn.execute(
+                f"INSERT OR REPLACE INTO {SYNC_TABLE} VALUES (?, ?, ?, ?, ?)",
+                (program, src_path, signature, ",".join(copied),
+                 datetime.now().strftime("%m/%d/%Y %H:%M:%S")),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    finally:
+        conn.execute("DETACH DATABASE src")
+    return copied
+
+
+def refresh_unified(force: bool = False, programs: Optional[Iterable[Tuple[str, ProgramDB]]] = None) -> List[str]:
+    """
+    Bring the unified store up to date: re-copy every program whose DB changed since
+    its last copy (all of them with force), drop programs whose DB is gone.
+    Returns the labels that were copied.
+    """
+    with _sync_lock:
+        conn = thread_connection(unified_db_path())
+        with conn:
+            _ensure_sync_table(conn)
+        known = dict(conn.execute(f"SELECT {PROGRAM_KEY}, signature FROM {SYNC_TABLE}").fetchall())
+
+        synced: List[str] = []
+        touched: Set[str] = set()
+        for label, prog in (programs if programs is not None else PROGRAMS):
+            name = prog.spec.name
+            sig = _signature(prog.default_db_path())
+            if sig is None:
+                if name in known:
+                    with conn:
+                        _drop_program_rows(conn, name)
+                        conn.execute(f"DELETE FROM {SYNC_TABLE} WHERE {PROGRAM_KEY} = ?", (name,))
+                continue
+            if not force and known.get(name) == sig:
+                continue
+            touched.update(_copy_program(conn, name, prog.default_db_path(), sig))
+            synced.append(label)
+
+        for table in touched:
+            analyze_table(conn, table)
+        return synced
+
+
+def unified_connection() -> sqlite3.Connection:
+    """This thread's connection to the unified store, refreshed first."""
+    refresh_unified()
+    return thread_connection(unified_db_path())
+
+
+def read_unified(sql: str, params: Sequence[Any] = ()) -> pd.DataFrame:
+    return pd.read_sql_query(sql, unified_connection(), params=list(params))
+
+
+def program_rank_sql(column: str = PROGRAM_KEY) -> str:
+    """ORDER BY expression that lists programs in registry order (WMP first)."""
+    whens = " ".join(f"WHEN '{prog.spec.name}' THEN {i}" for i, (_l, prog) in enumerate(PROGRAMS))
+    return f"CASE {column} {whens} ELSE {len(PROGRAMS)} END"
+
+
+def program_tables() -> Dict[str, Set[str]]:
+    """program name -> tables its DB had at the last copy."""
+    conn = unified_connection()
+    return {
+        name: set(filter(None, (tables or "").split(",")))
+        for name, tables in conn.execute(f"SELECT {PROGRAM_KEY}, tables FROM {SYNC_TABLE}")
+    }
+
+
+def tracker_counts(tables: Sequence[str]) -> Dict[str, Dict[str, Optional[int]]]:
+    """
+    Row counts per program for each table, one GROUP BY per table.
+    {program name: {table: count, or None if that program's DB has no such table}}
+    """
+    have = program_tables()
+    conn = thread_connection(unified_db_path())
+    out: Dict[str, Dict[str, Optional[int]]] = {
+        name: {t: (0 if t in ts else None) for t in tables} for name, ts in have.items()
+    }
+    for t in tables:
+        if not _columns(conn, "main", t):
+            continue
+        for name, n in conn.execute(f"SELECT {PROGRAM_KEY}, COUNT(*) FROM {_q(t)} GROUP BY {PROGRAM_KEY}"):
+            if name in out and out[name][t] is not None:
+                out[name][t] = int(n)
+    return out
+
+
+# ------------------------
+# Order lookup across programs
+# ------------------------
+def _rows_by_program(conn: sqlite3.Connection, sql: str, params: Sequence[Any]) -> Dict[str, pd.DataFrame]:
+    """Run sql, split the rows per program_key into frames built the way read_sql_query builds them."""
+    cur = conn.execute(sql, list(params))
+    cols = [d[0] for d in cur.description]
+    k = cols.index(PROGRAM_KEY)
+    keep = [c for i, c in enumerate(cols) if i != k]
+    grouped: Dict[str, List[tuple]] = {}
+    for row in cur:
+        grouped.setdefault(row[k], []).append(row[:k] + row[k + 1:])
+    return {
+        name: pd.DataFrame.from_records(rows, columns=keep, coerce_float=True)
+        for name, rows in grouped.items()
+    }
+
+
+def _first_rows(conn: sqlite3.Connection, table: str, order_num: int) -> Dict[str, Dict]:
+    if not _columns(conn, "main", table):
+        return {}
+    key = _q(UNIFIED_TABLES[table])
+    frames = _rows_by_program(
+        conn,
+        f"SELECT * FROM {_q(table)} WHERE rowid IN ("
+        f"SELECT MIN(rowid) FROM {_q(table)} WHERE {key} = ? GROUP BY {PROGRAM_KEY})",
+        (order_num,),
+    )
+    return {
+        name: df.iloc[0].where(pd.notna(df.iloc[0]), None).to_dict()
+        for name, df in frames.items() if not df.empty
+    }
+
+
+def order_lookup(order_text: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Master Order Information in one pass: [(label, {"mpp", "sap_df", "epw", "land", "od"})]
+    for every program, in registry order, shaped like the per-program fetch_* helpers
+    return them. Invalid order text -> [].
+    """
+    try:
+        order_num = int(str(order_text).strip())
+    except (TypeError, ValueError):
+        return []
+
+    conn = unified_connection()
+    mpp = _first_rows(conn, "mpp_data", order_num)
+    epw = _first_rows(conn, "epw_data", order_num)
+    land = _first_rows(conn, "land_data", order_num)
+    od = _first_rows(conn, "open_dependencies", order_num)
+    sap: Dict[str, pd.DataFrame] = {}
+    if _columns(conn, "main", "sap_data"):
+        sap = _rows_by_program(conn, 'SELECT * FROM sap_data WHERE "Order" = ?', (order_num,))
+
+    out: List[Tuple[str, Dict[str, Any]]] = []
+    for label, prog in PROGRAMS:
+        name = prog.spec.name
+        od_val = od[name].get("Open Dependencies") if name in od else None
+        out.append((label, {
+            "mpp": mpp.get(name),
+            "sap_df": summarize_sap_rows(sap.get(name, pd.DataFrame())),
+            "epw": epw.get(name),
+            "land": land.get(name),
+            "od": None if name not in od else {"Open Dependencies": "" if od_val is None else str(od_val)},
+        }))
+    return out
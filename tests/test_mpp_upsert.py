@@ -0,0 +1,103 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from services.db import mpp_upsert
+from services.db.mpp_ingest import MPP_INDEXES
+from services.db.mpp_upsert import upsert_mpp_frame
+
+_INDEX_COLS = sorted({c for _, cols in MPP_INDEXES for c in cols} - {"Order"})
+
+
+def _frame(rows):
+    df = pd.DataFrame(rows, columns=["Order", "Notification", "Primary Status"])
+    df["Order"] = df["Order"].astype("Int64")
+    for c in _INDEX_COLS:
+        df[c] = None
+    return df
+
+
+def _first_rows(conn):
+    mpp_first = conn.execute(
+        'SELECT "Order", "Primary Status" FROM mpp_data '
+        'WHERE rowid IN (SELECT MIN(rowid) FROM mpp_data GROUP BY "Order") ORDER BY "Order"'
+    ).fetchall()
+    limit_1 = [
+        (o, conn.execute('SELECT "Primary Status" FROM mpp_data WHERE "Order" = ? LIMIT 1', (o,)).fetchone()[0])
+        for o, _ in mpp_first
+    ]
+    return mpp_first, limit_1
+
+
+def _upsert_vs_replace(first, second):
+    upserted = sqlite3.connect(":memory:")
+    upsert_mpp_frame(upserted, _frame(first))
+    delta = upsert_mpp_frame(upserted, _frame(second))
+
+    replaced = sqlite3.connect(":memory:")
+    upsert_mpp_frame(replaced, _frame(second))
+
+    assert _first_rows(upserted) == _first_rows(replaced)
+    return delta
+
+
+def test_append_only_change_stays_incremental():
+    delta = _upsert_vs_replace(
+        [(1, "A", "APPR"), (2, "B", "PEND")],
+        [(1, "A", "APPR"), (2, "B", "PEND"), (2, "C", "CONS"), (3, "D", "WAPP")],
+    )
+    assert not delta.full_reload
+    assert delta.inserted == 2
+
+
+def test_row_added_ahead_of_existing_one_matches_full_replace():
+    delta = _upsert_vs_replace(
+        [(1, "A", "APPR"), (2, "B", "PEND")],
+        [(1, "A", "APPR"), (2, "Z", "CONS"), (2, "B", "PEND")],
+    )
+    assert delta.full_reload
+
+
+def test_rows_swapped_in_file_matches_full_replace():
+    _upsert_vs_replace(
+        [(1, "A", "APPR"), (1, "B", "PEND")],
+        [(1, "B", "PEND"), (1, "A", "APPR")],
+    )
+
+
+def test_first_row_deleted_matches_full_replace():
+    delta = _upsert_vs_replace(
+        [(1, "A", "APPR"), (1, "B", "PEND"), (2, "C", "CONS")],
+        [(1, "B", "PEND"), (2, "C", "CONS")],
+    )
+    assert not delta.full_reload
+    assert delta.deleted == 1
+
+
+def test_crash_after_table_replace_forces_full_reload(monkeypatch):
+    first = _frame([(1, "A", "APPR"), (1, "B", "PEND")])
+    conn = sqlite3.connect(":memory:")
+    upsert_mpp_frame(conn, first)
+    conn.commit()
+
+    real = mpp_upsert.bulk_replace
+
+    def replace_then_crash(*args, **kwargs):
+        real(*args, **kwargs)
+        raise RuntimeError("crash before fingerprints are written")
+
+    # Swapped rows take the full-reload path; mpp_data is replaced, fingerprints aren't
+    monkeypatch.setattr(mpp_upsert, "bulk_replace", replace_then_crash)
+    with pytest.raises(RuntimeError):
+        upsert_mpp_frame(conn, _frame([(1, "B", "NEW"), (1, "A", "APPR")]))
+    conn.rollback()
+    monkeypatch.setattr(mpp_upsert, "bulk_replace", real)
+
+    # Stale fingerprints would call this "unchanged" and keep the crashed load's rows
+    delta = upsert_mpp_frame(conn, first)
+    assert delta.full_reload
+
+    replaced = sqlite3.connect(":memory:")
+    upsert_mpp_frame(replaced, first)
+    assert _first_rows(conn) == _first_rows(replaced)